@@ -234,5 +234,34 @@ def report(result_dir, output_dir):
     proc.communicate()
 
 
+
+@dseqc.command(help="Run the reports for many DNA-Seq results in one process.")
+@click.option('--result-dir', '-d', required=False, multiple=True,
+              type=click.Path(exists=True, file_okay=False),
+              help="A directory which contains the results of one project, can be repeated.")
+@click.option('--sample-sheet', '-s', required=False,
+              type=click.Path(exists=True, dir_okay=False),
+              help="A TSV file with project and result_dir columns.")
+@click.option('--output-dir', '-o', required=False,
+              type=click.Path(exists=True, dir_okay=True),
+              help="A directory which will store the reports, one subdirectory per project.")
+@click.option('--jobs', '-j', required=False, type=int, default=4,
+              help="How many reports are built at the same time.")
+@click.option('--sharded', is_flag=True,
+              help="Write the content of every module next to the report, loaded when it is opened.")
+def batch_report(result_dir, sample_sheet, output_dir, jobs, sharded):
+    cmd = ['quartet-dnaseq-batch-report', '--jobs', str(jobs)]
+    if sharded:
+        cmd.append('--sharded')
+    if sample_sheet:
+        cmd.extend(['--sample-sheet', sample_sheet])
+    if output_dir:
+        cmd.extend(['--output-dir', output_dir])
+    cmd.extend(result_dir)
+    print('Run quartet-dnaseq-batch-report and output the reports to %s.' % (output_dir or 'the result directories'))
+    proc = Popen(cmd, stdin=PIPE)
+    proc.communicate()
+
+
 if __name__ == '__main__':
     dseqc()
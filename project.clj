@@ -42,7 +42,7 @@
 
   :main ^:skip-aot quartet-dseqc-report.cli
   :target-path   "target/%s"
-  :resource-paths ["resources"]
+  :resource-paths ["resources" "report/quartet_dnaseq_report/shared"]
   :source-paths ["src"]
   :test-paths ["test"]
 
@@ -60,4 +60,4 @@
     :omit-source   false
     :javac-options ["-target" "1.8", "-source" "1.8"]
     :target-path   "target/%s"
-    :resource-paths ["resources"]}})
+    :resource-paths ["resources" "report/quartet_dnaseq_report/shared"]}})
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+""" Import time of the plugin package and of every MultiQC entry point
+
+MultiQC imports all of the plugin's entry points on start, even with
+--disable-plugin, so every heavy import they make at module level is paid
+by each short report job. Each target is imported in a fresh interpreter
+with -X importtime, after MultiQC itself as MultiQC does, and the median of
+its cumulative import time is checked against a budget:
+
+    python benchmarks/import_time.py --runs 5
+
+Exits with 1 when a target goes over its budget.
+"""
+
+from __future__ import print_function
+import re
+import statistics
+import subprocess
+import sys
+
+import click
+
+# Entry points of setup.py and their budgets in milliseconds. The modules
+# that read tables need pandas, which is the bulk of their budget.
+BUDGETS = [
+    ('quartet_dnaseq_report', 20),
+    ('quartet_dnaseq_report.cli', 20),
+    ('quartet_dnaseq_report.custom_code', 50),
+    ('quartet_dnaseq_report.templates.default', 20),
+    ('quartet_dnaseq_report.templates.quartet_metrics', 20),
+    ('quartet_dnaseq_report.modules.general_information', 100),
+    ('quartet_dnaseq_report.modules.supplementary', 100),
+    ('quartet_dnaseq_report.modules.conclusion', 450),
+    ('quartet_dnaseq_report.modules.pre_alignment_qc', 450),
+    ('quartet_dnaseq_report.modules.post_alignment_qc', 450),
+    ('quartet_dnaseq_report.modules.variant_calling_qc', 450),
+]
+
+
+def import_time(module):
+    """ Cumulative import time of module in ms, in a new interpreter where multiqc is already imported """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import multiqc; import {}'.format(module)],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if proc.returncode != 0:
+        raise click.ClickException('Importing {} failed:\n{}'.format(module, proc.stderr))
+    pattern = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| {}$'.format(re.escape(module)))
+    for line in proc.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            return int(match.group(1)) / 1000.0
+    raise click.ClickException('No import time reported for {}'.format(module))
+
+
+@click.command(help='Check the import time of the plugin entry points against their budgets.')
+@click.option('--runs', default=5, type=int, help='Imports per target, the median is reported.')
+@click.option('--scale', default=1.0, type=float, help='Factor applied to every budget, for slower machines.')
+def main(runs, scale):
+    over = []
+    for module, budget in BUDGETS:
+        median = statistics.median(import_time(module) for i in range(runs))
+        budget = budget * scale
+        status = 'ok' if median <= budget else 'OVER'
+        print('{:<52} {:>8.1f} ms  budget {:>6.0f} ms  {}'.format(module, median, budget, status))
+        if median > budget:
+            over.append(module)
+    if len(over) > 0:
+        print('{} over budget: {}'.format(len(over), ', '.join(over)), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+""" Build the reports of many Quartet DNA-Seq projects in one process.
+
+    quartet-dnaseq-batch-report -o reports/ RESULT_DIR [RESULT_DIR ...]
+    quartet-dnaseq-batch-report --sample-sheet projects.tsv
+
+A sample sheet is a TSV (or CSV) with a project and a result_dir column,
+and optional outdir and title columns. Relative paths are relative to the
+sample sheet. Without a sample sheet, every RESULT_DIR is a project named
+after the directory.
+
+Like the report worker, the batch imports MultiQC and the plugin and loads
+the compiled Quartet reference once, then builds every project's report in
+a process forked from it, --jobs at a time.
+"""
+
+from __future__ import print_function
+import csv
+import logging
+import multiprocessing
+import os
+
+import click
+
+from quartet_dnaseq_report import worker
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TITLE = 'Quartet DNA report'
+DEFAULT_TEMPLATE = 'report_templates'
+DEFAULT_FILENAME = 'multiqc_report.html'
+
+
+def read_sample_sheet(path):
+    """ [{'project', 'result_dir', 'outdir', 'title'}] of a sample sheet """
+    delimiter = ',' if path.endswith('.csv') else '\t'
+    base = os.path.dirname(os.path.abspath(path))
+    projects = []
+    with open(path, newline='') as fh:
+        reader = csv.DictReader(fh, delimiter=delimiter)
+        missing = [c for c in ('project', 'result_dir') if c not in (reader.fieldnames or [])]
+        if len(missing) > 0:
+            raise click.ClickException('The sample sheet has no {} column'.format(' or '.join(missing)))
+        for row in reader:
+            if not row.get('project') or not row.get('result_dir'):
+                raise click.ClickException('Line {} of the sample sheet has no project or result_dir'.format(reader.line_num))
+            projects.append({
+                'project': row['project'],
+                'result_dir': os.path.join(base, row['result_dir']),
+                'outdir': os.path.join(base, row['outdir']) if row.get('outdir') else None,
+                'title': row.get('title') or None,
+            })
+    return projects
+
+
+def dir_projects(result_dirs):
+    """ A project per result directory, named after it """
+    return [{'project': os.path.basename(os.path.normpath(d)), 'result_dir': d, 'outdir': None, 'title': None}
+            for d in result_dirs]
+
+
+def make_job(project, output_dir, title, metrics_only, sharded=False):
+    """ Worker job of a project. Reports go to output_dir/<project>, or into the result directory """
+    if project['outdir']:
+        outdir = project['outdir']
+    elif output_dir:
+        outdir = os.path.join(output_dir, project['project'])
+    else:
+        outdir = project['result_dir']
+    return {
+        'analysis_dir': [project['result_dir']],
+        'options': {'outdir': outdir, 'title': project['title'] or title, 'filename': DEFAULT_FILENAME,
+                    'template': DEFAULT_TEMPLATE, 'force': True},
+        'kwargs': {'metrics_only': metrics_only, 'sharded': sharded},
+    }
+
+
+def run_project(item):
+    """ Build one project's report, in a process forked from the warm batch process """
+    name, job = item
+    # Modules write their data files before MultiQC would create the output directory
+    os.makedirs(job['options']['outdir'], exist_ok=True)
+    return name, worker.run_job(job)
+
+
+def run_jobs(jobs, n_jobs):
+    """ Yield (project, result) as the reports are written. Every job gets a
+    fresh fork of this process, so no MultiQC state leaks between projects """
+    context = multiprocessing.get_context('fork')
+    with context.Pool(n_jobs, maxtasksperchild=1) as pool:
+        for name, result in pool.imap_unordered(run_project, jobs):
+            yield name, result
+
+
+@click.command(help='Build the reports of many Quartet DNA-Seq projects in one process.')
+@click.argument('result_dirs', nargs=-1,
+                type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option('--sample-sheet', '-s', default=None, type=click.Path(exists=True, dir_okay=False),
+              help='TSV or CSV with project and result_dir columns (and optional outdir and title).')
+@click.option('--output-dir', '-o', default=None, type=click.Path(file_okay=False),
+              help='Write every report to <output-dir>/<project> instead of its result directory.')
+@click.option('--title', default=DEFAULT_TITLE, help='Report title of the projects without one.')
+@click.option('--jobs', '-j', default=4, type=int, help='Number of reports built at the same time.')
+@click.option('--metrics-only', is_flag=True, help='Write the metrics JSON of every project instead of its HTML report.')
+@click.option('--sharded', is_flag=True, help='Write the content of every module next to the HTML report, loaded when it is opened.')
+def main(result_dirs, sample_sheet, output_dir, title, jobs, metrics_only, sharded):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+    if (sample_sheet is None) == (len(result_dirs) == 0):
+        raise click.UsageError('Give either RESULT_DIRS or --sample-sheet.')
+    projects = read_sample_sheet(sample_sheet) if sample_sheet else dir_projects(result_dirs)
+    names = [p['project'] for p in projects]
+    duplicated = sorted(set(n for n in names if names.count(n) > 1))
+    if len(duplicated) > 0:
+        raise click.ClickException('Duplicated projects: {}'.format(', '.join(duplicated)))
+
+    log.info('Warming up')
+    worker.warm_up()
+    jobs_by_project = [(p['project'], make_job(p, output_dir, title, metrics_only, sharded)) for p in projects]
+    failed = []
+    for name, result in run_jobs(jobs_by_project, jobs):
+        if result['status'] != 'Success':
+            failed.append(name)
+            log.error('{}: {}'.format(name, result['msg']))
+        else:
+            log.info('{}: {}'.format(name, result['msg']))
+    log.info('{} of {} reports written'.format(len(projects) - len(failed), len(projects)))
+    if len(failed) > 0:
+        raise click.ClickException('No report for {}'.format(', '.join(sorted(failed))))
+
+
+if __name__ == '__main__':
+    main()
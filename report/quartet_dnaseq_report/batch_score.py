@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+""" Score many Quartet DNAseq result sets against the historical reference
+in one pass, without generating a report for each of them.
+
+    quartet-dnaseq-score -o scores.tsv RESULT_DIR [RESULT_DIR ...]
+
+Every RESULT_DIR is one queried dataset and is searched for the same
+variants.calling.qc.txt and *.summary.txt files the conclusion module uses.
+"""
+
+from __future__ import print_function
+import logging
+import os
+import re
+import sys
+
+import click
+import pandas as pd
+
+from quartet_dnaseq_report.utils import readers, scoring
+from quartet_dnaseq_report.utils.reference_db import open_reference
+
+log = logging.getLogger(__name__)
+
+PRECISION_RECALL_RE = re.compile(r'variants.calling.qc.txt$')
+MENDELIAN_RE = re.compile(r'.*\.summary.txt$')
+
+
+def find_results(result_dir):
+    """ Precision/recall and Mendelian tables below result_dir, in a stable order """
+    pr_files = []
+    mendelian_files = []
+    for root, dirnames, filenames in os.walk(result_dir):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if PRECISION_RECALL_RE.search(fn):
+                pr_files.append(os.path.join(root, fn))
+            elif MENDELIAN_RE.match(fn):
+                mendelian_files.append(os.path.join(root, fn))
+    return pr_files, mendelian_files
+
+
+def load_dataset(name, result_dir):
+    """ Returns (seq, performance table) of one queried dataset, or None if it has no results """
+    pr_files, mendelian_files = find_results(result_dir)
+    if len(pr_files) == 0 or len(mendelian_files) == 0:
+        log.warning('No variant calling results found in {}'.format(result_dir))
+        return None
+    pr_frames = [readers.read_precision_recall(f) for f in pr_files]
+    mendelian_frames = [readers.read_mendelian(f) for f in mendelian_files]
+    seq = readers.sequencing_strategy(pr_frames[-1])
+    return seq, readers.performance_table(pr_frames, mendelian_frames, batch=name)
+
+
+def score_datasets(result_dirs):
+    """ Metrics table of all queried datasets, one row per dataset """
+    performance = {}
+    for result_dir in result_dirs:
+        name = os.path.normpath(result_dir)
+        dataset = load_dataset(name, result_dir)
+        if dataset is not None:
+            performance.setdefault(dataset[0], []).append(dataset[1])
+
+    tables = []
+    for seq, frames in performance.items():
+        table = scoring.score(open_reference(seq), pd.concat(frames, ignore_index=True))
+        table.insert(1, 'seq', seq)
+        tables.append(table)
+    if len(tables) == 0:
+        return pd.DataFrame()
+    table = pd.concat(tables, ignore_index=True).rename(columns={'batch': 'dataset'})
+    # Keep the order the datasets were given in
+    order = {os.path.normpath(d): i for i, d in enumerate(result_dirs)}
+    return table.iloc[table.dataset.map(order).argsort()].reset_index(drop=True)
+
+
+@click.command(help='Score many Quartet DNA-Seq result directories against the historical reference.')
+@click.argument('result_dirs', nargs=-1, required=True,
+                type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.option('--output', '-o', default=None, type=click.Path(dir_okay=False),
+              help='Write the metrics table (TSV) to this file instead of stdout.')
+def main(result_dirs, output):
+    table = score_datasets(result_dirs)
+    if len(table) == 0:
+        raise click.ClickException('No variant calling results found.')
+    table.to_csv(output if output else sys.stdout, sep='\t', index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,4 +12,16 @@ import click
 disable_plugin = click.option('--disable-plugin', 'disable_plugin',
     is_flag = True,
     help = "Disable the Quartet DNA-Seq MultiQC plugin on this run"
-)
\ No newline at end of file
+)
+
+# Sets config.kwargs['metrics_only'] to True if specified (will be False otherwise)
+metrics_only = click.option('--metrics-only', 'metrics_only',
+    is_flag = True,
+    help = "Only compute the Quartet metrics and write them to a JSON file, without plots or an HTML report"
+)
+
+# Sets config.kwargs['sharded'] to True if specified (will be False otherwise)
+sharded = click.option('--sharded', 'sharded',
+    is_flag = True,
+    help = "Write the content of every module to its own file next to the HTML report, loaded when it is opened"
+)
@@ -8,15 +8,38 @@ using the setuptools plugin hooks.
 from __future__ import print_function
 from pkg_resources import get_distribution
 import logging
+import os
+import sys
+import threading
 
 from multiqc.utils import report, util_functions, config
 
+from quartet_dnaseq_report.utils import manifest, metrics, parallel_modules, parse_cache, plotly_bundle, plotly_data, search_patterns, shards
+
 # Initialise the main MultiQC logger
 log = logging.getLogger('multiqc')
 
 # Save this plugin's version number (defined in setup.py) to the MultiQC config
 config.quartet_dnaseq_report_version = get_distribution('quartet_dnaseq_report').version
 
+# Input files parsed during this run, shared by all modules: {(kind, path): {'lock', 'value'}}
+parsed_files = dict()
+parsed_files_lock = threading.Lock()
+
+
+def parsed_file(kind, path, parse):
+    """ Parse path with parse(path) once per run (going through the parse
+    cache) and hand the same object to every module asking for it.
+
+    Modules share the returned object, so they must not modify it. """
+    key = (kind, os.path.abspath(path))
+    with parsed_files_lock:
+        entry = parsed_files.setdefault(key, {'lock': threading.Lock()})
+    with entry['lock']:
+        if 'value' not in entry:
+            entry['value'] = parse_cache.cached(kind, path, parse)
+    return entry['value']
+
 
 # Add default config options for the things that are used in MultiQC_NGI
 def quartet_dnaseq_report_execution_start():
@@ -27,6 +50,13 @@ def quartet_dnaseq_report_execution_start():
     to use custom command line flags.
     """
     
+    # Forget files parsed by a previous run in this process
+    with parsed_files_lock:
+        parsed_files.clear()
+    metrics.clear()
+    plotly_bundle.clear()
+    plotly_data.clear()
+
     # Halt execution if we've disabled the plugin
     if config.kwargs.get('disable_plugin', True):
         return None
@@ -38,63 +68,124 @@ def quartet_dnaseq_report_execution_start():
     # so we check whether the value is already set. This is to avoid
     # clobbering values that have been customised by users.
 
-    # Module-general_information
-    if 'general_information/information' not in config.sp:
-        config.update_dict( config.sp, { 'general_information/information': { 'fn_re': r'.*information.json$' } } )
+    # Search patterns of the modules, shared with the staging step (see utils.search_patterns)
+    for sp_key, sp in search_patterns.load().items():
+        if sp_key not in config.sp:
+            config.update_dict( config.sp, { sp_key: sp } )
     
+    config.module_order = ['general_information', 'conclusion', 'pre_alignment_qc', 'post_alignment_qc', 'variant_calling_qc', 'supplementary']
 
-    # Module-conclusion
-    if 'conclusion/precision_recall_summary' not in config.sp:
-        config.update_dict( config.sp, { 'conclusion/precision_recall_summary': { 'fn_re': r'variants.calling.qc.txt$' } } )
-    
-    if 'conclusion/mendelian_summary' not in config.sp:
-        config.update_dict( config.sp, { 'conclusion/mendelian_summary': { 'fn_re': r'.*\.summary.txt$' } } )
+    config.exclude_modules = ['fastqc', 'fastq_screen', 'qualimap']
     
+    config.log_filesize_limit = 2000000000
 
-    # Module-pre_alignment_qc
-    if 'pre_alignment_qc/summary' not in config.sp:
-        config.update_dict( config.sp, { 'pre_alignment_qc/summary': { 'fn_re': r'pre_alignment.txt$' } } )
+    # Metrics only: one JSON file instead of the HTML report and its data directory
+    if metrics.enabled():
+        config.template = metrics.TEMPLATE
+        config.make_data_dir = False
 
-    if 'pre_alignment_qc/fastqc_data' not in config.sp:
-        config.update_dict( config.sp, { 'pre_alignment_qc/fastqc_data': { 'fn_re': r'fastqc_data.txt$' } } )
+    # Skip the directory walk when the staging step listed the input files
+    manifest.use_manifests()
 
-    if 'pre_alignment_qc/fastqc_zip' not in config.sp:
-        config.update_dict( config.sp, { 'pre_alignment_qc/fastqc_zip': { 'fn_re': r'.*_fastqc.zip' } } )
 
-    if 'pre_alignment_qc/fastqc_theoretical_gc' not in config.sp:
-        config.update_dict( config.sp, { 'pre_alignment_qc/fastqc_theoretical_gc': { 'fn_re': r'fastqc_theoretical_gc_hg38_genome.txt$' } } )
-    
+class PrebuiltModule(object):
+    """ Stands in for a module entry point in config.avail_modules, so that
+    the MultiQC module loop picks up a module that was built ahead of it.
+    Errors raised while building are raised again in the loop, where MultiQC
+    reports them as usual, and skips a module raising UserWarning (no samples
+    found) quietly. """
 
-    # Module-post_alignment_qc
-    if 'post_alignment_qc/summary' not in config.sp:
-        config.update_dict( config.sp, { 'post_alignment_qc/summary': { 'fn_re': r'post_alignment.txt$' } } )
+    def __init__(self, name, entry_point, output=None, error=None):
+        self.name = name
+        self.entry_point = entry_point
+        self.output = output
+        self.error = error
 
-    if 'post_alignment_qc/bamqc/genome_results' not in config.sp:
-        config.update_dict( config.sp, { 'post_alignment_qc/bamqc/genome_results': { 'fn_re': r'^genome_results.txt$' } } )
+    def load(self):
+        return self
 
-    if 'post_alignment_qc/bamqc/coverage' not in config.sp:
-        config.update_dict( config.sp, { 'post_alignment_qc/bamqc/coverage': { 'fn_re': r'coverage_histogram.txt$' } } )
+    def __call__(self):
+        # Later runs in this process build the module again
+        config.avail_modules[self.name] = self.entry_point
+        if self.error is not None:
+            raise self.error
+        return self.output
 
-    if 'post_alignment_qc/bamqc/insert_size' not in config.sp:
-        config.update_dict( config.sp, { 'post_alignment_qc/bamqc/insert_size': { 'fn_re': r'insert_size_histogram.txt$' } } )
 
-    if 'post_alignment_qc/bamqc/genome_fraction' not in config.sp:
-        config.update_dict( config.sp, { 'post_alignment_qc/bamqc/genome_fraction': { 'fn_re': r'genome_fraction_coverage.txt$' } } )
+def quartet_dnaseq_report_before_modules():
+    """ Add the files listed in manifests (see utils.manifest) and build the
+    plugin modules concurrently, when
+    quartet_dnaseq_report_config: parallel_modules is True or a number of processes.
 
-    if 'post_alignment_qc/bamqc/gc_dist' not in config.sp:
-        config.update_dict( config.sp, { 'post_alignment_qc/bamqc/gc_dist': { 'fn_re': r'mapped_reads_gc-content_distribution.txt$' } } )
-    
+    The modules are built in forked processes (see utils.parallel_modules)
+    and handed to the MultiQC module loop, which then adds them to the
+    report in the configured order. """
 
-    # Module-variant_calling_qc
-    if 'variant_calling_qc/precision_recall_summary' not in config.sp:
-        config.update_dict( config.sp, { 'variant_calling_qc/precision_recall_summary': { 'fn_re': r'variants.calling.qc.txt$' } } )
-    
-    if 'variant_calling_qc/mendelian_summary' not in config.sp:
-        config.update_dict( config.sp, { 'variant_calling_qc/mendelian_summary': { 'fn_re': r'.*\.summary.txt$' } } )
-    
-    
-    config.module_order = ['general_information', 'conclusion', 'pre_alignment_qc', 'post_alignment_qc', 'variant_calling_qc', 'supplementary']
+    # Halt execution if we've disabled the plugin
+    if config.kwargs.get('disable_plugin', True):
+        return None
 
-    config.exclude_modules = ['fastqc', 'fastq_screen', 'qualimap']
-    
-    config.log_filesize_limit = 2000000000
\ No newline at end of file
+    manifest.add_manifest_files()
+
+    workers = getattr(config, 'quartet_dnaseq_report_config', {}).get('parallel_modules', False)
+    if not workers:
+        return None
+
+    # Only this plugin's modules, each configured once, are built ahead
+    modules = []
+    for m in config.module_order:
+        name, mod_cust_config = (list(m.items())[0] if isinstance(m, dict) else (m, {}))
+        entry_point = config.avail_modules.get(name)
+        if entry_point is None or not entry_point.module_name.startswith('quartet_dnaseq_report.'):
+            continue
+        modules.append((name, mod_cust_config or {}))
+    names = [name for name, _ in modules]
+    modules = [(name, c) for name, c in modules if names.count(name) == 1]
+    if len(modules) < 2:
+        return None
+    if not parallel_modules.available():
+        log.warning('Building the modules one after another, this platform has no fork()')
+        return None
+
+    workers = parallel_modules.n_workers(workers, len(modules))
+    if workers < 2:
+        # A single process only adds the cost of forking and pickling
+        return None
+    log.info('Building {} modules over {} processes'.format(len(modules), workers))
+    built = parallel_modules.build_modules(modules, workers)
+
+    for (name, _), (output, error) in zip(modules, built):
+        config.avail_modules[name] = PrebuiltModule(name, config.avail_modules[name], output, error)
+
+
+def quartet_dnaseq_report_before_report_generation():
+    """ Hand the plotly.js build and the compressed plotly figures to the
+    template, and the metrics recorded by a --metrics-only run to the
+    quartet_metrics template, which writes them to <report name>.json """
+
+    if config.kwargs.get('disable_plugin', True):
+        return None
+
+    report.quartet_plotly_bundle = plotly_bundle.bundle()
+    report.quartet_plotly_compressed = plotly_data.compressed()
+    report.quartet_shards = dict()
+    if not metrics.enabled():
+        return None
+
+    config.output_fn_name = os.path.splitext(config.output_fn_name)[0] + '.json'
+    report.quartet_metrics = metrics.dumps()
+
+
+def quartet_dnaseq_report_before_template():
+    """ With --sharded, write the content of every module to its own payload
+    file next to the report (see utils.shards). The report path is final by now """
+
+    if config.kwargs.get('disable_plugin', True):
+        return None
+
+    if not shards.enabled() or metrics.enabled():
+        return None
+    if config.output_fn is sys.stdout:
+        log.warning('A sharded report can not be printed to stdout, writing a single page report')
+        return None
+    shards.write_shards()
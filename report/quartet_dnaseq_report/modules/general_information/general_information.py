@@ -3,14 +3,24 @@
 """ Quartet DNAseq Report plugin module """
 
 from __future__ import print_function
+import io
 import logging
+import os
 
 from multiqc import config
 from multiqc.modules.base_module import BaseMultiqcModule
 
+from quartet_dnaseq_report.utils import metrics, parse_cache
+
 # Initialise the main MultiQC logger
 log = logging.getLogger('multiqc')
 
+
+def read_information(path):
+  with io.open(path, 'r', encoding='utf-8') as fh:
+    return eval(fh.read())
+
+
 class MultiqcModule(BaseMultiqcModule):
   def __init__(self):
 
@@ -21,19 +31,24 @@ class MultiqcModule(BaseMultiqcModule):
     # Initialise the parent module Class object
     super(MultiqcModule, self).__init__(
       name='Data Generation Information',
+      anchor='general_information',
       target='The basic information',
       info=' about the sequencing data.'
     )
 
     # Find and load any input files for general_information
-    for f in self.find_log_files('general_information/information'):
+    for f in self.find_log_files('general_information/information', filecontents=False):
       if f is None:
         log.debug('No file matched: general_information - general_information.txt')
       else:
-        information = eval(f['f'])
+        information = parse_cache.cached('information', os.path.join(f['root'], f['fn']), read_information)
         self.plot_information('general_information', information)
   
   def plot_information(self, id, data, title='', section_name='', description=None, helptext=None):
+    if metrics.enabled():
+      metrics.add(self.anchor, id, data)
+      return None
+
     html_data = ["<dl class='dl-horizontal'>"]
     for k,v in data.items():
       line = " <dt style='text-align:left; width: 250px'>{}</dt>\n <dd>{}</dd>".format(k,v)
@@ -44,7 +59,7 @@ class MultiqcModule(BaseMultiqcModule):
     
     self.add_section(
       name = '',
-      anchor = '',
+      anchor = id + '_anchor',
       description = '',
       plot = html
     )
\ No newline at end of file
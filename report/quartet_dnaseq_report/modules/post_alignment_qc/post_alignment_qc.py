@@ -4,41 +4,101 @@
 
 from __future__ import print_function
 from collections import defaultdict, OrderedDict
+import io
 import logging
 import os
 
 from multiqc import config
 from multiqc.plots import table
 from multiqc.modules.base_module import BaseMultiqcModule
-from multiqc.modules.qualimap import QM_BamQC
+
+from quartet_dnaseq_report.utils import decimate, metrics, parse_cache, qualimap_archive, readers
 
 # Initialise the main MultiQC logger
 log = logging.getLogger('multiqc')
 
+# Module attributes the QM_BamQC parsers store their results in
+QUALIMAP_ATTRS = ['qualimap_bamqc_genome_results', 'qualimap_bamqc_coverage_hist', 'qualimap_bamqc_insert_size_hist',
+                  'qualimap_bamqc_gc_content_dist', 'qualimap_bamqc_gc_by_species']
+# QM_BamQC parser of every section of a Qualimap archive. QM_BamQC is only
+# imported once there is something to parse, it loads matplotlib with the line graphs
+QUALIMAP_PARSERS = {'genome_results': 'parse_genome_results', 'coverage': 'parse_coverage',
+                    'insert_size': 'parse_insert_size', 'gc_dist': 'parse_gc_dist'}
+
+
+class QualimapRecorder(object):
+  """ Stands in for the module while a QM_BamQC parser reads one file, so
+  that what it parsed can be cached and replayed on the module later. The
+  sample is stored under SAMPLE, its name is resolved when replaying. """
+  SAMPLE = '\0sample'
+
+  def __init__(self):
+    self.general_stats_data = defaultdict(lambda: dict())
+    for attr in QUALIMAP_ATTRS:
+      setattr(self, attr, dict())
+    self.name = None
+    self.sections = []
+
+  def clean_s_name(self, s_name, *args, **kwargs):
+    self.name = s_name
+    return self.SAMPLE
+
+  def get_s_name(self, f):
+    return self.SAMPLE
+
+  def add_data_source(self, f=None, s_name=None, section=None, **kwargs):
+    self.sections.append(section)
+
+  def recorded(self):
+    return {
+      'name': self.name,
+      'sections': self.sections,
+      'general_stats': dict(self.general_stats_data),
+      'data': {attr: getattr(self, attr) for attr in QUALIMAP_ATTRS if len(getattr(self, attr)) > 0}
+    }
+
+
+def record_qualimap(path, parser, f):
+  recorder = QualimapRecorder()
+  parser(recorder, f)
+  return recorder.recorded()
+
+
+def record_qualimap_archive(path):
+  """ Record the QM_BamQC parsers on the members of a Qualimap archive.
+  Returns [(section, f, recorded)], where f names the member inside path """
+  from multiqc.modules.qualimap import QM_BamQC
+  records = []
+  for name, text in qualimap_archive.read_members(path):
+    section = qualimap_archive.section(name)
+    f = {'root': os.path.normpath(os.path.join(path, os.path.dirname(name))), 'fn': os.path.basename(name)}
+    # genome_results.txt is parsed from its contents, the histograms line by line
+    contents = text if section == 'genome_results' else io.StringIO(text)
+    records.append((section, f, record_qualimap(path, getattr(QM_BamQC, QUALIMAP_PARSERS[section]), dict(f, f=contents))))
+  return records
+
+
 class MultiqcModule(BaseMultiqcModule):
   def __init__(self):
         
     # Halt execution if we've disabled the plugin
     if config.kwargs.get('disable_plugin', True):
       return None
+    from multiqc.modules.qualimap import QM_BamQC
     
     # Initialise the parent module Class object
     super(MultiqcModule, self).__init__(
       name='Post-alignment Quality Control',
       target='Post-alignment QC',
-      #anchor='post_alignment_qc',
+      anchor='post_alignment_qc',
       #href='https://github.com/chinese-quartet/quartet-dseqc-report',
       info=' is an report module to show the data quality after alignment.'
     )
 
     # Find and load any input files for post_alignment_qc
     table_summary = []
-    for f in self.find_log_files('post_alignment_qc/summary'):
-      lines = f['f'].splitlines()
-      keys = lines[0].split('\t')
-      content = lines[1:]
-      for values in content:
-        table_summary.append(dict(zip(keys, values.split('\t'))))
+    for f in self.find_log_files('post_alignment_qc/summary', filecontents=False):
+      table_summary.extend(parse_cache.cached('summary_table', os.path.join(f['root'], f['fn']), readers.read_summary))
 
     table_summary_dic = {}
     for i in table_summary:
@@ -54,10 +114,21 @@ class MultiqcModule(BaseMultiqcModule):
     # Set up class objects to hold parsed data()
     self.general_stats_data = defaultdict(lambda: dict())
 
+    # Qualimap archives, read without extracting them
+    archives = []
+    for f in self.find_log_files('post_alignment_qc/bamqc/archive', filecontents=False):
+      path = os.path.join(f['root'], f['fn'])
+      try:
+        archives.append((path, parse_cache.cached('qualimap_archive', path, record_qualimap_archive)))
+      except Exception as e:
+        log.warning("Couldn't read Qualimap archive '{}'".format(f['fn']))
+        log.debug('Qualimap archive error:\n{}'.format(e))
+
     # General stats - genome_results.txt
     self.qualimap_bamqc_genome_results = dict()
     for f in self.find_log_files('post_alignment_qc/bamqc/genome_results'):
-      QM_BamQC.parse_genome_results(self, f)
+      self.parse_qualimap('qualimap_genome_results', QM_BamQC.parse_genome_results, f)
+    self.add_qualimap_archives(archives, 'genome_results')
     self.qualimap_bamqc_genome_results = self.ignore_samples(self.qualimap_bamqc_genome_results)
     if len(self.qualimap_bamqc_genome_results) > 0:
       self.write_data_file(self.qualimap_bamqc_genome_results, 'multiqc_qualimap_bamqc_genome_results')
@@ -65,20 +136,23 @@ class MultiqcModule(BaseMultiqcModule):
     # Coverage - coverage_histogram.txt
     self.qualimap_bamqc_coverage_hist = dict()
     for f in self.find_log_files('post_alignment_qc/bamqc/coverage', filehandles=True):
-      QM_BamQC.parse_coverage(self, f)
+      self.parse_qualimap('qualimap_coverage', QM_BamQC.parse_coverage, f)
+    self.add_qualimap_archives(archives, 'coverage')
     self.qualimap_bamqc_coverage_hist = self.ignore_samples(self.qualimap_bamqc_coverage_hist)
 
     # Insert size - insert_size_histogram.txt
     self.qualimap_bamqc_insert_size_hist = dict()
     for f in self.find_log_files('post_alignment_qc/bamqc/insert_size', filehandles=True):
-      QM_BamQC.parse_insert_size(self, f)
+      self.parse_qualimap('qualimap_insert_size', QM_BamQC.parse_insert_size, f)
+    self.add_qualimap_archives(archives, 'insert_size')
     self.qualimap_bamqc_insert_size_hist = self.ignore_samples(self.qualimap_bamqc_insert_size_hist)
 
     # GC distribution - mapped_reads_gc-content_distribution.txt
     self.qualimap_bamqc_gc_content_dist = dict()
     self.qualimap_bamqc_gc_by_species = dict()  # {'HUMAN': data_dict, 'MOUSE': data_dict}
     for f in self.find_log_files('post_alignment_qc/bamqc/gc_dist', filehandles=True):
-      QM_BamQC.parse_gc_dist(self, f)
+      self.parse_qualimap('qualimap_gc_dist', QM_BamQC.parse_gc_dist, f)
+    self.add_qualimap_archives(archives, 'gc_dist')
     self.qualimap_bamqc_gc_content_dist = self.ignore_samples(self.qualimap_bamqc_gc_content_dist)
     self.qualimap_bamqc_gc_by_species = self.ignore_samples(self.qualimap_bamqc_gc_by_species)
 
@@ -102,11 +176,55 @@ class MultiqcModule(BaseMultiqcModule):
         log.debug('Using default Qualimap thresholds: {}'.format(', '.join([i for i in covs])))
       self.covs = covs
 
+      # Only the genome results are kept without plots
+      if metrics.enabled():
+        metrics.add(self.anchor, 'qualimap_bamqc_genome_results', self.qualimap_bamqc_genome_results)
+        return None
+
       # Make the plots for the report
       if len(self.qualimap_bamqc_coverage_hist)>0 and len(self.qualimap_bamqc_insert_size_hist)>0 and len(self.qualimap_bamqc_gc_content_dist)>0:
-        QM_BamQC.report_sections(self)
+        # The series are thinned as they are plotted, the cumulative coverage needs every bin of the histogram
+        with decimate.decimated_plots(QM_BamQC):
+          QM_BamQC.report_sections(self)
 
   # Helper functions
+  def parse_qualimap(self, kind, parser, f):
+    """ Run a QM_BamQC parser on f, or replay what it parsed from the same file before """
+    recorded = parse_cache.cached(kind, os.path.join(f['root'], f['fn']), record_qualimap, parser, f)
+    self.add_qualimap(recorded, f)
+
+  def add_qualimap_archives(self, archives, section):
+    """ Add what was recorded from the members of the Qualimap archives belonging to section """
+    for path, records in archives:
+      for member_section, f, recorded in records:
+        if member_section != section:
+          continue
+        # Archives extracted in place are already found as plain files
+        extracted = os.path.join(os.path.dirname(path), os.path.relpath(os.path.join(f['root'], f['fn']), path))
+        if os.path.isfile(extracted):
+          log.debug("Skipping '{}' in '{}' as it was extracted".format(f['fn'], path))
+          continue
+        self.add_qualimap(recorded, f)
+
+  def add_qualimap(self, recorded, f):
+    """ Add what a QM_BamQC parser read from f to the module """
+    if len(recorded['sections']) == 0:
+      return None
+    s_name = self.get_s_name(f) if recorded['name'] is None else self.clean_s_name(recorded['name'], f)
+    for stats in recorded['general_stats'].values():
+      self.general_stats_data[s_name].update(stats)
+    for attr, values in recorded['data'].items():
+      target = getattr(self, attr)
+      for key, value in values.items():
+        if key == QualimapRecorder.SAMPLE:
+          if s_name in target:
+            log.debug('Duplicate {} sample name found! Overwriting: {}'.format(attr, s_name))
+          target[s_name] = value
+        elif key not in target:
+          target[key] = value
+    for section in recorded['sections']:
+      self.add_data_source(f, s_name=s_name, section=section)
+
   def get_s_name(self, f):
     s_name = os.path.basename(os.path.dirname(f['root']))
     s_name = self.clean_s_name(s_name, f['root'])
@@ -116,6 +234,9 @@ class MultiqcModule(BaseMultiqcModule):
 
   def plot_summary_table(self, id, data, title='Summary metrics', section_name='Summary metrics', description=None, helptext=None):
     """ Create the HTML for pre-alignment qc summary """
+    if metrics.enabled():
+      metrics.add(self.anchor, id, data)
+      return None
     
     headers = OrderedDict()
     headers['%Mapping'] = {
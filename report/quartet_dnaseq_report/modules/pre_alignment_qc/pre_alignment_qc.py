@@ -7,12 +7,13 @@ from collections import defaultdict, OrderedDict
 import io
 import logging
 import os
-import zipfile
 
 from multiqc import config
-from multiqc.plots import table, linegraph
+from multiqc.plots import table
 from multiqc.modules.base_module import BaseMultiqcModule
 
+from quartet_dnaseq_report.utils import decimate, fastqc, metrics, parse_cache, readers
+
 # Initialise the main MultiQC logger
 log = logging.getLogger('multiqc')
 
@@ -27,19 +28,15 @@ class MultiqcModule(BaseMultiqcModule):
     super(MultiqcModule, self).__init__(
       name='Pre-alignment Quality Control',
       target='Pre-alignment QC',
-      #anchor='pre_alignment_qc',
+      anchor='pre_alignment_qc',
       #href='https://github.com/chinese-quartet/quartet-dseqc-report',
       info=' is an report module to show the data quality before alignment.'
     )
 
     # Find and load any input files for pre_alignment_qc
     table_summary = []
-    for f in self.find_log_files('pre_alignment_qc/summary'):
-      lines = f['f'].splitlines()
-      keys = lines[0].split('\t')
-      content = lines[1:]
-      for values in content:
-        table_summary.append(dict(zip(keys, values.split('\t'))))
+    for f in self.find_log_files('pre_alignment_qc/summary', filecontents=False):
+      table_summary.extend(parse_cache.cached('summary_table', os.path.join(f['root'], f['fn']), readers.read_summary))
 
     table_summary_dic = {}
     for i in table_summary:
@@ -57,11 +54,13 @@ class MultiqcModule(BaseMultiqcModule):
 
     # Find and parse unzipped FastQC reports 
     self.fastqc_data = dict()
-    for f in self.find_log_files('pre_alignment_qc/fastqc_data'):
+    for f in self.find_log_files('pre_alignment_qc/fastqc_data', filecontents=False):
       s_name = self.clean_s_name(os.path.basename(f['root']), os.path.dirname(f['root']))
-      self.parse_fastqc_report(f['f'], s_name, f)
+      parsed = parse_cache.cached('fastqc_data', os.path.join(f['root'], f['fn']), fastqc.parse_fastqc_file)
+      self.parse_fastqc_report(parsed, s_name, f)
 
-    # Find and parse zipped FastQC reports
+    # Find and parse zipped FastQC reports, over quartet_dnaseq_report_config: fastqc_workers processes
+    zips = []
     for f in self.find_log_files('pre_alignment_qc/fastqc_zip', filecontents=False):
       s_name = f['fn']
       if s_name.endswith('_fastqc.zip'):
@@ -70,20 +69,24 @@ class MultiqcModule(BaseMultiqcModule):
       if s_name in self.fastqc_data.keys():
         log.debug("Skipping '{}' as already parsed '{}'".format(f['fn'], s_name))
         continue
-      try:
-        fqc_zip = zipfile.ZipFile(os.path.join(f['root'], f['fn']))
-      except Exception as e:
+      zips.append((s_name, f))
+    workers = getattr(config, 'quartet_dnaseq_report_config', {}).get('fastqc_workers', min(4, os.cpu_count() or 1))
+    # Only the zips missing from the parse cache are read
+    parsed_zips = parse_cache.cached_many('fastqc_zip', [os.path.join(f['root'], f['fn']) for _, f in zips],
+                                          fastqc.parse_fastqc_zips, workers)
+    for (s_name, f), (parsed, e) in zip(zips, parsed_zips):
+      # Zips sharing a sample name are parsed together, but only the first readable one is kept
+      if s_name in self.fastqc_data.keys():
+        log.debug("Skipping '{}' as already parsed '{}'".format(f['fn'], s_name))
+        continue
+      if isinstance(e, KeyError):
+        log.warning("Error - can't find fastqc_raw_data.txt in {}".format(f))
+        continue
+      elif e is not None:
         log.warning("Couldn't read '{}' - Bad zip file".format(f['fn']))
         log.debug("Bad zip file error:\n{}".format(e))
         continue
-      # FastQC zip files should have just one directory inside, containing report
-      d_name = fqc_zip.namelist()[0]
-      try:
-        with fqc_zip.open(os.path.join(d_name, 'fastqc_data.txt')) as fh:
-          r_data = fh.read().decode('utf8')
-          self.parse_fastqc_report(r_data, s_name, f)
-      except KeyError:
-        log.warning("Error - can't find fastqc_raw_data.txt in {}".format(f))
+      self.parse_fastqc_report(parsed, s_name, f)
 
     # Filter to strip out ignored sample names
     self.fastqc_data = self.ignore_samples(self.fastqc_data)
@@ -99,92 +102,26 @@ class MultiqcModule(BaseMultiqcModule):
     self.status_colours = { 'pass': '#5cb85c', 'warn': '#f0ad4e', 'fail': '#d9534f', 'default': '#999' }
     log.info('Found {} reports'.format(len(self.fastqc_data)))
     
+    # Only the basic statistics are kept without plots
+    if metrics.enabled():
+      basic_statistics = {s_name: parsed['basic_statistics'] for s_name, parsed in self.fastqc_data.items()}
+      metrics.add(self.anchor, 'fastqc_basic_statistics', basic_statistics)
+      return None
+
     # Now add each section in order
     self.sequence_quality_plot()
     self.gc_content_plot()
 
-  def parse_fastqc_report(self, file_contents, s_name=None, f=None):
-    """ Takes contents from a fastq_data.txt file and parses out required
-    statistics and data. Returns a dict with keys 'stats' and 'data'.
-    Data is for plotting graphs, stats are for top table. """
+  def parse_fastqc_report(self, parsed, s_name=None, f=None):
+    """ Store a report parsed by utils.fastqc.parse_fastqc, a dict with the
+    keys 'statuses', 'basic_statistics' and one dict of column arrays per
+    parsed section. """
 
     if s_name in self.fastqc_data.keys():
       log.debug('Duplicate sample name found! Overwriting: {}'.format(s_name))
     self.add_data_source(f, s_name)
-    self.fastqc_data[s_name] = { 'statuses': dict() }
-
-    # Parse the report
-    section = None
-    s_headers = None
-    self.dup_keys = []
-    for l in file_contents.splitlines():
-      if l == '>>END_MODULE':
-        section = None
-        s_headers = None
-      elif l.startswith('>>'):
-        (section, status) = l[2:].split('\t', 1)
-        section = section.lower().replace(' ', '_')
-        self.fastqc_data[s_name]['statuses'][section] = status
-      elif section is not None:
-        if l.startswith('#'):
-          s_headers = l[1:].split('\t')
-          # Special case: Total Deduplicated Percentage header line
-          if s_headers[0] == 'Total Deduplicated Percentage':
-            self.fastqc_data[s_name]['basic_statistics'].append({
-              'measure': 'total_deduplicated_percentage',
-              'value': float(s_headers[1])
-            })
-          else:
-            # Special case: Rename dedup header in old versions of FastQC (v10)
-            if s_headers[1] == 'Relative count':
-              s_headers[1] = 'Percentage of total'
-            s_headers = [s.lower().replace(' ', '_') for s in s_headers]
-            self.fastqc_data[s_name][section] = list()
-
-        elif s_headers is not None:
-          s = l.split('\t')
-          row = dict()
-          for (i, v) in enumerate(s):
-            v.replace('NaN','0')
-            try:
-              v = float(v)
-            except ValueError:
-              pass
-            row[s_headers[i]] = v
-          self.fastqc_data[s_name][section].append(row)
-          # Special case - need to remember order of duplication keys
-          if section == 'sequence_duplication_levels':
-            try:
-              self.dup_keys.append(float(s[0]))
-            except ValueError:
-              self.dup_keys.append(s[0])
-
-    # Tidy up the Basic Stats
-    self.fastqc_data[s_name]['basic_statistics'] = {d['measure']: d['value'] for d in self.fastqc_data[s_name]['basic_statistics']}
-
-    # Calculate the average sequence length (Basic Statistics gives a range)
-    length_bp = 0
-    total_count = 0
-    for d in self.fastqc_data[s_name].get('sequence_length_distribution', {}):
-      length_bp += d['count'] * self.avg_bp_from_range(d['length'])
-      total_count += d['count']
-    if total_count > 0:
-      self.fastqc_data[s_name]['basic_statistics']['avg_sequence_length'] = length_bp / total_count
-
-  def avg_bp_from_range(self, bp):
-    """ Helper function - FastQC often gives base pair ranges (eg. 10-15)
-    which are not helpful when plotting. This returns the average from such
-    ranges as an int, which is helpful. If not a range, just returns the int """
-
-    try:
-      if '-' in bp:
-        maxlen = float(bp.split('-',1)[1])
-        minlen = float(bp.split('-',1)[0])
-        bp = ((maxlen - minlen)/2) + minlen
-    except TypeError:
-      pass
-    return(int(bp))
-  
+    self.fastqc_data[s_name] = parsed
+
   def get_status_cols(self, section):
     """ Helper function - returns a list of colours according to the FastQC
     status of this module for each sample. """
@@ -196,6 +133,9 @@ class MultiqcModule(BaseMultiqcModule):
   
   def plot_summary_table(self, id, data, title='Summary metrics', section_name='Summary metrics', description=None, helptext=None):
     """ Create the HTML for pre-alignment qc summary """
+    if metrics.enabled():
+      metrics.add(self.anchor, id, data)
+      return None
 
     headers = OrderedDict()
     headers['%Dup'] = {
@@ -314,14 +254,11 @@ class MultiqcModule(BaseMultiqcModule):
   
   def sequence_quality_plot (self):
     """ Create the HTML for the phred quality score plot """
+    # The line graphs load matplotlib, imported once there is one to draw
+    from multiqc.plots import linegraph
 
-    data = dict()
-    for s_name in self.fastqc_data:
-      try:
-        data[s_name] = {self.avg_bp_from_range(d['base']): d['mean'] for d in self.fastqc_data[s_name]['per_base_sequence_quality']}
-      except KeyError:
-        pass
-    if len(data) == 0:
+    quality = fastqc.PositionMatrix.from_reports(self.fastqc_data, 'per_base_sequence_quality', 'base', 'mean')
+    if len(quality) == 0:
       log.debug('sequence_quality not found in FastQC reports')
       return None
 
@@ -356,28 +293,15 @@ class MultiqcModule(BaseMultiqcModule):
       The quality of calls on most platforms will degrade as the run progresses, so it is
       common to see base calls falling into the orange area towards the end of a read._
       ''',
-      plot = linegraph.plot(data, pconfig)
+      plot = linegraph.plot(decimate.decimate_series(quality.series()), pconfig)
     )
 
   def gc_content_plot (self):
     """ Create the HTML for the FastQC GC content plot """
+    from multiqc.plots import linegraph
 
-    data = dict()
-    data_norm = dict()
-    for s_name in self.fastqc_data:
-      try:
-        data[s_name] = {d['gc_content']: d['count'] for d in self.fastqc_data[s_name]['per_sequence_gc_content']}
-      except KeyError:
-        pass
-      else:
-        data_norm[s_name] = dict()
-        total = sum( [ c for c in data[s_name].values() ] )
-        for gc, count in data[s_name].items():
-          try:
-            data_norm[s_name][gc] = (count / total) * 100
-          except ZeroDivisionError:
-            data_norm[s_name][gc] = 0
-    if len(data) == 0:
+    gc = fastqc.PositionMatrix.from_reports(self.fastqc_data, 'per_sequence_gc_content', 'gc_content', 'count')
+    if len(gc) == 0:
       log.debug('per_sequence_gc_content not found in FastQC reports')
       return None
 
@@ -438,7 +362,7 @@ class MultiqcModule(BaseMultiqcModule):
     roughly normal distribution of GC content.'''
     if theoretical_gc is not None:
       # Calculate the count version of the theoretical data based on the largest data store
-      max_total = max([sum (d.values()) for d in data.values() ])
+      max_total = float(gc.totals().max())
       esconfig = {
         'name': 'Theoretical GC Content',
         'dashStyle': 'Dash',
@@ -476,5 +400,5 @@ class MultiqcModule(BaseMultiqcModule):
       be flagged as an error by the module since it doesn't know what your genome's
       GC content should be._
       ''',
-      plot = linegraph.plot([data_norm, data], pconfig)
+      plot = linegraph.plot(decimate.decimate_datasets([gc.percentages().series(), gc.series()]), pconfig)
     )
\ No newline at end of file
@@ -26,6 +26,7 @@ class MultiqcModule(BaseMultiqcModule):
     # Initialise the parent module Class object
     super(MultiqcModule, self).__init__(
       name='Supplementary',
+      anchor='supplementary',
       target='The additional information',
       info=' about this quality assessment report.'
     )
@@ -108,7 +109,7 @@ class MultiqcModule(BaseMultiqcModule):
 
     self.add_section(
       name = '',
-      anchor = '',
+      anchor = 'supplementary_anchor',
       description = '',
       plot = html
     )
\ No newline at end of file
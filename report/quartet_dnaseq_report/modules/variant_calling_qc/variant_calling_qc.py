@@ -8,12 +8,14 @@ import logging
 import os
 import pandas as pd
 import numpy as np
-import seaborn as sns
 
 from multiqc import config
-from multiqc.plots import table, scatter
+from multiqc.plots import table
 from multiqc.modules.base_module import BaseMultiqcModule
 
+from quartet_dnaseq_report.custom_code import parsed_file
+from quartet_dnaseq_report.utils import metrics, readers
+
 # Initialise the main MultiQC logger
 log = logging.getLogger('multiqc')
 
@@ -27,6 +29,7 @@ class MultiqcModule(BaseMultiqcModule):
     # Initialise the parent module Class object
     super(MultiqcModule, self).__init__(
       name='Variant Calling Quality Control',
+      anchor='variant_calling_qc',
       target='Variant calling QC',
       info=' is an report module to show quality assessment of the variant calling.'
     )
@@ -34,13 +37,12 @@ class MultiqcModule(BaseMultiqcModule):
     # Find and load input files
     ### SUMMARY TABLE 1
     snv_indel_df = pd.DataFrame()
-    for f in self.find_log_files('conclusion/precision_recall_summary'):
+    for f in self.find_log_files('conclusion/precision_recall_summary', filecontents=False):
       if f is None:
         log.debug('No file matched: variant_calling_qc - variants.calling.qc.txt')
       else:
         f_p = '%s/%s' % (f['root'], f['fn'])
-        tmp_df = pd.read_csv(f_p, sep='\t')
-        tmp_df[['SNV precision', 'INDEL precision', 'SNV recall', 'INDEL recall']] = round(tmp_df[['SNV precision', 'INDEL precision', 'SNV recall', 'INDEL recall']]/100, 4)
+        tmp_df = parsed_file('precision_recall', f_p, readers.read_precision_recall)
         snv_indel_df = pd.concat([snv_indel_df, tmp_df], axis=0)
     
     snv_indel_df = snv_indel_df.reset_index(drop=True)
@@ -55,13 +57,14 @@ class MultiqcModule(BaseMultiqcModule):
     ### SUMMARY TABLE 2
     mendelian_df = pd.DataFrame()
     n = 1
-    for f in self.find_log_files('conclusion/mendelian_summary'):
+    for f in self.find_log_files('conclusion/mendelian_summary', filecontents=False):
       if f is None:
         log.debug('No file matched: variant_calling_qc - project.summary.txt')
       else:
         f_p = os.path.join(f['root'], f['fn'])
-        tmp_df = pd.read_csv(f_p, sep='\t')
-        tmp_df.Family = 'Family %i.' % n + tmp_df.Family
+        tmp_df = parsed_file('mendelian', f_p, readers.read_mendelian)
+        # The parsed frame is shared with the conclusion module
+        tmp_df = tmp_df.assign(Family='Family %i.' % n + tmp_df.Family)
         mendelian_df = pd.concat([mendelian_df, tmp_df], axis=0)
         n = n+1
    
@@ -118,6 +121,9 @@ class MultiqcModule(BaseMultiqcModule):
   ### Function 1: Plot detailed numbers of performance assessment based on reference datasets
   def detail_1(self, id, data, title='Details based on reference datasets', section_name='Details based on reference datasets', description="", helptext=None):
     """ Create the HTML for detailed numbers of performance assessment based on reference datasets """
+    if metrics.enabled():
+      metrics.add(self.anchor, id, data)
+      return None
 
     headers = OrderedDict()
     headers['SNV number'] = {
@@ -260,6 +266,9 @@ class MultiqcModule(BaseMultiqcModule):
   ### Function 2: Plot detailed numbers of performance assessment based on Quartet genetic built-in truth
   def detail_2(self, id, data, title='Details based on Quartet genetic built-in truth', section_name='Details based on Quartet genetic built-in truth', description="Each row represents a set of Quartet samples, i.e. one each of D5, D6, F7 and M8. When multiple sets of technical replicates are measured, the performance of each set will be represented by row.", helptext=None):
     """ Create the HTML for detailed numbers of performance assessment based on Quartet genetic built-in truth """
+    if metrics.enabled():
+      metrics.add(self.anchor, id, data)
+      return None
     
     headers = OrderedDict()
     headers['SNV Detected Variants'] = {
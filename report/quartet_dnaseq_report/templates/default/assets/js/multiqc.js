@@ -17,7 +17,284 @@ function notEmptyObj(obj) {
   return true;
 }
 
+// Plotly figures, compacted and compressed by utils/plotly_data.py
+var quartet_plotly = null;
+
+// Numeric arrays packed as {dtype, bdata}, little endian
+function quartet_plotly_unpack(obj) {
+  if (Array.isArray(obj)) {
+    return obj.map(quartet_plotly_unpack);
+  }
+  if (obj === null || typeof obj !== "object") {
+    return obj;
+  }
+  if (typeof obj.bdata === "string" && (obj.dtype === "f4" || obj.dtype === "i4")) {
+    var bytes = Uint8Array.from(atob(obj.bdata), function (c) {
+      return c.charCodeAt(0);
+    });
+    if (obj.dtype === "i4") {
+      return Array.from(new Int32Array(bytes.buffer));
+    }
+    // Back to the shortest decimals of the single precision values
+    return Array.from(new Float32Array(bytes.buffer), function (v) {
+      return isFinite(v) ? parseFloat(v.toPrecision(7)) : null;
+    });
+  }
+  var unpacked = {};
+  for (var key in obj) {
+    unpacked[key] = quartet_plotly_unpack(obj[key]);
+  }
+  return unpacked;
+}
+
+// Figure {data, layout} of a plotly section. With a null data_id, only decompress the figures
+function quartet_plotly_figure(data_id) {
+  if (quartet_plotly === null) {
+    var compressed = document.getElementById("quartet_plotly_compressed").innerHTML;
+    quartet_plotly = compressed.length > 0 ? JSON.parse(LZString.decompressFromBase64(compressed)) : { templates: {}, figures: {} };
+  }
+  if (data_id === null) {
+    return null;
+  }
+  var packed = quartet_plotly.figures[data_id];
+  var figure = { data: quartet_plotly_unpack(packed.data), layout: quartet_plotly_unpack(packed.layout) };
+  if (packed.template !== undefined) {
+    figure.layout.template = quartet_plotly_unpack(quartet_plotly.templates[packed.template]);
+  }
+  return figure;
+}
+
+// Plots are rendered once they come near the viewport, one at a time so
+// that the browser stays responsive
+var quartet_render_queue = [];
+var quartet_render_scheduled = false;
+var quartet_render_observer = null;
+var quartet_render_callbacks = {};
+
+function quartet_render_next() {
+  quartet_render_scheduled = false;
+  var render = quartet_render_queue.shift();
+  if (render !== undefined) {
+    render();
+  }
+  if (quartet_render_queue.length > 0) {
+    quartet_render_schedule();
+  } else {
+    $(document).trigger("quartet_render_idle");
+  }
+}
+
+function quartet_render_schedule() {
+  if (!quartet_render_scheduled) {
+    quartet_render_scheduled = true;
+    setTimeout(quartet_render_next, 0);
+  }
+}
+
+// Call render() when element scrolls near the viewport, or right away without IntersectionObserver
+function quartet_render_when_visible(element, render) {
+  if (element === null) {
+    return;
+  }
+  if (!("IntersectionObserver" in window)) {
+    quartet_render_queue.push(render);
+    quartet_render_schedule();
+    return;
+  }
+  if (quartet_render_observer === null) {
+    quartet_render_observer = new IntersectionObserver(
+      function (entries) {
+        entries.forEach(function (entry) {
+          if (entry.isIntersecting && quartet_render_callbacks[entry.target.id] !== undefined) {
+            quartet_render_observer.unobserve(entry.target);
+            quartet_render_queue.push(quartet_render_callbacks[entry.target.id]);
+            delete quartet_render_callbacks[entry.target.id];
+            quartet_render_schedule();
+          }
+        });
+        // Nothing to draw in view
+        if (!quartet_render_scheduled) {
+          $(document).trigger("quartet_render_idle");
+        }
+      },
+      { rootMargin: "300px 0px" }
+    );
+  }
+  quartet_render_callbacks[element.id] = render;
+  quartet_render_observer.observe(element);
+}
+
+// Render a plot now if it is still waiting to come into view. Returns whether it was waiting
+function quartet_render_now(id) {
+  var render = quartet_render_callbacks[id];
+  if (render === undefined) {
+    return false;
+  }
+  quartet_render_observer.unobserve(document.getElementById(id));
+  delete quartet_render_callbacks[id];
+  render();
+  return true;
+}
+
+// A single, debounced resize handler for all plotly plots
+var quartet_resize_timer = null;
+$(window).add(document).on("resize", function () {
+  clearTimeout(quartet_resize_timer);
+  quartet_resize_timer = setTimeout(function () {
+    if (typeof Plotly === "undefined") {
+      return;
+    }
+    $(".js-plotly-plot").each(function () {
+      Plotly.relayout(this, {
+        "xaxis.autorange": true,
+        "yaxis.autorange": true,
+      });
+    });
+  }, 150);
+});
+
+// Modules of a sharded report, written to their own payload files by utils/shards.py.
+// Each one is loaded with a <script> tag, which also works for reports opened from
+// disk, the first time its navigation entry is opened.
+var quartet_shards = {};
+var quartet_scripts = {};
+
+// Load a script once, then call done()
+function quartet_load_script(src, done, failed) {
+  var script = quartet_scripts[src];
+  if (script === undefined) {
+    script = quartet_scripts[src] = { loaded: false, done: [], failed: [] };
+    var element = document.createElement("script");
+    element.src = src;
+    element.onload = function () {
+      script.loaded = true;
+      $.each(script.done, function (idx, callback) {
+        callback();
+      });
+    };
+    element.onerror = function () {
+      delete quartet_scripts[src];
+      $.each(script.failed, function (idx, callback) {
+        callback();
+      });
+    };
+    document.head.appendChild(element);
+  }
+  if (script.loaded) {
+    done();
+  } else {
+    script.done.push(done);
+    script.failed.push(failed);
+  }
+}
+
+// Load a module of a sharded report, then call done(). Modules in the report itself are done at once
+function quartet_shard_load(anchor, done) {
+  var section = $("#mqc-module-section-" + anchor + ".quartet-shard");
+  if (section.length == 0) {
+    if (done !== undefined) {
+      done();
+    }
+    return;
+  }
+  var shard = quartet_shards[anchor];
+  if (shard === undefined) {
+    shard = quartet_shards[anchor] = { done: [] };
+    var status = section.find(".quartet-shard-status");
+    var scripts = $.grep(String(section.data("requires")).split(" "), function (src) {
+      return src.length > 0;
+    });
+    scripts.push(section.data("shard"));
+    var failed = function () {
+      delete quartet_shards[anchor];
+      status.html('<span class="text-danger">Could not load ' + section.data("shard") + "</span>");
+    };
+    var next = function () {
+      var src = scripts.shift();
+      if (src !== undefined) {
+        quartet_load_script(src, next, failed);
+      }
+    };
+    status.html("<small>loading..</small>");
+    next();
+  }
+  if (done !== undefined) {
+    shard.done.push(done);
+  }
+}
+
+// Called by the payload file of a module
+function quartet_shard_loaded(anchor, payload) {
+  if (payload.plot_data.length > 0) {
+    $.extend(mqc_plots, JSON.parse(LZString.decompressFromBase64(payload.plot_data)));
+  }
+  if (payload.plotly.length > 0) {
+    var plotly = JSON.parse(LZString.decompressFromBase64(payload.plotly));
+    quartet_plotly_figure(null);
+    $.extend(quartet_plotly.templates, plotly.templates);
+    $.extend(quartet_plotly.figures, plotly.figures);
+  }
+  var section = $("#mqc-module-section-" + anchor);
+  section.removeClass("quartet-shard").html(payload.html);
+  // Set up the new tables and plots, and apply the toolbox filters to them
+  section.find('[data-toggle="tooltip"]').tooltip();
+  $(document).trigger("quartet_shard_loaded", [section]);
+  if (window.mqc_rename_f_texts.length > 0) {
+    $(document).trigger("mqc_renamesamples", [window.mqc_rename_f_texts, window.mqc_rename_t_texts, window.mqc_rename_regex_mode]);
+  }
+  if (window.mqc_highlight_f_texts.length > 0) {
+    $(document).trigger("mqc_highlights", [window.mqc_highlight_f_texts, window.mqc_highlight_f_cols, window.mqc_highlight_regex_mode]);
+  }
+  if (window.mqc_hide_f_texts.length > 0) {
+    $(document).trigger("mqc_hidesamples", [window.mqc_hide_f_texts, window.mqc_hide_regex_mode]);
+  }
+  var shard = quartet_shards[anchor];
+  if (shard !== undefined) {
+    $.each(shard.done, function (idx, callback) {
+      callback();
+    });
+    shard.done = [];
+  }
+}
+
+// Open the target of a navigation link (#anchor), loading its module first
+function quartet_shard_open(hash) {
+  var link = $(".mqc-nav a")
+    .filter(function () {
+      return $(this).attr("href") == hash;
+    })
+    .first();
+  if (link.length == 0) {
+    return false;
+  }
+  var anchor = link.closest(".mqc-nav > li").children("a.nav-l1").attr("href").substr(1);
+  if ($("#mqc-module-section-" + anchor + ".quartet-shard").length == 0) {
+    return false;
+  }
+  quartet_shard_load(anchor, function () {
+    if (window.location.hash == hash) {
+      document.getElementById(hash.substr(1)).scrollIntoView();
+    } else {
+      window.location.hash = hash;
+    }
+  });
+  return true;
+}
+
 $(function () {
+  // Load the modules of a sharded report when they are opened
+  $(".mqc-nav").on("click", "a", function (e) {
+    if (quartet_shard_open($(this).attr("href"))) {
+      e.preventDefault();
+    }
+  });
+  $(".mainpage").on("click", ".quartet-shard-load", function (e) {
+    quartet_shard_load($(this).closest(".quartet-shard").attr("id").replace("mqc-module-section-", ""));
+  });
+  if (window.location.hash.length > 1) {
+    quartet_shard_open(window.location.hash);
+  }
+
   // Enable the bootstrap tooltip hovers
   $('[data-toggle="tooltip"]').tooltip();
 
@@ -61,20 +61,19 @@ $(function () {
     },
   });
 
-  // Render plots on page load
-  $(".hc-plot.not_rendered:visible:not(.gt_max_num_ds)").each(function () {
-    var target = $(this).attr("id");
-    // Only one point per dataset, so multiply limit by arbitrary number.
-    var max_num = mqc_config["num_datasets_plot_limit"] * 50;
-    // Deferring each plot call prevents browser from locking up
-    setTimeout(function () {
-      plot_graph(target, undefined, max_num);
-      if ($(".hc-plot.not_rendered:visible:not(.gt_max_num_ds)").length == 0) {
-        $(".mqc_loading_warning").hide();
-      }
-    }, 50);
+  mqc_plots_init(document);
+  // Set up the plots of a module once it is loaded, for sharded reports
+  $(document).on("quartet_shard_loaded", function (e, section) {
+    mqc_plots_init(section);
   });
-  if ($(".hc-plot.not_rendered:visible:not(.gt_max_num_ds)").length == 0) {
+  // The report is ready once the plots in view are drawn. The observer only
+  // reports which plots are in view after this, so wait for it whenever a
+  // plot is still observed
+  if (quartet_render_scheduled || quartet_render_queue.length > 0 || !$.isEmptyObject(quartet_render_callbacks)) {
+    $(document).one("quartet_render_idle", function () {
+      $(".mqc_loading_warning").hide();
+    });
+  } else {
     $(".mqc_loading_warning").hide();
   }
 
@@ -91,7 +90,9 @@ $(function () {
   $("#mqc-render-all-plots").click(function () {
     $(".hc-plot.not_rendered").each(function () {
       var target = $(this).attr("id");
-      plot_graph(target);
+      if (!quartet_render_now(target)) {
+        plot_graph(target);
+      }
     });
     $("#mqc-warning-many-samples").hide();
   });
@@ -106,7 +107,7 @@ $(function () {
   });
 
   // Switch a HighCharts axis or data source
-  $(".hc_switch_group button").click(function (e) {
+  $(document).on("click", ".hc_switch_group button", function (e) {
     e.preventDefault();
     $(this).siblings("button.active").removeClass("active");
     $(this).addClass("active");
@@ -173,16 +174,7 @@ $(function () {
 
   // Make HighCharts divs height-draggable
   // http://jsfiddle.net/Lkwb86c8/
-  $(".hc-plot:not(.no-handle)").each(function () {
-    if (!$(this).parent().hasClass("hc-plot-wrapper")) {
-      $(this).wrap('<div class="hc-plot-wrapper"></div>');
-    }
-    if (!$(this).siblings().hasClass("hc-plot-handle")) {
-      $(this).after('<div class="hc-plot-handle"><span></span><span></span><span></span></div>');
-    }
-    $(this).css({ height: "auto", top: 0, bottom: "10px", position: "absolute" });
-  });
-  $(".hc-plot-handle").on("mousedown", function (e) {
+  $(document).on("mousedown", ".hc-plot-handle", function (e) {
     var wrapper = $(this).parent();
     var handle = $(this);
     var startHeight = wrapper.height();
@@ -200,14 +192,14 @@ $(function () {
     });
   });
   // Trigger HighCharts reflow when a plot is resized
-  $(".hc-plot, .beeswarm-plot").on("mqc_plotresize", function (e) {
+  $(document).on("mqc_plotresize", ".hc-plot, .beeswarm-plot", function (e) {
     if ($(this).highcharts()) {
       $(this).highcharts().reflow();
     }
   });
 
   // Switch a y axis limit on or off
-  $(".mqc_hcplot_plotgroup").on("click", ".mqc_hcplot_yaxis_limit_toggle .mqc_switch_wrapper", function () {
+  $(document).on("click", ".mqc_hcplot_plotgroup .mqc_hcplot_yaxis_limit_toggle .mqc_switch_wrapper", function () {
     var target = $($(this).data("target")).highcharts();
     var ymax = $(this).data("ymax");
     var ymin = $(this).data("ymin");
@@ -224,7 +216,7 @@ $(function () {
   });
 
   // Sort a heatmap by highlighted names
-  $(".mqc_heatmap_sortHighlight").click(function (e) {
+  $(document).on("click", ".mqc_heatmap_sortHighlight", function (e) {
     e.preventDefault();
     var target = $(this).data("target").substr(1);
     if (mqc_plots[target]["config"]["sortHighlights"] == true) {
@@ -239,6 +231,35 @@ $(function () {
   });
 });
 
+// Set up the plots in container: height-draggable, and rendered as they
+// scroll into view, see quartet_render_when_visible in multiqc.js
+function mqc_plots_init(container) {
+  $(container)
+    .find(".hc-plot:not(.no-handle)")
+    .each(function () {
+      if (!$(this).parent().hasClass("hc-plot-wrapper")) {
+        $(this).wrap('<div class="hc-plot-wrapper"></div>');
+      }
+      if (!$(this).siblings().hasClass("hc-plot-handle")) {
+        $(this).after('<div class="hc-plot-handle"><span></span><span></span><span></span></div>');
+      }
+      $(this).css({ height: "auto", top: 0, bottom: "10px", position: "absolute" });
+    });
+  $(container)
+    .find(".hc-plot.not_rendered:visible:not(.gt_max_num_ds)")
+    .each(function () {
+      var target = $(this).attr("id");
+      if (mqc_plots[target] === undefined) {
+        return;
+      }
+      // Only one point per dataset, so multiply limit by arbitrary number.
+      var max_num = mqc_config["num_datasets_plot_limit"] * 50;
+      quartet_render_when_visible(this, function () {
+        plot_graph(target, undefined, max_num);
+      });
+    });
+}
+
 // Call to render any plot
 function plot_graph(target, ds, max_num) {
   if (mqc_plots[target] === undefined) {
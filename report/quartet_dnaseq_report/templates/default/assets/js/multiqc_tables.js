@@ -42,12 +42,12 @@ var brewer_scales = [
 
 // Execute when page load has finished loading
 $(function () {
-  if ($(".mqc_table").length > 0) {
-    // Enable tablesorter on MultiQC tables
-    var strip_non_numeric = function (node) {
-      return node.innerText.replace(/[^\d.-]/g, "");
-    };
-    $(".mqc_table").tablesorter({ sortInitialOrder: "desc", textExtraction: strip_non_numeric });
+  // Tables of a sharded report can come with the modules loaded later
+  if ($(".mqc_table").length > 0 || $(".quartet-shard").length > 0) {
+    mqc_table_init(document);
+    $(document).on("quartet_shard_loaded", function (e, section) {
+      mqc_table_init(section);
+    });
 
     // Update tablesorter if samples renamed
     $(document).on("mqc_renamesamples", function (e, f_texts, t_texts, regex_mode) {
@@ -59,7 +59,7 @@ $(function () {
     clipboard.on("success", function (e) {
       e.clearSelection();
     });
-    $(".mqc_table_copy_btn").click(function () {
+    $(document).on("click", ".mqc_table_copy_btn", function () {
       var btn = $(this);
       btn.addClass("active").html('<span class="glyphicon glyphicon-copy"></span> Copied!');
       setTimeout(function () {
@@ -67,19 +67,8 @@ $(function () {
       }, 2000);
     });
 
-    // Make table headers fixed when table body scrolls (use CSS transforms)
-    // http://stackoverflow.com/a/25902860/713980
-    $(".mqc-table-responsive").scroll(function () {
-      $(this)
-        .find("thead")
-        .css("transform", "translate(0," + $(this).scrollTop() + "px)");
-    });
-
-    // Table header-specific bootstrap tooltips
-    $(".mqc_table_tooltip").tooltip({ container: "body" });
-
     // Expand tables to full height
-    $(".mqc-table-expand").click(function () {
+    $(document).on("click", ".mqc-table-expand", function () {
       if ($(this).find("span").hasClass("glyphicon-chevron-down")) {
         $(this).parent().find(".mqc-table-responsive").css("max-height", "none");
         $(this).find("span").removeClass("glyphicon-chevron-down").addClass("glyphicon-chevron-up");
@@ -91,12 +80,12 @@ $(function () {
 
     /////// COLUMN CONFIG
     // show + hide columns
-    $(".mqc_table_col_visible").change(function () {
+    $(document).on("change", ".mqc_table_col_visible", function () {
       var target = $(this).data("target");
       mqc_table_col_updateVisible(target);
     });
     // Bulk set visible / hidden
-    $(".mqc_configModal_bulkVisible").click(function (e) {
+    $(document).on("click", ".mqc_configModal_bulkVisible", function (e) {
       e.preventDefault();
       var target = $(this).data("target");
       var visible = $(this).data("action") == "showAll";
@@ -134,22 +123,11 @@ $(function () {
       $(target + "_numcols").text($(target + " thead th:visible").length - 1);
     }
 
-    // Make rows in MultiQC tables sortable
-    $(".mqc_table.mqc_sortable tbody").sortable({
-      handle: ".sorthandle",
-      helper: function fixWidthHelper(e, ui) {
-        ui.children().each(function () {
-          $(this).width($(this).width());
-        });
-        return ui;
-      },
-    });
-
     // Change order of columns
-    $(".mqc_configModal_table").on("sortstop", function (e, ui) {
+    $(document).on("sortstop", ".mqc_configModal_table", function (e, ui) {
       change_mqc_table_col_order($(this));
     });
-    $(".mqc_configModal_table").bind("sortEnd", function () {
+    $(document).on("sortEnd", ".mqc_configModal_table", function () {
       change_mqc_table_col_order($(this));
     });
 
@@ -175,7 +153,7 @@ $(function () {
     });
 
     // Sort MultiQC tables by highlight
-    $(".mqc_table_sortHighlight").click(function (e) {
+    $(document).on("click", ".mqc_table_sortHighlight", function (e) {
       e.preventDefault();
       var target = $(this).data("target");
       // collect highlighted rows
@@ -275,7 +253,7 @@ $(function () {
   $("#tableScatterForm").submit(function (e) {
     e.preventDefault();
   });
-  $(".mqc_table_makeScatter").click(function (e) {
+  $(document).on("click", ".mqc_table_makeScatter", function (e) {
     // Reset dropdowns
     if ($("#tableScatter_tid").val() != $(this).data("table")) {
       $("#tableScatter_col1, #tableScatter_col2").html('<option value="">Select Column</option>');
@@ -371,6 +349,41 @@ $(function () {
   });
 });
 
+// Set up the tables in container: sortable, with fixed headers and tooltips
+function mqc_table_init(container) {
+  // Enable tablesorter on MultiQC tables
+  var strip_non_numeric = function (node) {
+    return node.innerText.replace(/[^\d.-]/g, "");
+  };
+  $(container).find(".mqc_table").tablesorter({ sortInitialOrder: "desc", textExtraction: strip_non_numeric });
+
+  // Make table headers fixed when table body scrolls (use CSS transforms)
+  // http://stackoverflow.com/a/25902860/713980
+  $(container)
+    .find(".mqc-table-responsive")
+    .scroll(function () {
+      $(this)
+        .find("thead")
+        .css("transform", "translate(0," + $(this).scrollTop() + "px)");
+    });
+
+  // Table header-specific bootstrap tooltips
+  $(container).find(".mqc_table_tooltip").tooltip({ container: "body" });
+
+  // Make rows in MultiQC tables sortable
+  $(container)
+    .find(".mqc_table.mqc_sortable tbody")
+    .sortable({
+      handle: ".sorthandle",
+      helper: function fixWidthHelper(e, ui) {
+        ui.children().each(function () {
+          $(this).width($(this).width());
+        });
+        return ui;
+      },
+    });
+}
+
 // Reorder columns in MultiQC tables.
 // Note: Don't have to worry about floating headers, as 'Configure Columns'
 // button is only visible when this is hidden. Ace!
@@ -97,7 +97,7 @@ $(function () {
   });
 
   // Hide toolbox when a modal is shown
-  $(".modal").on("show.bs.modal", function (e) {
+  $(document).on("show.bs.modal", ".modal", function (e) {
     if ($(".mqc-toolbox").hasClass("active")) {
       mqc_toolbox_openclose(undefined, false);
     }
@@ -0,0 +1,13 @@
+"""
+=================
+ quartet_metrics
+=================
+
+Writes the metrics recorded by a --metrics-only run as JSON
+(see quartet_dnaseq_report.utils.metrics) instead of an HTML report.
+
+"""
+import os
+
+template_dir = os.path.dirname(__file__)
+base_fn = 'base.html'
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+""" Shape-preserving downsampling of line graph series
+
+Long series, such as the Qualimap coverage and insert size histograms of
+deep WGS runs, are cut down to a budget of points per series with
+largest-triangle-three-buckets (LTTB). Unlike striding or binning, LTTB
+keeps the peaks and the tails of a curve. Series are cut down before they
+are handed to linegraph.plot, so the interactive plots, the flat exports
+and the data files all get the same points.
+
+    quartet_dnaseq_report_config:
+      plot_points: 1000            # points per series, 0 to keep every point
+"""
+
+import contextlib
+import math
+
+import numpy as np
+from multiqc.utils import config
+
+DEFAULT_POINTS = 1000
+
+
+def point_budget():
+    return getattr(config, 'quartet_dnaseq_report_config', {}).get('plot_points', DEFAULT_POINTS)
+
+
+def lttb(x, y, n):
+    """ Indices of the n points of the curve (x, y), x ascending, that LTTB keeps """
+    length = len(x)
+    if n >= length or n < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # The first and last points are always kept, the others are split into n - 2 buckets
+    every = (length - 2) / (n - 2)
+    kept = np.empty(n, dtype=int)
+    kept[0] = 0
+    kept[-1] = length - 1
+    a = 0
+    for i in range(n - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        # Average of the next bucket, or the last point
+        next_end = min(int(math.floor((i + 2) * every)) + 1, length)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Keep the point of this bucket spanning the largest triangle with the
+        # previously kept point and the average of the next bucket
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def decimate_pairs(pairs, n):
+    """ [[x, y], ...] sorted by x, cut down to n pairs """
+    if n is None or n <= 0 or len(pairs) <= n:
+        return pairs
+    try:
+        xy = np.array(pairs, dtype=float)
+    except (TypeError, ValueError):
+        # Missing values or categories, keep every point
+        return pairs
+    if xy.ndim != 2 or np.isnan(xy).any():
+        return pairs
+    return [pairs[i] for i in lttb(xy[:, 0], xy[:, 1], n)]
+
+
+def decimate_series(data, n=None):
+    """ {s_name: {x: y}} with every series cut down to n points (default: the configured budget) """
+    n = point_budget() if n is None else n
+    if not n:
+        return data
+    decimated = dict()
+    for s_name, series in data.items():
+        pairs = decimate_pairs(sorted(series.items()), n)
+        decimated[s_name] = series if len(pairs) == len(series) else dict(pairs)
+    return decimated
+
+
+def decimate_datasets(data, n=None):
+    """ The data of linegraph.plot, {s_name: {x: y}} or a list of them, cut down to n points per series """
+    if isinstance(data, list):
+        return [decimate_series(d, n) for d in data]
+    return decimate_series(data, n)
+
+
+class DecimatingLinegraph(object):
+    """ Stands in for multiqc.plots.linegraph in code that plots the series
+    itself, cutting every series down before it is plotted. linegraph
+    loads matplotlib, so it is only imported once something is plotted """
+
+    def __init__(self, n=None):
+        self.n = n
+
+    def plot(self, data, pconfig=None):
+        from multiqc.plots import linegraph
+        return linegraph.plot(decimate_datasets(data, self.n), pconfig)
+
+    def __getattr__(self, name):
+        from multiqc.plots import linegraph
+        return getattr(linegraph, name)
+
+
+@contextlib.contextmanager
+def decimated_plots(module, n=None):
+    """ Cut down the series module (e.g. QM_BamQC) plots with its linegraph
+    import while in the block. It needs its data in full for what it computes
+    from it, such as the cumulative coverage. """
+    original = module.linegraph
+    module.linegraph = DecimatingLinegraph(n)
+    try:
+        yield
+    finally:
+        module.linegraph = original
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+""" Streaming parser for FastQC fastqc_data.txt reports
+
+Only the sections the pre-alignment QC module uses are parsed, every other
+section is skipped line by line without being split. Each parsed section is
+a dict of column name -> NumPy array, with position ranges such as '10-14'
+replaced by their midpoint. Cells that are not numbers become NaN, and rows
+without a readable position are left out.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Parsed sections and their columns holding base pair ranges
+SECTIONS = {
+    'per_base_sequence_quality': 'base',
+    'per_sequence_gc_content': None,
+    'sequence_length_distribution': 'length',
+}
+
+
+def value(v):
+    try:
+        return float(v)
+    except ValueError:
+        return v
+
+
+def to_float(values):
+    """ values as a float array, NaN for the cells that are not numbers """
+    values = np.asarray(values, dtype=str)
+    try:
+        return values.astype(float)
+    except ValueError:
+        return np.array([v if isinstance(v, float) else np.nan for v in map(value, values)], dtype=float)
+
+
+def avg_bp_from_range(bp):
+    """ Midpoints of FastQC base pair ranges (eg. 10-15), plain positions are
+    kept. NaN for positions that can't be read """
+    split = np.char.partition(np.asarray(bp, dtype=str), '-')
+    start = to_float(split[:, 0])
+    end = to_float(np.where(split[:, 1] == '-', split[:, 2], split[:, 0]))
+    return start + (end - start) / 2
+
+
+def section_arrays(section, headers, rows):
+    """ One array per column of a parsed section """
+    columns = list(zip(*rows)) if rows else [[] for _ in headers]
+    arrays = {}
+    for header, values in zip(headers, columns):
+        if header == SECTIONS[section]:
+            arrays[header] = avg_bp_from_range(values)
+        else:
+            arrays[header] = to_float(values)
+    position = SECTIONS[section]
+    if position in arrays:
+        readable = ~np.isnan(arrays[position])
+        if not readable.all():
+            logger.warning('Skipping {} rows of {} without a readable {}'.format(
+                int((~readable).sum()), section, position))
+            arrays = {header: values[readable] for header, values in arrays.items()}
+        arrays[position] = arrays[position].astype(int)
+    return arrays
+
+
+def parse_fastqc(lines):
+    """ Parse the lines of a fastqc_data.txt.
+
+    Returns a dict with the status of every module under 'statuses', the
+    'basic_statistics' as a dict and the columns of every section in SECTIONS
+    that the report contains. """
+    data = {'statuses': dict(), 'basic_statistics': dict()}
+    section = None
+    headers = None
+    rows = None
+    for l in lines:
+        l = l.rstrip('\r\n')
+        if l == '>>END_MODULE':
+            if rows is not None:
+                data[section] = section_arrays(section, headers, rows)
+            section = headers = rows = None
+        elif l.startswith('>>'):
+            (section, status) = l[2:].split('\t', 1)
+            section = section.lower().replace(' ', '_')
+            data['statuses'][section] = status
+        elif section == 'basic_statistics':
+            if not l.startswith('#'):
+                measure, v = l.split('\t', 1)
+                data['basic_statistics'][measure] = value(v)
+        elif section in SECTIONS:
+            if l.startswith('#'):
+                headers = [s.lower().replace(' ', '_') for s in l[1:].split('\t')]
+                rows = []
+            elif rows is not None:
+                rows.append(l.split('\t'))
+        elif l.startswith('#Total Deduplicated Percentage'):
+            data['basic_statistics']['total_deduplicated_percentage'] = float(l.split('\t')[1])
+
+    # Calculate the average sequence length (Basic Statistics gives a range)
+    lengths = data.get('sequence_length_distribution')
+    if lengths is not None and lengths['count'].sum() > 0:
+        data['basic_statistics']['avg_sequence_length'] = \
+            float((lengths['count'] * lengths['length']).sum() / lengths['count'].sum())
+    return data
+
+
+def parse_fastqc_file(path):
+    """ Parse an unzipped fastqc_data.txt """
+    with io.open(path, 'r', encoding='utf-8') as fh:
+        return parse_fastqc(fh)
+
+
+def parse_fastqc_zip(path):
+    """ Parse the fastqc_data.txt of a FastQC zip straight from the compressed stream.
+
+    Raises zipfile.BadZipFile (or OSError) for unreadable zips and KeyError
+    if the zip holds no fastqc_data.txt. """
+    with zipfile.ZipFile(path) as fqc_zip:
+        # FastQC zip files should have just one directory inside, containing report
+        d_name = fqc_zip.namelist()[0]
+        with fqc_zip.open(os.path.join(d_name, 'fastqc_data.txt')) as fh:
+            return parse_fastqc(io.TextIOWrapper(fh, encoding='utf-8'))
+
+
+class PositionMatrix(object):
+    """ One section of many FastQC reports as a samples x positions matrix.
+
+    values[i, j] is the value of samples[i] at positions[j], NaN where that
+    sample has no such position. """
+
+    def __init__(self, samples, positions, values):
+        self.samples = samples
+        self.positions = positions
+        self.values = values
+
+    @classmethod
+    def from_reports(cls, reports, section, x, y):
+        """ Matrix of column y against column x of a section, for every
+        report in the {s_name: parsed} dict that has the section """
+        samples = [s_name for s_name, parsed in reports.items() if section in parsed]
+        columns = [reports[s_name][section] for s_name in samples]
+        positions = np.unique(np.concatenate([c[x] for c in columns])) if columns else np.array([])
+        values = np.full((len(samples), len(positions)), np.nan)
+        for i, c in enumerate(columns):
+            values[i, np.searchsorted(positions, c[x])] = c[y]
+        return cls(samples, positions, values)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def totals(self):
+        return np.nansum(self.values, axis=1)
+
+    def percentages(self):
+        """ Every sample scaled to percentages of its total, 0 where the total is 0 """
+        totals = self.totals()[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(totals == 0, 0, self.values / totals * 100)
+        values[np.isnan(self.values)] = np.nan
+        return PositionMatrix(self.samples, self.positions, values)
+
+    def series(self):
+        """ {s_name: {position: value}} as MultiQC line graphs take it """
+        positions = self.positions.tolist()
+        present = ~np.isnan(self.values)
+        if present.all():
+            return {s_name: dict(zip(positions, row)) for s_name, row in zip(self.samples, self.values.tolist())}
+        return {s_name: dict(zip(self.positions[mask].tolist(), row[mask].tolist()))
+                for s_name, row, mask in zip(self.samples, self.values, present)}
+
+
+def parse_fastqc_zips(paths, workers=1):
+    """ Parse many FastQC zips over a pool of up to `workers` processes.
+
+    Returns one (parsed, error) tuple per path, in the order of paths, where
+    error is the exception parse_fastqc_zip raised for that zip or None. """
+    workers = min(workers, len(paths))
+    if workers <= 1:
+        return [_parse_or_error(p) for p in paths]
+    # Forking while other threads (e.g. parallel modules) hold locks is unsafe
+    context = multiprocessing.get_context('spawn') if threading.active_count() > 1 else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(parse_fastqc_zip, p) for p in paths]
+        results = []
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append((None, e))
+    return results
+
+
+def _parse_or_error(path):
+    try:
+        return parse_fastqc_zip(path), None
+    except Exception as e:
+        return None, e
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+""" Plotly figure dicts built without plotly.express
+
+px.scatter validates every trace and layout property through plotly's
+graph objects, which makes a figure slow to build and to serialise. The
+builders here write the same trace and layout dicts px would, directly
+from the NumPy columns, and keep the numeric data numeric.
+"""
+
+import json
+
+import numpy as np
+
+# Subplot domains px uses for a scatter plot with box plots on both margins
+MAIN_X_DOMAIN = [0.0, 0.7363]
+MAIN_Y_DOMAIN = [0.0, 0.7326]
+MARGINAL_X_DOMAIN = [0.7413, 1.0]
+MARGINAL_Y_DOMAIN = [0.7426, 1.0]
+
+# Serialised plotly templates, by name
+_templates = {}
+
+
+def template(name):
+    """ Layout template `name` as px embeds it in a figure """
+    if name not in _templates:
+        import plotly.io as pio
+        from plotly.utils import PlotlyJSONEncoder
+        _templates[name] = json.loads(json.dumps(pio.templates[name].to_plotly_json(), cls=PlotlyJSONEncoder))
+    return _templates[name]
+
+
+def marginal_axes():
+    """ Axes of the main scatter plot (x, y), the box plots of y (x2, y2)
+    and of x (x3, y3), and the empty corner (x4, y4) """
+    hidden = {'showticklabels': False, 'showline': False, 'ticks': '', 'showgrid': False}
+    return {
+        'xaxis': {'anchor': 'y', 'domain': MAIN_X_DOMAIN},
+        'yaxis': {'anchor': 'x', 'domain': MAIN_Y_DOMAIN},
+        'xaxis2': dict({'anchor': 'y2', 'domain': MARGINAL_X_DOMAIN, 'matches': 'x2'}, **hidden),
+        'yaxis2': {'anchor': 'x2', 'domain': MAIN_Y_DOMAIN, 'matches': 'y', 'showticklabels': False, 'showgrid': True},
+        'xaxis3': {'anchor': 'y3', 'domain': MAIN_X_DOMAIN, 'matches': 'x', 'showticklabels': False, 'showgrid': True},
+        'yaxis3': dict({'anchor': 'x3', 'domain': MARGINAL_Y_DOMAIN, 'matches': 'y3'}, **hidden),
+        'xaxis4': dict({'anchor': 'y4', 'domain': MARGINAL_X_DOMAIN, 'matches': 'x2'}, **hidden),
+        'yaxis4': dict({'anchor': 'x4', 'domain': MARGINAL_Y_DOMAIN, 'matches': 'y3'}, **dict(hidden, showgrid=True)),
+    }
+
+
+def scatter_marginal_boxes(data, x, y, color, hover, color_map, symbol_map, title=None, marker=None, hover_format=':.4f'):
+    """ Figure dict of px.scatter(data, x, y, color=color, symbol=color,
+    marginal_x='box', marginal_y='box', hover_data=[x, y, hover]): a scatter
+    trace and two box plot traces per group, in order of appearance """
+    groups = data[color].to_numpy()
+    xs = np.asarray(data[x], dtype=float)
+    ys = np.asarray(data[y], dtype=float)
+    labels = data[hover].to_numpy()
+
+    traces = []
+    for group in dict.fromkeys(groups):
+        selected = groups == group
+        gx = xs[selected].tolist()
+        gy = ys[selected].tolist()
+        customdata = [[label] for label in labels[selected].tolist()]
+        group_marker = dict({'color': color_map[group], 'symbol': symbol_map[group]}, **(marker or {}))
+        x_hover = '{}=%{{x{}}}'.format(x, hover_format)
+        y_hover = '{}=%{{y{}}}'.format(y, hover_format)
+        hover_tail = '{}=%{{customdata[0]}}<extra></extra>'.format(hover)
+        group_hover = '{}={}'.format(color, group)
+        box = {'alignmentgroup': 'True', 'customdata': customdata, 'legendgroup': group, 'marker': group_marker,
+               'name': group, 'notched': True, 'offsetgroup': group, 'showlegend': False}
+        traces.append({
+            'customdata': customdata,
+            'hovertemplate': '<br>'.join([group_hover, x_hover, y_hover, hover_tail]),
+            'legendgroup': group, 'marker': group_marker, 'mode': 'markers', 'name': group,
+            'orientation': 'v', 'showlegend': True,
+            'x': gx, 'xaxis': 'x', 'y': gy, 'yaxis': 'y', 'type': 'scatter'
+        })
+        traces.append(dict(box, hovertemplate='<br>'.join([group_hover, x_hover, hover_tail]),
+                           x=gx, xaxis='x3', yaxis='y3', type='box'))
+        traces.append(dict(box, hovertemplate='<br>'.join([group_hover, y_hover, hover_tail]),
+                           xaxis='x2', y=gy, yaxis='y2', type='box'))
+
+    layout = marginal_axes()
+    layout['xaxis']['title'] = {'text': x}
+    layout['yaxis']['title'] = {'text': y}
+    layout['legend'] = {'title': {'text': color}, 'tracegroupgap': 0}
+    # px leaves room for a title it wasn't given
+    if title:
+        layout['title'] = {'text': title}
+    else:
+        layout['margin'] = {'t': 60}
+    return {'data': traces, 'layout': layout}
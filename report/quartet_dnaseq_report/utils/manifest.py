@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+""" File discovery driven by a manifest instead of a directory walk
+
+A staging step that already knows where the input files are can list them
+by search key in a quartet_manifest.json at the top of every analysis
+directory:
+
+    {"conclusion/precision_recall_summary": ["call-extract_tables/variants.calling.qc.txt"],
+     "pre_alignment_qc/fastqc_zip": ["call-fastqc_D5/D5_R1_fastqc.zip", ...]}
+
+Relative paths are relative to the manifest. MultiQC then only searches
+the manifests themselves, and the listed files are handed to the modules
+as if the search had found them. A manifest lists every search key of
+shared/search_patterns.json (see utils.search_patterns), with no files if
+none were staged; nothing is searched for a key it leaves out.
+
+    quartet_dnaseq_report_config:
+      manifest: True               # set to False to always walk the analysis directories
+"""
+
+import json
+import logging
+import os
+
+from multiqc.utils import config, report
+
+from quartet_dnaseq_report.utils import search_patterns
+
+MANIFEST_FN = 'quartet_manifest.json'
+
+logger = logging.getLogger(__name__)
+
+# Analysis directories replaced by their manifests in this run
+walked_dirs = None
+
+
+def enabled():
+    return getattr(config, 'quartet_dnaseq_report_config', {}).get('manifest', True)
+
+
+def find_manifests(dirs):
+    """ Manifest of every analysis directory, or None unless all of them have one """
+    manifests = [os.path.join(d, MANIFEST_FN) for d in dirs]
+    if len(manifests) == 0 or not all(os.path.isfile(m) for m in manifests):
+        return None
+    return manifests
+
+
+def read_manifest(path):
+    """ {search key: [(root, fn)]} of a manifest """
+    with open(path) as fh:
+        manifest = json.load(fh)
+    base = os.path.dirname(os.path.abspath(path))
+    files = dict()
+    for key, paths in manifest.items():
+        files[key] = [os.path.split(os.path.normpath(os.path.join(base, p))) for p in paths]
+    return files
+
+
+def use_manifests():
+    """ Make MultiQC search the manifests only, when every analysis directory has one """
+    global walked_dirs
+    walked_dirs = None
+    if not enabled():
+        return None
+    manifests = find_manifests(config.analysis_dir)
+    if manifests is None:
+        return None
+    logger.info('Reading the input files from {} instead of searching for them'.format(', '.join(manifests)))
+    walked_dirs = config.analysis_dir
+    config.analysis_dir = manifests
+
+
+def add_manifest_files():
+    """ Add the files listed in the manifests to report.files, once MultiQC has searched """
+    global walked_dirs
+    if walked_dirs is None:
+        return None
+    manifests = config.analysis_dir
+    config.analysis_dir = walked_dirs
+    walked_dirs = None
+    # Search keys of the modules that run
+    expected = [key for key in search_patterns.load() if key in report.files]
+    for path in manifests:
+        try:
+            files = read_manifest(path)
+        except (OSError, ValueError) as e:
+            logger.error("Couldn't read the manifest {}: {}".format(path, e))
+            continue
+        for key in expected:
+            if key not in files:
+                logger.error('The manifest {} has no entry for the search key {}, no files are used for it'.format(path, key))
+        for key, found in files.items():
+            # Search keys of modules that don't run are left out, like MultiQC does
+            if key not in report.files:
+                logger.debug('Ignoring search key {} of the manifest {}'.format(key, path))
+                continue
+            for root, fn in found:
+                if not os.path.isfile(os.path.join(root, fn)):
+                    logger.warning('File listed in the manifest {} not found: {}'.format(path, os.path.join(root, fn)))
+                    continue
+                report.files[key].append({'fn': fn, 'root': root})
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+""" Metrics of a --metrics-only run
+
+With --metrics-only the modules still compute their scores, ranks,
+performance tiers and detail tables, but record them here instead of
+rendering tables and plots. The quartet_metrics template then writes all of
+them as one JSON file in place of the HTML report:
+
+    {module anchor: {section id: data}}
+"""
+
+import json
+import math
+import threading
+
+from multiqc.utils import config
+
+TEMPLATE = 'quartet_metrics'
+
+# Recorded metrics of this run: {module: {name: data}}
+collected = dict()
+collected_lock = threading.Lock()
+
+
+def enabled():
+    return config.kwargs.get('metrics_only', False)
+
+
+def add(module, name, data):
+    """ Record data (dicts, lists, scalars, NumPy or pandas objects) under module and name """
+    with collected_lock:
+        collected.setdefault(module, dict())[name] = data
+
+
+def clear():
+    with collected_lock:
+        collected.clear()
+
+
+def to_json(obj):
+    """ NumPy and pandas values, told apart by their methods so that runs which
+    don't record metrics don't have to import either """
+    if hasattr(obj, 'to_dict'):
+        # DataFrames become a list of records, Series a dict
+        return obj.to_dict('records') if hasattr(obj, 'columns') else obj.to_dict()
+    if hasattr(obj, 'tolist'):
+        # Arrays and NumPy scalars alike
+        return obj.tolist()
+    raise TypeError('{} is not JSON serializable'.format(type(obj).__name__))
+
+
+def clean(obj):
+    """ NaN and infinite floats become null, which JSON has no other way to say """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: clean(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [clean(v) for v in obj]
+    return obj
+
+
+def dumps():
+    """ All recorded metrics as JSON, with the modules in the configured order """
+    order = [list(m.keys())[0] if isinstance(m, dict) else m for m in config.module_order]
+    with collected_lock:
+        modules = sorted(collected, key=lambda m: order.index(m) if m in order else len(order))
+        data = {m: collected[m] for m in modules}
+    # Round trip through JSON to turn NumPy and pandas values into plain ones first
+    data = clean(json.loads(json.dumps(data, default=to_json)))
+    return json.dumps(data, indent=2, allow_nan=False)
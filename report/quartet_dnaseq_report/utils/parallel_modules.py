@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+""" Build the plugin modules in parallel processes
+
+    quartet_dnaseq_report_config:
+      parallel_modules: True       # or the number of processes
+
+The modules spend their time in pure Python and pandas, holding the GIL, so
+they are built in processes forked from the MultiQC run rather than in
+threads. A module only adds to the report: plot data, saved raw data,
+general statistics, data sources, lint errors and the plugin's plotly
+figures and metrics. Each process sends back what the report reads from the
+module and what building it added, and the parent merges that into its own
+report one module at a time, in the configured order. Data files are written straight to the
+shared temporary data directory.
+"""
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import multiprocessing
+import os
+import traceback
+
+from multiqc.utils import config, report
+
+from quartet_dnaseq_report.utils import metrics, plotly_bundle, plotly_data
+
+logger = logging.getLogger(__name__)
+
+# Report containers the modules and the MultiQC plot functions add to
+REPORT_DICTS = ['plot_data', 'saved_raw_data']
+REPORT_LISTS = ['general_stats_data', 'general_stats_headers', 'lint_errors']
+REPORT_COUNTERS = ['num_hc_plots', 'num_mpl_plots']
+
+# What MultiQC and the templates read from a module once it is built. The
+# rest of a module, its parsed data and helpers, stays in its process and
+# doesn't all pickle
+MODULE_ATTRIBUTES = ['name', 'anchor', 'href', 'info', 'comment', 'extra', 'mname', 'intro',
+                     'sections', 'css', 'js', 'doi', 'mod_cust_config']
+
+
+class ModuleBuildError(Exception):
+    """ A module failed in its process, with the traceback it failed with """
+
+
+def available():
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def report_state():
+    """ What the report and the plugin registries hold before a module is built """
+    return {
+        'dicts': {name: set(getattr(report, name)) for name in REPORT_DICTS},
+        'lists': {name: len(getattr(report, name)) for name in REPORT_LISTS},
+        'counters': {name: getattr(report, name) for name in REPORT_COUNTERS},
+        'data_sources': {(m, s, n) for m, sections in report.data_sources.items()
+                         for s, names in sections.items() for n in names},
+        'plotly_figures': set(plotly_data.figures),
+        'plotly_templates': set(plotly_data.templates),
+        'metrics': {(m, n) for m, names in metrics.collected.items() for n in names},
+    }
+
+
+def plain(data):
+    """ data with its defaultdicts, whose factories are often lambdas that don't pickle, as dicts """
+    if isinstance(data, defaultdict):
+        return {k: plain(v) for k, v in data.items()}
+    if isinstance(data, dict):
+        return type(data)((k, plain(v)) for k, v in data.items())
+    if isinstance(data, list):
+        return [plain(v) for v in data]
+    return data
+
+
+def report_additions(before):
+    """ What was added to the report and the plugin registries since before """
+    return plain({
+        'dicts': {name: {k: v for k, v in getattr(report, name).items() if k not in before['dicts'][name]}
+                  for name in REPORT_DICTS},
+        'lists': {name: getattr(report, name)[before['lists'][name]:] for name in REPORT_LISTS},
+        'counters': {name: getattr(report, name) - before['counters'][name] for name in REPORT_COUNTERS},
+        'data_sources': [(m, s, n, source) for m, sections in report.data_sources.items()
+                         for s, names in sections.items() for n, source in names.items()
+                         if (m, s, n) not in before['data_sources']],
+        'plotly_figures': {k: v for k, v in plotly_data.figures.items() if k not in before['plotly_figures']},
+        'plotly_templates': {k: v for k, v in plotly_data.templates.items() if k not in before['plotly_templates']},
+        'plotly_traces': set(plotly_bundle.trace_types),
+        'metrics': [(m, n, data) for m, names in metrics.collected.items() for n, data in names.items()
+                    if (m, n) not in before['metrics']],
+    })
+
+
+def merge(added):
+    """ Add what building a module added in its process to this report """
+    for name, items in added['dicts'].items():
+        container = getattr(report, name)
+        for k, v in items.items():
+            if k in container:
+                logger.warning('Two modules added {} to report.{}, keeping the first'.format(k, name))
+                continue
+            container[k] = v
+    for name, items in added['lists'].items():
+        getattr(report, name).extend(items)
+    for name, n in added['counters'].items():
+        setattr(report, name, getattr(report, name) + n)
+    for m, s, n, source in added['data_sources']:
+        report.data_sources.setdefault(m, dict()).setdefault(s, dict())[n] = source
+    with plotly_data.figures_lock:
+        plotly_data.figures.update(added['plotly_figures'])
+        plotly_data.templates.update(added['plotly_templates'])
+    with plotly_bundle.trace_types_lock:
+        plotly_bundle.trace_types.update(added['plotly_traces'])
+    for m, n, data in added['metrics']:
+        metrics.add(m, n, data)
+
+
+def portable(output):
+    """ Copy of a built module (or list of modules) holding only MODULE_ATTRIBUTES """
+    if isinstance(output, list):
+        return [portable(m) for m in output]
+    copy = object.__new__(type(output))
+    for attr in MODULE_ATTRIBUTES:
+        if attr in vars(output):
+            setattr(copy, attr, getattr(output, attr))
+    return copy
+
+
+def build_module(name, mod_cust_config):
+    """ Build a module like the MultiQC module loop does. Returns (output, error) """
+    try:
+        mod = config.avail_modules[name].load()
+        mod.mod_cust_config = mod_cust_config
+        return mod(), None
+    except UserWarning as e:
+        # No files found for the module, MultiQC skips it quietly
+        return None, e
+    except Exception:
+        # Exceptions don't all pickle, the traceback does
+        return None, ModuleBuildError(traceback.format_exc())
+
+
+def build_in_process(name, mod_cust_config):
+    """ Build a module in a pool process. Returns (output, error, additions) """
+    before = report_state()
+    output, error = build_module(name, mod_cust_config)
+    if output is not None:
+        output = portable(output)
+    return output, error, report_additions(before)
+
+
+def build_modules(modules, workers):
+    """ Build [(name, mod_cust_config)] over workers processes and merge
+    them into the report in order. Returns [(output, error)] """
+    built = []
+    context = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(build_in_process, name, c) for name, c in modules]
+        for (name, _), future in zip(modules, futures):
+            try:
+                output, error, added = future.result()
+            except Exception as e:
+                # The module was built, but couldn't be sent back
+                built.append((None, ModuleBuildError("Couldn't hand the {} module back: {}".format(name, e))))
+                continue
+            merge(added)
+            built.append((output, error))
+    return built
+
+
+def n_workers(setting, n_modules):
+    """ Number of processes for parallel_modules: True (one per module, up to the CPUs) or a number """
+    if setting is True:
+        return max(1, min(n_modules, os.cpu_count() or 1))
+    return int(setting)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+""" On-disk cache of parsed input files, shared by the report modules
+
+Parsed structures are pickled under <reference_cache_dir>/parse_cache, keyed
+by the kind of parse, the file path, size, mtime and inode, and the plugin
+version. The key only needs a stat of the file, so a hit doesn't read the
+input at all. Hits are touched, and the least recently used entries are
+evicted once the cache grows beyond its size limit.
+
+    quartet_dnaseq_report_config:
+      parse_cache: True            # set to False to always parse from scratch
+      parse_cache_size_mb: 512
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+from multiqc.utils import config
+
+logger = logging.getLogger(__name__)
+
+
+def cache_config():
+    return getattr(config, 'quartet_dnaseq_report_config', {})
+
+
+def enabled():
+    return cache_config().get('parse_cache', True)
+
+
+def parse_cache_dir():
+    # The reference module loads pandas, which runs that don't parse anything can do without
+    from quartet_dnaseq_report.utils.reference import cache_dir
+    return os.path.join(cache_dir(), 'parse_cache')
+
+
+def cache_key(kind, path):
+    """ Key of a parse of path, changing with the file and with the plugin version """
+    stat = os.stat(path)
+    identity = '\0'.join([kind, os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns),
+                          str(stat.st_ino), getattr(config, 'quartet_dnaseq_report_version', '')])
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def load(key):
+    """ Returns (True, value) on a hit and (False, None) otherwise """
+    path = os.path.join(parse_cache_dir(), key + '.pickle')
+    try:
+        with open(path, 'rb') as fh:
+            value = pickle.load(fh)
+    except FileNotFoundError:
+        return False, None
+    except Exception as e:
+        logger.debug('Ignoring unreadable parse cache entry {}: {}'.format(path, e))
+        return False, None
+    try:
+        # Mark as recently used
+        os.utime(path)
+    except OSError:
+        pass
+    return True, value
+
+
+def save(key, value):
+    dest = parse_cache_dir()
+    path = os.path.join(dest, key + '.pickle')
+    try:
+        os.makedirs(dest, exist_ok=True)
+        tmp = '%s.%s.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        evict(dest, cache_config().get('parse_cache_size_mb', 512) * 1024 * 1024)
+    except (OSError, pickle.PicklingError) as e:
+        logger.debug("Couldn't write the parse cache entry {}: {}".format(path, e))
+
+
+def evict(dest, max_bytes):
+    """ Remove the least recently used entries until the cache fits into max_bytes """
+    entries = []
+    for fn in os.listdir(dest):
+        if fn.endswith('.pickle'):
+            try:
+                stat = os.stat(os.path.join(dest, fn))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, fn))
+    total = sum(size for _, size, _ in entries)
+    for _, size, fn in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(dest, fn))
+        except OSError:
+            pass
+        total -= size
+
+
+def cached(kind, path, parse, *args):
+    """ parse(path, *args), answered from the cache when path is unchanged.
+
+    kind names the parse and must change whenever parse(path) can return
+    something else for the same file. """
+    if not enabled():
+        return parse(path, *args)
+    try:
+        key = cache_key(kind, path)
+    except OSError:
+        return parse(path, *args)
+    hit, value = load(key)
+    if not hit:
+        value = parse(path, *args)
+        save(key, value)
+    return value
+
+
+def cached_many(kind, paths, parse_many, *args):
+    """ Like cached() for parse_many(paths, *args), which returns one
+    (value, error) tuple per path. Only the paths missing from the cache are
+    passed on to parse_many, and errors are not cached. """
+    if not enabled():
+        return parse_many(paths, *args)
+    results = [None] * len(paths)
+    keys = [None] * len(paths)
+    misses = []
+    for i, path in enumerate(paths):
+        try:
+            keys[i] = cache_key(kind, path)
+        except OSError:
+            misses.append(i)
+            continue
+        hit, value = load(keys[i])
+        if hit:
+            results[i] = (value, None)
+        else:
+            misses.append(i)
+    if misses:
+        for i, (value, error) in zip(misses, parse_many([paths[i] for i in misses], *args)):
+            results[i] = (value, error)
+            if error is None and keys[i] is not None:
+                save(keys[i], value)
+    return results
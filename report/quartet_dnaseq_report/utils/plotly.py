@@ -1,61 +1,73 @@
 #!/usr/bin/env python
 """ MultiQC functions to use plotly library """
 
+import json
 import logging
 import base64
-from plotly.io import to_json
 from multiqc.utils import report
 
+from quartet_dnaseq_report.utils import plotly_bundle, plotly_data
+
 logger = logging.getLogger(__name__)
 
 
-def fig_to_json_html(fig, pconfig):
+def merge_layout(layout, updates):
+    """ Recursively merge layout updates into a copy of a layout dict """
+    merged = dict(layout)
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_layout(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def fig_to_dict(fig, pconfig):
+    """ fig is either a plotly Figure or an already serialisable figure dict,
+    which is used as it is, without plotly validating it again """
+    updates = dict()
     if pconfig.get('auto_margin'):
-        fig.update_layout(margin=dict(l=40, r=20, t=40, b=40))
+        updates['margin'] = dict(l=40, r=20, t=40, b=40)
 
     if pconfig.get('ylab'):
-        fig.update_layout(yaxis=dict(title_text=pconfig['ylab']))
+        updates['yaxis'] = dict(title=dict(text=pconfig['ylab']))
 
     if pconfig.get('xlab'):
-        fig.update_layout(xaxis=dict(title_text=pconfig['xlab']))
+        updates['xaxis'] = dict(title=dict(text=pconfig['xlab']))
 
     if pconfig.get('title'):
-        fig.update_layout(title_text=pconfig['title'], title_x=0.5)
+        updates['title'] = dict(text=pconfig['title'], x=0.5)
+
+    from plotly.io import to_json
 
-    json_str = to_json(fig)
-    html = '<script id="{id}" type="text/json">{json}</script>'.format(
-        id=pconfig['data_id'], json=json_str)
-    return html
+    if isinstance(fig, dict):
+        fig = dict(fig, layout=merge_layout(fig.get('layout', {}), updates))
+        return json.loads(to_json(fig, validate=False))
+    fig.update_layout(**updates)
+    return json.loads(to_json(fig))
 
 
 def plot(fig, pconfig):
-    data_html = fig_to_json_html(fig, pconfig)
+    """ plotly and the figure data are embedded once per report by the
+    template, see utils/plotly_bundle.py and utils/plotly_data.py """
+    plotly_bundle.add_figure(fig)
+    plotly_data.add(pconfig['data_id'], fig_to_dict(fig, pconfig))
     html = '''
-  <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
   <div class="hc-plot-wrapper">
     <div id="{id}" class="hc-plot not_rendered">
       <small>loading..</small>
     </div>
   </div>
-  {data_html}
   <script type="text/javascript">
-    var figure = JSON.parse($("#{data_id}").html());
-    figure.layout.autosize = true
-    Plotly.newPlot("{id}", figure.data, figure.layout);
-    // When plotly is working, hide something
-    $("#{id}").removeClass("not_rendered");
-    $("#{id} small").hide();
-    // update the layout to expand to the available size
-    // when the window is resized
-    window.onresize = function() {{
-      $(".js-plotly-plot").each(function () {{
-        const id = $(this).attr('id');
-        Plotly.relayout(id, {{
-          "xaxis.autorange": true,
-          "yaxis.autorange": true
-        }});
-      }})
-    }};
+    // Drawn once it scrolls into view, and resized by multiqc.js
+    quartet_render_when_visible(document.getElementById("{id}"), function () {{
+      var figure = quartet_plotly_figure("{data_id}");
+      figure.layout.autosize = true;
+      Plotly.newPlot("{id}", figure.data, figure.layout);
+      // When plotly is working, hide something
+      $("#{id}").removeClass("not_rendered");
+      $("#{id} small").hide();
+    }});
   </script>
-  '''.format(id=pconfig['id'], data_id=pconfig['data_id'], data_html=data_html)
+  '''.format(id=pconfig['id'], data_id=pconfig['data_id'])
     return html
\ No newline at end of file
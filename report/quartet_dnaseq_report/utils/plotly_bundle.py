@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+""" The single plotly.js build embedded in a report
+
+Each report embeds one local plotly.js, the smallest of BUNDLES that
+supports every trace type of its plotly figures, and none at all when it
+has no plotly figure. plotly-quartet.min.js is plotly-latest.min.js trimmed
+to the traces the report modules draw:
+
+    make plotly-bundle
+"""
+
+import threading
+
+# Template paths of the local builds, smallest first, and the trace types they support (None: all)
+BUNDLES = [
+    ('assets/js/packages/plotly-quartet.min.js', {'scatter', 'box', 'heatmap'}),
+    ('assets/js/packages/plotly-latest.min.js', None),
+]
+
+# Trace types of the plotly figures in this run
+trace_types = set()
+trace_types_lock = threading.Lock()
+
+
+def clear():
+    with trace_types_lock:
+        trace_types.clear()
+
+
+def add_figure(fig):
+    """ Record the trace types of a plotly Figure or figure dict """
+    if isinstance(fig, dict):
+        types = [trace.get('type', 'scatter') for trace in fig.get('data', [])]
+    else:
+        types = [trace.type for trace in fig.data]
+    with trace_types_lock:
+        trace_types.update(types)
+
+
+def bundle():
+    """ Template path of the build to embed, or None without plotly figures """
+    with trace_types_lock:
+        used = set(trace_types)
+    if len(used) == 0:
+        return None
+    for path, supported in BUNDLES:
+        if supported is None or used <= supported:
+            return path
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+""" Compact, compressed data of the plotly figures of a report
+
+Like the Highcharts data in mqc_compressed_plotdata, the plotly figures
+are no longer embedded one by one as plain JSON. They are gathered here and
+written once, lz-string compressed, to quartet_plotly_compressed:
+
+    {"templates": {key: layout template},
+     "figures": {data_id: {"data": [...], "layout": {...}, "template": key}}}
+
+Layout templates are stored once, however many figures use them, and
+numeric arrays become {"dtype": "f4" or "i4", "bdata": base64}, little
+endian, with floats rounded to single precision. multiqc.js decodes them
+again with quartet_plotly_figure(data_id).
+"""
+
+import base64
+import hashlib
+import json
+import threading
+
+import numpy as np
+from multiqc.utils import report
+
+# Shorter arrays are left as they are
+MIN_PACKED_LENGTH = 8
+INT32 = np.iinfo(np.int32)
+
+# Figures of this run: {data_id: figure} and the templates they use: {key: template}
+figures = dict()
+templates = dict()
+figures_lock = threading.Lock()
+
+
+def clear():
+    with figures_lock:
+        figures.clear()
+        templates.clear()
+
+
+def pack(values):
+    """ {'dtype', 'bdata'} of a list of numbers, or None if it is not one """
+    if len(values) < MIN_PACKED_LENGTH:
+        return None
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    if all(isinstance(v, int) for v in values) and INT32.min <= min(values) and max(values) <= INT32.max:
+        array, dtype = np.asarray(values, dtype='<i4'), 'i4'
+    else:
+        array, dtype = np.asarray(values, dtype='<f4'), 'f4'
+    return {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def compact(obj):
+    """ obj with its numeric arrays packed """
+    if isinstance(obj, dict):
+        return {k: compact(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        packed = pack(obj)
+        if packed is not None:
+            return packed
+        return [compact(v) for v in obj]
+    return obj
+
+
+def add(data_id, figure):
+    """ Add a JSON-serialisable figure dict to the report """
+    figure = compact(figure)
+    layout = dict(figure.get('layout', {}))
+    template = layout.pop('template', None)
+    figure = dict(figure, layout=layout)
+    with figures_lock:
+        if template is not None:
+            key = hashlib.md5(json.dumps(template, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+            templates.setdefault(key, template)
+            figure['template'] = key
+        figures[data_id] = figure
+
+
+def data_ids():
+    with figures_lock:
+        return list(figures)
+
+
+def compressed(data_ids=None):
+    """ The figures data_ids (default: all figures of the run) and their
+    templates, compressed as MultiQC compresses its plot data """
+    with figures_lock:
+        selected = {did: figures[did] for did in (figures if data_ids is None else data_ids)}
+        used = {f['template'] for f in selected.values() if 'template' in f}
+        return report.compress_json({'templates': {k: v for k, v in templates.items() if k in used},
+                                     'figures': selected})
@@ -5,14 +5,9 @@ from __future__ import absolute_import
 from collections import OrderedDict
 
 from plotly import exceptions, optional_imports
-from plotly.graph_objs import graph_objs
-import plotly.figure_factory._dendrogram as dd
 
-# Optional imports, may be None for users that only use our core functionality.
-np = optional_imports.get_module("numpy")
-scp = optional_imports.get_module("scipy")
-sch = optional_imports.get_module("scipy.cluster.hierarchy")
-scs = optional_imports.get_module("scipy.spatial")
+# Built on first use, plotly's dendrogram module loads scipy when it is imported
+Dendrogram = None
 
 
 def create_dendrogram(
@@ -21,7 +16,7 @@ def create_dendrogram(
     labels=None,
     colorscale=None,
     distfun=None,
-    linkagefun=lambda x: sch.linkage(x, "complete"),
+    linkagefun=None,
     hovertext=None,
     color_threshold=None,
 ):
@@ -61,6 +56,10 @@ def create_dendrogram(
     >>> fig = create_dendrogram(df, labels=Index)
     >>> fig.show()
     """
+    # Optional imports, loaded here rather than along with the report modules
+    scp = optional_imports.get_module("scipy")
+    sch = optional_imports.get_module("scipy.cluster.hierarchy")
+    scs = optional_imports.get_module("scipy.spatial")
     if not scp or not scs or not sch:
         raise ImportError(
             "FigureFactory.create_dendrogram requires scipy, \
@@ -73,8 +72,12 @@ def create_dendrogram(
 
     if distfun is None:
         distfun = scs.distance.pdist
+    if linkagefun is None:
+        linkagefun = lambda x: sch.linkage(x, "complete")
 
-    dendrogram = Dendrogram(
+    from plotly.graph_objs import graph_objs
+
+    dendrogram = dendrogram_class()(
         X,
         orientation,
         labels,
@@ -88,38 +91,18 @@ def create_dendrogram(
     return graph_objs.Figure(data=dendrogram.data, layout=dendrogram.layout)
 
 
-class Dendrogram(dd._Dendrogram):
-    """Refer to FigureFactory.create_dendrogram() for docstring."""
+def dendrogram_class():
+    """plotly's _Dendrogram with our cluster colors."""
+    global Dendrogram
+    if Dendrogram is None:
+        import plotly.figure_factory._dendrogram as dd
 
-    def __init__(
-        self,
-        X,
-        orientation="bottom",
-        labels=None,
-        colorscale=None,
-        width=np.inf,
-        height=np.inf,
-        xaxis="xaxis",
-        yaxis="yaxis",
-        distfun=None,
-        linkagefun=lambda x: sch.linkage(x, "complete"),
-        hovertext=None,
-        color_threshold=None,
-    ):
-        super(Dendrogram, self).__init__(
-            X,
-            orientation=orientation,
-            labels=labels,
-            colorscale=colorscale,
-            width=width,
-            height=height,
-            xaxis=xaxis,
-            yaxis=yaxis,
-            distfun=distfun,
-            linkagefun=linkagefun,
-            hovertext=hovertext,
-            color_threshold=color_threshold,
-        )
+        Dendrogram = type("Dendrogram", (DendrogramColors, dd._Dendrogram), {})
+    return Dendrogram
+
+
+class DendrogramColors(object):
+    """Refer to FigureFactory.create_dendrogram() for docstring."""
 
     def get_color_dict(self, colorscale):
         """
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+""" Qualimap BamQC results read straight from their archives
+
+The Quartet DNA-Seq pipeline bundles every Qualimap output directory into a
+*qualimap.zip, which is a zip or a (compressed) tarball despite its name.
+Only the members the post-alignment QC module uses are read, into memory,
+so the archives no longer have to be extracted before the report is built.
+"""
+
+import os
+import tarfile
+import zipfile
+
+# Members read from an archive and the section they belong to
+MEMBERS = {
+    'genome_results.txt': 'genome_results',
+    'coverage_histogram.txt': 'coverage',
+    'insert_size_histogram.txt': 'insert_size',
+    'mapped_reads_gc-content_distribution.txt': 'gc_dist',
+}
+RAW_DATA_DIR = 'raw_data_qualimapReport'
+
+
+def section(name):
+    """ Section of an archive member, or None if the report does not use it """
+    fn = os.path.basename(name)
+    if fn == 'genome_results.txt':
+        return MEMBERS[fn]
+    if fn in MEMBERS and os.path.basename(os.path.dirname(name)) == RAW_DATA_DIR:
+        return MEMBERS[fn]
+    return None
+
+
+def read_members(path):
+    """ [(member name, text)] of the used members of a Qualimap archive, in archive order.
+
+    Raises zipfile.BadZipFile, tarfile.TarError or OSError for unreadable archives. """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(name, archive.read(name).decode('utf-8'))
+                    for name in archive.namelist() if section(name) is not None]
+    members = []
+    # Tarballs are read as a stream, in a single pass
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if member.isfile() and section(member.name) is not None:
+                members.append((member.name, archive.extractfile(member).read().decode('utf-8')))
+    return members
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+""" Readers for the variant calling results the Quartet modules are built on """
+
+import io
+import re
+import pandas as pd
+
+PRECISION_RECALL = ['SNV precision', 'INDEL precision', 'SNV recall', 'INDEL recall']
+# Quartet samples and the sample-name patterns they are recognised by
+SAMPLES = [('D5', re.compile('LCL5|D5')), ('D6', re.compile('LCL6|D6')),
+           ('F7', re.compile('LCL7|F7')), ('M8', re.compile('LCL8|M8'))]
+PERFORMANCE_COLUMNS = ['%s_%s-%s' % (variant, sample, measure)
+                       for variant in ['snv', 'indel']
+                       for sample, _ in SAMPLES
+                       for measure in ['precision', 'recall']] + ['snv_mendelian', 'indel_mendelian']
+
+
+def read_summary(path):
+    """ Rows of a tab-separated summary table with a header line, as dicts of strings """
+    with io.open(path, 'r', encoding='utf-8') as fh:
+        lines = fh.read().splitlines()
+    keys = lines[0].split('\t')
+    return [dict(zip(keys, values.split('\t'))) for values in lines[1:]]
+
+
+def read_precision_recall(path):
+    """ Read a variants.calling.qc.txt, with precision and recall rescaled to [0, 1] """
+    df = pd.read_csv(path, sep='\t')
+    df[PRECISION_RECALL] = round(df[PRECISION_RECALL] / 100, 4)
+    return df
+
+
+def read_mendelian(path):
+    """ Read a <project>.summary.txt of Mendelian concordance """
+    return pd.read_csv(path, sep='\t')
+
+
+def sequencing_strategy(pr_df):
+    """ Only WES results report an F1-score of their own """
+    return 'WES' if 'SNV F1' in pr_df.columns else 'WGS'
+
+
+def precision_recall_values(pr_df):
+    """ Precision and recall of one set of Quartet samples, keyed by performance column """
+    values = {}
+    for sample_name, snv_p, snv_r, indel_p, indel_r in zip(pr_df['Sample'], *[pr_df[c] for c in [
+            'SNV precision', 'SNV recall', 'INDEL precision', 'INDEL recall']]):
+        for sample, pattern in SAMPLES:
+            if pattern.search(sample_name):
+                values.update({
+                    'snv_%s-precision' % sample: snv_p, 'snv_%s-recall' % sample: snv_r,
+                    'indel_%s-precision' % sample: indel_p, 'indel_%s-recall' % sample: indel_r
+                })
+                break
+    return values
+
+
+def mendelian_values(mendelian_df):
+    """ Mean Mendelian concordance rate of SNVs and INDELs of one set of Quartet samples """
+    return {
+        'snv_mendelian': mendelian_df[mendelian_df.Family.str.contains('SNV$')]['Mendelian_Concordance_Rate'].mean(),
+        'indel_mendelian': mendelian_df[mendelian_df.Family.str.contains('INDEL$')]['Mendelian_Concordance_Rate'].mean()
+    }
+
+
+def performance_table(pr_frames, mendelian_frames, batch='Queried_Data', group='Queried'):
+    """ One row per set of Quartet samples, laid out like quartet_reference.txt.
+
+    The n-th precision/recall table is paired with the n-th Mendelian table;
+    sets are named <batch>_Set<n>. """
+    rows = []
+    for n, (pr_df, mendelian_df) in enumerate(zip(pr_frames, mendelian_frames), 1):
+        row = {'sample': '%s_Set%s' % (batch, n), 'group': group, 'batch': batch}
+        row.update(precision_recall_values(pr_df))
+        row.update(mendelian_values(mendelian_df))
+        rows.append(row)
+    return pd.DataFrame(rows, columns=['sample', 'group', 'batch'] + PERFORMANCE_COLUMNS)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+""" Compiled, memory-mappable form of the Quartet historical reference
+
+quartet_reference.txt is parsed and scored once per checksum. Every `seq`
+partition is written as a column-major float matrix next to its batch-level
+quality metrics and their Q1/Q2/Q3 quantiles, so that later reports only
+have to memory-map a few .npy files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from multiqc.utils import config
+
+from quartet_dnaseq_report.utils import scoring
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_TSV = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                             'modules', 'conclusion', 'assets', 'quartet_reference.txt')
+# Quantiles that split the historical batches into Bad / Fair / Good / Great
+QUANTILES = [.2, .5, .8]
+QUANTILE_NAMES = ['Q1', 'Q2', 'Q3']
+LABEL_COLUMNS = ['sample', 'group', 'batch']
+
+# Compiled references already loaded by this process, keyed by checksum
+_loaded = {}
+
+# Bumped whenever the compiled metrics or quantiles change, e.g. with
+# scoring.score_batches, so that references compiled before are rebuilt
+COMPILED_FORMAT = 2
+
+
+class Reference(object):
+    """ Historical reference of one or all sequencing strategies.
+
+    seq       - 'WGS', 'WES' or None for all strategies
+    data      - one row per set of Quartet samples (without the 'seq' column)
+    metrics   - one row per batch, as returned by scoring.score_batches
+    quantiles - Q1/Q2/Q3 of every metric in scoring.METRICS
+    checksum  - sha256 of the reference TSV the partition was compiled from
+    """
+
+    def __init__(self, seq, data, metrics, quantiles, checksum):
+        self.seq = seq
+        self.data = data
+        self.metrics = metrics
+        self.quantiles = quantiles
+        self.checksum = checksum
+
+    @property
+    def columns(self):
+        """ Columns of a performance table, in reference order """
+        return list(self.data.columns)
+
+    def rank(self, metrics):
+        """ Rank of every row of metrics among the historical batches, see scoring.rank_against_reference """
+        return scoring.rank_against_reference(self.metrics, metrics)
+
+    def summary(self):
+        """ count, sum, sumsq, min and max of every metric over the historical batches """
+        return scoring.summarise(self.metrics)
+
+
+def from_data(seq, data, digest=None):
+    """ Reference of a historical performance table (without the 'seq' column),
+    scored and with its quantiles """
+    metrics = scoring.score_batches(data)
+    quantiles = metrics[scoring.METRICS].quantile(QUANTILES)
+    quantiles.index = QUANTILE_NAMES
+    return Reference(seq, data, metrics, quantiles, digest)
+
+
+def checksum(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_dir():
+    """ Directory holding compiled references, configurable with
+    quartet_dnaseq_report_config: reference_cache_dir """
+    default = os.path.join(os.path.expanduser('~'), '.cache', 'quartet_dnaseq_report')
+    return getattr(config, 'quartet_dnaseq_report_config', {}).get('reference_cache_dir', default)
+
+
+def compiled_dir(digest):
+    """ Directory of the reference compiled from a TSV with this checksum """
+    return os.path.join(cache_dir(), 'quartet_reference-v%d-%s' % (COMPILED_FORMAT, digest[:16]))
+
+
+def compile_reference(path=REFERENCE_TSV):
+    """ Parse and score the reference TSV. Returns {seq: Reference} """
+    digest = checksum(path)
+    quartet_ref = pd.read_csv(path, sep='\t')
+    partitions = {}
+    for seq, ref in quartet_ref.groupby('seq', sort=False):
+        partitions[seq] = from_data(seq, ref.drop(columns=['seq']).reset_index(drop=True), digest)
+    return partitions
+
+
+def write_compiled(partitions, dest):
+    """ Write compiled partitions into dest, replacing it atomically """
+    parent = os.path.dirname(dest)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    try:
+        meta = {'seqs': list(partitions.keys())}
+        for seq, ref in partitions.items():
+            num_columns = [c for c in ref.data.columns if c not in LABEL_COLUMNS]
+            meta[seq] = {'columns': num_columns, 'labels': ref.data[LABEL_COLUMNS].values.tolist(),
+                         'batches': ref.metrics.batch.tolist()}
+            np.save(os.path.join(tmp, '%s.values.npy' % seq), np.asfortranarray(ref.data[num_columns].values, dtype=float))
+            np.save(os.path.join(tmp, '%s.metrics.npy' % seq), ref.metrics[scoring.METRICS].values.astype(float))
+            np.save(os.path.join(tmp, '%s.quantiles.npy' % seq), ref.quantiles[scoring.METRICS].values.astype(float))
+        # meta.json is written last, so a directory without it is never trusted
+        with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh)
+        os.rename(tmp, dest)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isfile(os.path.join(dest, 'meta.json')):
+            raise
+
+
+def read_compiled(src, digest):
+    """ Memory-map compiled partitions from src. Returns {seq: Reference} """
+    with open(os.path.join(src, 'meta.json')) as fh:
+        meta = json.load(fh)
+    partitions = {}
+    for seq in meta['seqs']:
+        values = np.load(os.path.join(src, '%s.values.npy' % seq), mmap_mode='r')
+        data = pd.DataFrame(values, columns=meta[seq]['columns'])
+        labels = pd.DataFrame(meta[seq]['labels'], columns=LABEL_COLUMNS)
+        data = pd.concat([labels, data], axis=1)
+        metrics = pd.DataFrame(np.load(os.path.join(src, '%s.metrics.npy' % seq), mmap_mode='r'), columns=scoring.METRICS)
+        metrics.insert(0, 'batch', meta[seq]['batches'])
+        quantiles = pd.DataFrame(np.load(os.path.join(src, '%s.quantiles.npy' % seq), mmap_mode='r'),
+                                 index=QUANTILE_NAMES, columns=scoring.METRICS)
+        partitions[seq] = Reference(seq, data, metrics, quantiles, digest)
+    return partitions
+
+
+def load_partitions(path=REFERENCE_TSV):
+    """ Load the compiled reference, compiling it first when the TSV checksum changed """
+    digest = checksum(path)
+    if digest in _loaded:
+        return _loaded[digest]
+
+    compiled = compiled_dir(digest)
+    partitions = None
+    if os.path.isfile(os.path.join(compiled, 'meta.json')):
+        try:
+            partitions = read_compiled(compiled, digest)
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug('Ignoring unreadable compiled reference {}: {}'.format(compiled, e))
+    if partitions is None:
+        logger.debug('Compiling the Quartet reference into {}'.format(compiled))
+        partitions = compile_reference(path)
+        try:
+            write_compiled(partitions, compiled)
+        except OSError as e:
+            logger.debug("Couldn't write the compiled reference {}: {}".format(compiled, e))
+
+    _loaded[digest] = partitions
+    return partitions
+
+
+def load_reference(seq=None, path=REFERENCE_TSV):
+    """ Historical reference of one sequencing strategy ('WGS' or 'WES'),
+    or of all strategies together when seq is None """
+    partitions = load_partitions(path)
+    if seq is not None:
+        return partitions[seq]
+
+    parts = list(partitions.values())
+    data = pd.concat([p.data for p in parts], ignore_index=True)
+    return from_data(None, data, parts[0].checksum if parts else None)
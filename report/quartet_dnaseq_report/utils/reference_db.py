@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+""" Optional SQLite store of the Quartet historical reference
+
+Set quartet_dnaseq_report_config: reference_db to the path of a SQLite file
+to compare against it instead of the quartet_reference.txt shipped with the
+package. A new store is seeded with the shipped reference. With
+reference_db_insert every scored dataset is appended to it, so the reference
+grows with the in-house batches.
+
+Ranks, quantiles and summaries are answered by indexed queries on the
+batch-level metrics; the set-level table is only read to rebuild the cached
+historical plot layers, i.e. once per version of the store.
+
+    quartet_dnaseq_report_config:
+      reference_db: /data/quartet/reference.sqlite
+      reference_db_platform: ''        # only compare against batches of this platform
+      reference_db_platform_min_batches: 10   # ... once it has this many
+      reference_db_insert: False
+      reference_db_group: 'In-house'   # group of the inserted sets
+"""
+
+import contextlib
+import datetime
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+
+import pandas as pd
+from multiqc.utils import config
+
+from quartet_dnaseq_report.utils import readers, scoring
+from quartet_dnaseq_report.utils.reference import (LABEL_COLUMNS, QUANTILES, QUANTILE_NAMES,
+                                                   load_partitions, load_reference)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = ["""
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+)""", """
+CREATE TABLE IF NOT EXISTS batches (
+  id INTEGER PRIMARY KEY,
+  seq TEXT NOT NULL,
+  platform TEXT NOT NULL DEFAULT '',
+  batch TEXT NOT NULL,
+  added TEXT,
+  {metrics},
+  UNIQUE (seq, platform, batch)
+)""".format(metrics=',\n  '.join('%s REAL NOT NULL' % m for m in scoring.METRICS)), """
+CREATE TABLE IF NOT EXISTS sets (
+  batch_id INTEGER NOT NULL REFERENCES batches (id),
+  sample TEXT NOT NULL,
+  "group" TEXT,
+  {columns}
+)""".format(columns=',\n  '.join('"%s" REAL' % c for c in readers.PERFORMANCE_COLUMNS)),
+    'CREATE INDEX IF NOT EXISTS sets_batch ON sets (batch_id)'
+] + ['CREATE INDEX IF NOT EXISTS batches_{m} ON batches (seq, platform, {m})'.format(m=m) for m in scoring.METRICS]
+
+
+def db_config():
+    return getattr(config, 'quartet_dnaseq_report_config', {})
+
+
+@contextlib.contextmanager
+def connect(path):
+    """ Connection committing on success, so every operation is one transaction """
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def init_db(path):
+    """ Create the tables and seed an empty store with the shipped reference """
+    with connect(path) as conn:
+        for statement in SCHEMA:
+            conn.execute(statement)
+        empty = conn.execute('SELECT COUNT(*) FROM batches').fetchone()[0] == 0
+        if empty:
+            logger.info('Seeding the Quartet reference database {}'.format(path))
+            for seq, ref in load_partitions().items():
+                insert_batches(conn, seq, '', ref.data, ref.metrics)
+
+
+def insert_batches(conn, seq, platform, performance, metrics, group=None):
+    """ Insert the sets of performance and their batch-level metrics """
+    added = datetime.datetime.now().isoformat(timespec='seconds')
+    for row in metrics.itertuples(index=False):
+        row = row._asdict()
+        cursor = conn.execute(
+            'INSERT INTO batches (seq, platform, batch, added, {metrics}) VALUES (?, ?, ?, ?, {marks})'.format(
+                metrics=', '.join(scoring.METRICS), marks=', '.join('?' * len(scoring.METRICS))),
+            [seq, platform, row['batch'], added] + [float(row[m]) for m in scoring.METRICS])
+        sets = performance[performance.batch == row['batch']]
+        conn.executemany(
+            'INSERT INTO sets (batch_id, sample, "group", {columns}) VALUES (?, ?, ?, {marks})'.format(
+                columns=', '.join('"%s"' % c for c in readers.PERFORMANCE_COLUMNS),
+                marks=', '.join('?' * len(readers.PERFORMANCE_COLUMNS))),
+            [[cursor.lastrowid, s, group if group else g] + [float(v) for v in values]
+             for s, g, values in zip(sets['sample'], sets['group'], sets[readers.PERFORMANCE_COLUMNS].values)])
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                 [str(int(version(conn)) + 1)])
+
+
+def version(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return row[0] if row else '0'
+
+
+class StoredReference(object):
+    """ Historical reference of one sequencing strategy and platform in a SQLite store.
+
+    Behaves like utils.reference.Reference. data and metrics load the whole
+    partition and are only meant for building cached layers; checksum changes
+    with every insertion. Datasets are inserted under insert_platform, which
+    defaults to platform. """
+
+    def __init__(self, path, seq, platform='', insert_platform=None):
+        self.path = path
+        self.seq = seq
+        self.platform = platform
+        self.insert_platform = platform if insert_platform is None else insert_platform
+        self.columns = LABEL_COLUMNS + readers.PERFORMANCE_COLUMNS
+        self._quantiles = None
+        self._summary = None
+        with connect(path) as conn:
+            digest = '%s:%s:%s:%s' % (os.path.abspath(path), seq, platform, version(conn))
+        self.checksum = hashlib.sha256(digest.encode()).hexdigest()
+
+    def where(self, table=''):
+        """ WHERE clause and parameters selecting this partition """
+        prefix = table + '.' if table else ''
+        if self.seq is None:
+            return '{0}platform = ?'.format(prefix), [self.platform]
+        return '{0}seq = ? AND {0}platform = ?'.format(prefix), [self.seq, self.platform]
+
+    @property
+    def data(self):
+        clause, params = self.where('b')
+        with connect(self.path) as conn:
+            data = pd.read_sql_query(
+                'SELECT s.sample, s."group", b.batch, {columns} FROM sets s JOIN batches b ON s.batch_id = b.id '
+                'WHERE {where} ORDER BY b.id, s.rowid'.format(
+                    columns=', '.join('s."%s"' % c for c in readers.PERFORMANCE_COLUMNS),
+                    where=clause),
+                conn, params=params)
+        return data
+
+    @property
+    def metrics(self):
+        clause, params = self.where()
+        with connect(self.path) as conn:
+            return pd.read_sql_query('SELECT batch, {metrics} FROM batches WHERE {where} ORDER BY id'.format(
+                metrics=', '.join(scoring.METRICS), where=clause), conn, params=params)
+
+    @property
+    def quantiles(self):
+        """ Q1/Q2/Q3 with pandas' linear interpolation, reading at most two
+        index entries per quantile and metric """
+        if self._quantiles is None:
+            clause, params = self.where()
+            quantiles = pd.DataFrame(index=QUANTILE_NAMES, columns=scoring.METRICS, dtype=float)
+            with connect(self.path) as conn:
+                n = conn.execute('SELECT COUNT(*) FROM batches WHERE %s' % clause, params).fetchone()[0]
+                for metric in scoring.METRICS:
+                    for name, q in zip(QUANTILE_NAMES, QUANTILES):
+                        pos = q * (n - 1)
+                        lower = int(math.floor(pos))
+                        values = [v for v, in conn.execute(
+                            'SELECT {m} FROM batches WHERE {where} ORDER BY {m} LIMIT 2 OFFSET ?'.format(
+                                m=metric, where=clause), params + [lower])]
+                        if len(values) == 0:
+                            continue
+                        upper = values[1] if len(values) > 1 else values[0]
+                        quantiles.loc[name, metric] = values[0] + (upper - values[0]) * (pos - lower)
+            self._quantiles = quantiles
+        return self._quantiles
+
+    def rank(self, metrics):
+        """ Rank of every row of metrics among the stored batches, counted
+        through the (seq, platform, metric) indexes, NaN for a missing value """
+        clause, params = self.where()
+        ranks = pd.DataFrame(index=metrics.index)
+        with connect(self.path) as conn:
+            for metric in scoring.METRICS:
+                query = 'SELECT COUNT(*) FROM batches WHERE {where} AND {m} > ?'.format(where=clause, m=metric)
+                ranks[metric] = [float('nan') if math.isnan(v) else
+                                 conn.execute(query, params + [v]).fetchone()[0] + 1
+                                 for v in metrics[metric].values.astype(float)]
+        return ranks
+
+    def summary(self):
+        """ count, sum, sumsq, min and max of every metric over the stored batches """
+        if self._summary is None:
+            clause, params = self.where()
+            columns = ', '.join('COUNT({m}), SUM({m}), SUM({m} * {m}), MIN({m}), MAX({m})'.format(m=m)
+                                for m in scoring.METRICS)
+            with connect(self.path) as conn:
+                row = conn.execute('SELECT %s FROM batches WHERE %s' % (columns, clause), params).fetchone()
+            values = [[row[i * len(scoring.SUMMARY) + j] for i in range(len(scoring.METRICS))]
+                      for j in range(len(scoring.SUMMARY))]
+            self._summary = pd.DataFrame(values, index=scoring.SUMMARY, columns=scoring.METRICS, dtype=float)
+        return self._summary
+
+    def insert(self, performance, metrics, batch=None, group=None):
+        """ Append a scored dataset to the store, named batch instead of
+        its 'batch' column when given """
+        if batch:
+            performance = performance.assign(batch=batch)
+            metrics = metrics.assign(batch=batch)
+        with connect(self.path) as conn:
+            insert_batches(conn, self.seq, self.insert_platform, performance, metrics, group)
+
+
+def open_reference(seq=None):
+    """ Reference of the configured SQLite store, or the shipped one if there is none.
+
+    A platform with fewer than reference_db_platform_min_batches batches
+    (10 by default) is compared against the batches stored without a
+    platform (the seeded reference) while it grows under its own name, so
+    that a report is never scored against a handful of batches. """
+    path = db_config().get('reference_db')
+    if not path:
+        return load_reference(seq)
+    init_db(path)
+    platform = db_config().get('reference_db_platform', '')
+    reference = StoredReference(path, seq, platform)
+    min_batches = db_config().get('reference_db_platform_min_batches', 10)
+    n_batches = int(reference.summary().loc['count', 'total'])
+    if platform and n_batches < min_batches:
+        logger.warning("{} {} batches of platform '{}' in the Quartet reference database {}, fewer than {}: "
+                       "comparing against the batches without a platform".format(
+                           n_batches, seq or 'stored', platform, path, min_batches))
+        reference = StoredReference(path, seq, '', insert_platform=platform)
+    return reference
+
+
+def store_queried(reference, performance, metrics):
+    """ Append the queried dataset to the store when reference_db_insert is set """
+    if not isinstance(reference, StoredReference) or not db_config().get('reference_db_insert', False):
+        return
+    if reference.seq is None or len(metrics) == 0:
+        return
+    if metrics[scoring.METRICS].isna().any().any():
+        logger.warning('Not adding the queried data to the Quartet reference database {}, '
+                       'some of its metrics are missing'.format(reference.path))
+        return
+    batch = db_config().get('reference_db_batch') or \
+        'Queried_%s' % datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    try:
+        reference.insert(performance, metrics, batch=batch, group=db_config().get('reference_db_group', 'In-house'))
+        logger.info('Added {} to the Quartet reference database {}'.format(batch, reference.path))
+    except sqlite3.IntegrityError as e:
+        if 'UNIQUE constraint failed' not in str(e):
+            raise
+        logger.warning('{} is already in the Quartet reference database {}'.format(batch, reference.path))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+""" Scoring engine for the Quartet DNAseq quality metrics """
+
+import re
+import numpy as np
+import pandas as pd
+
+from quartet_dnaseq_report.utils.tiers import grade
+
+# The F-beta weight used to combine the SNV and INDEL scores
+BETA2 = 0.5
+
+# Batch-level quality metrics and the columns they are averaged over
+METRIC_PATTERNS = [
+    ('precision_snv', re.compile('snv.*precision')),
+    ('precision_indel', re.compile('indel.*precision')),
+    ('recall_snv', re.compile('snv.*recall')),
+    ('recall_indel', re.compile('indel.*recall')),
+    ('mendelian_snv', re.compile('snv.*mendelian')),
+    ('mendelian_indel', re.compile('indel.*mendelian')),
+]
+METRICS = [metric for metric, _ in METRIC_PATTERNS] + ['total']
+# Per-sample precision columns, e.g. snv_D5-precision
+SAMPLE_PRECISION_RE = re.compile(r'^(snv|indel)_(.+)-precision$')
+
+
+def column_groups(columns):
+    """ Map every batch-level metric to the columns of a performance table it is averaged over """
+    return {metric: [col for col in columns if pattern.search(col)] for metric, pattern in METRIC_PATTERNS}
+
+
+def performance_samples(columns, variant):
+    """ Quartet samples with precision columns for the variant type, in column order """
+    matches = (SAMPLE_PRECISION_RE.match(col) for col in columns)
+    return [m.group(2) for m in matches if m and m.group(1) == variant]
+
+
+def mean_f1(df, variant, samples=None):
+    """ F1-score of every row, averaged over its samples.
+
+    Precision and recall are taken as (rows x samples) matrices, so any set of
+    samples works; by default all samples with a precision column are used. """
+    if samples is None:
+        samples = performance_samples(df.columns, variant)
+    precision = df[['%s_%s-precision' % (variant, s) for s in samples]].values.astype(float)
+    recall = df[['%s_%s-recall' % (variant, s) for s in samples]].values.astype(float)
+    return (2 * precision * recall / (precision + recall)).mean(axis=1)
+
+
+def f_beta(a, b, beta2=BETA2):
+    """ Element-wise F-beta measure of two score arrays """
+    return (1 + beta2) * a * b / (beta2 * a + b)
+
+
+# Compiled into the cached reference, bump reference.COMPILED_FORMAT when the results change
+def score_batches(df):
+    """ Average every quality metric per batch and compute the total score.
+
+    Each row of df is a set of Quartet samples. Returns one row per batch,
+    in order of first appearance, with the columns ['batch'] + METRICS.
+    Like a plain mean, a metric is NaN in a batch with a missing value. """
+    groups = column_groups(df.columns)
+    values = df[sum(groups.values(), [])].astype(float)
+    grouped = values.groupby(df['batch'], sort=False)
+    sums = grouped.sum()
+    missing = values.isna().groupby(df['batch'], sort=False).any()
+    counts = grouped.size().values
+
+    metrics = pd.DataFrame(index=sums.index)
+    for metric, cols in groups.items():
+        mean = sums[cols].values.sum(axis=1) / (counts * len(cols))
+        metrics[metric] = np.where(missing[cols].values.any(axis=1), np.nan, mean)
+
+    values = metrics.values
+    precision = f_beta(values[:, 0], values[:, 1])
+    recall = f_beta(values[:, 2], values[:, 3])
+    mendelian = f_beta(values[:, 4], values[:, 5])
+    metrics['total'] = (precision + recall + mendelian) / 3
+
+    metrics = metrics.round(5)
+    metrics.index.name = 'batch'
+    return metrics.reset_index()
+
+
+def rank_against_reference(reference_metrics, metrics):
+    """ Rank every row of metrics against the historical batches only.
+
+    Each reference metric is sorted once and every queried value is placed by
+    binary search, so ranking N rows costs O(N log R). The rank of a value is
+    its rank (method='min', descending) among the R reference batches plus
+    itself, i.e. it is out of R + 1. Missing values are not ranked (NaN) and
+    missing reference values are left out of R. """
+    ranks = pd.DataFrame(index=metrics.index)
+    for metric in METRICS:
+        ref_values = reference_metrics[metric].values.astype(float)
+        ref_sorted = np.sort(ref_values[~np.isnan(ref_values)])
+        values = metrics[metric].values.astype(float)
+        greater = len(ref_sorted) - np.searchsorted(ref_sorted, values, side='right')
+        ranks[metric] = np.where(np.isnan(values), np.nan, greater + 1)
+    return ranks
+
+
+SUMMARY = ['count', 'sum', 'sumsq', 'min', 'max']
+
+
+def summarise(metrics):
+    """ Moments and range of every metric, one row per SUMMARY statistic """
+    values = metrics[METRICS].values.astype(float)
+    return pd.DataFrame([np.full(len(METRICS), len(values), dtype=float), values.sum(axis=0),
+                         (values ** 2).sum(axis=0), values.min(axis=0), values.max(axis=0)],
+                        index=SUMMARY, columns=METRICS)
+
+
+def mean_std(summary, metrics):
+    """ Mean and standard deviation of every metric over the historical
+    batches described by summary together with each row of metrics on its
+    own. Returns two frames indexed like metrics, NaN without history """
+    values = metrics[METRICS].values.astype(float)
+    n = summary.loc['count'].values + 1
+    mean = (summary.loc['sum'].values + values) / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = (summary.loc['sumsq'].values + values ** 2 - n * mean ** 2) / (n - 1)
+    std = np.where(n > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+    return (pd.DataFrame(mean, index=metrics.index, columns=METRICS),
+            pd.DataFrame(std, index=metrics.index, columns=METRICS))
+
+
+def scale_total(summary, total, a=1, b=10):
+    """ Scale total scores linearly so that the worst historical batch scores a and the best scores b.
+
+    With a single historical total (e.g. one batch) there is no range to
+    scale by: a total above it scores b, below it a, and equal to it the
+    middle of the scale. """
+    low, high = summary.loc['min', 'total'], summary.loc['max', 'total']
+    total = np.asarray(total, dtype=float)
+    if high == low:
+        return np.select([np.isnan(total), total > high, total < low], [np.nan, b, a], (a + b) / 2)
+    k = (b - a) / (high - low)
+    return a + k * (total - low)
+
+
+def score(reference_df, queried_df):
+    """ Score and rank the queried datasets against the historical reference.
+
+    queried_df holds the sets of Quartet samples of the queried datasets,
+    with the dataset name in the 'batch' column. reference_df is the
+    historical performance table, or a reference already compiled from it
+    (utils.reference.Reference, utils.reference_db.StoredReference).
+    Returns one row per dataset with its metrics (see score_batches), and
+    for every metric its rank among the historical batches and itself
+    (<metric>_rank, out of n_batches), its performance tier
+    (<metric>_performance) and the mean and standard deviation over the
+    historical batches and itself (<metric>_mean, <metric>_sd), and the
+    total score scaled into [1, 10] (total_score_norm). """
+    if isinstance(reference_df, pd.DataFrame):
+        from quartet_dnaseq_report.utils.reference import from_data
+        reference = from_data(None, reference_df.drop(columns=['seq'], errors='ignore'))
+    else:
+        reference = reference_df
+    metrics = score_batches(queried_df[reference.columns])
+    summary = reference.summary()
+
+    ranks = reference.rank(metrics)
+    ranks.columns = ['%s_rank' % metric for metric in METRICS]
+    mean, std = mean_std(summary, metrics)
+    mean.columns = ['%s_mean' % metric for metric in METRICS]
+    std.columns = ['%s_sd' % metric for metric in METRICS]
+
+    result = pd.concat([metrics, ranks, grade(metrics, reference.quantiles), mean, std], axis=1)
+    result['n_batches'] = int(summary.loc['count', 'total']) + 1
+    result['total_score_norm'] = np.clip(scale_total(summary, metrics['total']), 1, 10).round(2)
+    return result
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+""" Search patterns of the plugin's modules
+
+They are kept in shared/search_patterns.json, {search key: {'fn_re': ...}}
+in the config.sp format, so that the staging step writing the manifests
+(src/quartet_dseqc_report/task.clj, see utils.manifest) matches the
+staged files with the same patterns the MultiQC search uses.
+"""
+
+from collections import OrderedDict
+import io
+import json
+import os
+
+PATTERNS_FN = os.path.join(os.path.dirname(__file__), os.pardir, 'shared', 'search_patterns.json')
+
+
+def load():
+    """ {search key: search pattern}, in the order of the file """
+    with io.open(PATTERNS_FN, encoding='utf-8') as fh:
+        return json.load(fh, object_pairs_hook=OrderedDict)
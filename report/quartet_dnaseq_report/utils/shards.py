@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+""" Sharded report output: an index page plus one payload file per module
+
+    multiqc ./results/ --sharded
+
+or in a MultiQC config file:
+
+    quartet_dnaseq_report_config:
+      sharded: True
+
+The report itself keeps the header, the navigation and the general
+statistics. The content of every module, its Highcharts plot data and its
+plotly figures are written to <report name>_modules/<module anchor>.js
+instead, next to the report:
+
+    quartet_shard_loaded("conclusion", {"html": "...", "plot_data": "...", "plotly": "..."});
+
+and the template loads a module with a <script> tag, which also works for
+reports opened from disk, once its navigation entry is opened. plotly.js is
+written there as well, as plotly.js, and loaded with the first module that
+draws a plotly figure.
+"""
+
+import io
+import json
+import logging
+import os
+import shutil
+
+from multiqc.utils import config, report
+
+from quartet_dnaseq_report.utils import plotly_data
+
+logger = logging.getLogger(__name__)
+
+MODULE_TEMPLATE = 'module.html'
+PLOTLY_FN = 'plotly.js'
+
+
+def enabled():
+    return config.kwargs.get('sharded', False) or getattr(config, 'quartet_dnaseq_report_config', {}).get('sharded', False)
+
+
+def shard_dir():
+    """ Directory of the payload files, named after the report """
+    return os.path.splitext(config.output_fn)[0] + '_modules'
+
+
+def module_template():
+    """ Template rendering the content of one module, or None if the report template has none """
+    import jinja2
+    template_dir = config.avail_templates[config.template].load().template_dir
+    if not os.path.isfile(os.path.join(template_dir, MODULE_TEMPLATE)):
+        return None
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(template_dir))
+    return env.get_template(MODULE_TEMPLATE), template_dir
+
+
+def plot_ids(html):
+    """ Ids of the Highcharts plots and plotly figures drawn by html """
+    hc_ids = [pid for pid in report.plot_data if 'id="{}"'.format(pid) in html]
+    plotly_ids = [did for did in plotly_data.data_ids() if 'quartet_plotly_figure("{}")'.format(did) in html]
+    return hc_ids, plotly_ids
+
+
+def write_payload(path, anchor, payload):
+    with io.open(path, 'w', encoding='utf-8') as fh:
+        fh.write('quartet_shard_loaded({}, {});\n'.format(json.dumps(anchor), json.dumps(payload)))
+
+
+def write_shards():
+    """ Write the payload file of every module and take its plot data out
+    of the report. Sets report.quartet_shards to {module anchor: {'src',
+    'requires', 'plotly'}}: the payload file and the scripts it needs,
+    relative to the report, and whether it draws plotly figures """
+    report.quartet_shards = dict()
+    found = module_template()
+    if found is None:
+        logger.warning("The report template has no {}, writing a single page report".format(MODULE_TEMPLATE))
+        return None
+    template, template_dir = found
+
+    outdir = shard_dir()
+    if os.path.exists(outdir):
+        shutil.rmtree(outdir)
+    os.makedirs(outdir)
+    base = os.path.basename(outdir)
+    bundle = report.quartet_plotly_bundle
+
+    sharded_hc = set()
+    sharded_plotly = set()
+    for m in report.modules_output:
+        if len(m.sections) == 0:
+            continue
+        html = template.render(m=m, report=report, config=config)
+        hc_ids, plotly_ids = plot_ids(html)
+        payload = {
+            'html': html,
+            'plot_data': report.compress_json({pid: report.plot_data[pid] for pid in hc_ids}) if hc_ids else '',
+            'plotly': plotly_data.compressed(plotly_ids) if plotly_ids else '',
+        }
+        write_payload(os.path.join(outdir, '{}.js'.format(m.anchor)), m.anchor, payload)
+        report.quartet_shards[m.anchor] = {'src': '{}/{}.js'.format(base, m.anchor), 'requires': [],
+                                           'plotly': len(plotly_ids) > 0}
+        sharded_hc.update(hc_ids)
+        sharded_plotly.update(plotly_ids)
+
+    # plotly.js goes with the modules, unless the report itself still draws a figure
+    remaining_plotly = [did for did in plotly_data.data_ids() if did not in sharded_plotly]
+    if bundle is not None and sharded_plotly and len(remaining_plotly) == 0:
+        shutil.copyfile(os.path.join(template_dir, bundle), os.path.join(outdir, PLOTLY_FN))
+        report.quartet_plotly_bundle = None
+        for shard in report.quartet_shards.values():
+            if shard['plotly']:
+                shard['requires'].append('{}/{}'.format(base, PLOTLY_FN))
+
+    report.plot_compressed_json = report.compress_json(
+        {pid: data for pid, data in report.plot_data.items() if pid not in sharded_hc})
+    report.quartet_plotly_compressed = plotly_data.compressed(remaining_plotly)
+    logger.info("Modules     : {}".format(os.path.relpath(outdir)))
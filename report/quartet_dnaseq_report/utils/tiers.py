@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+""" Historical performance tiers shared by the report modules """
+
+import numpy as np
+import pandas as pd
+
+TIERS = ['Bad', 'Fair', 'Good', 'Great']
+
+
+def grade(values, quantile_df, metrics=None, labels=TIERS):
+    """ Grade every metric of every row against the historical quantiles.
+
+    quantile_df has one row per ascending threshold (e.g. Q1, Q2, Q3) and one
+    column per metric. A value below the first threshold gets labels[0], a
+    value at or above the last one gets labels[-1], a missing value NaN.
+    All rows and metrics are binned in one broadcast comparison. Returns a
+    frame with one '<metric>_performance' column per metric, indexed like
+    values. """
+    metrics = list(quantile_df.columns) if metrics is None else list(metrics)
+    x = values[metrics].values.astype(float)
+    thresholds = quantile_df[metrics].values.astype(float)
+    # Number of thresholds each value does not reach, per row and metric
+    below = (x[:, None, :] < thresholds[None, :, :]).sum(axis=1)
+    graded = np.asarray(labels, dtype=object)[thresholds.shape[0] - below]
+    graded[np.isnan(x)] = np.nan
+    return pd.DataFrame(graded, index=values.index, columns=['%s_performance' % m for m in metrics])
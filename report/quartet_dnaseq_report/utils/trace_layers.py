@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+""" Historical trace layers of the conclusion plots
+
+Everything a conclusion plot draws for the historical batches only depends
+on the reference version. Those parts are built once, serialised to JSON next
+to the compiled reference and reused by every report, which then only adds
+the queried data on top.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from quartet_dnaseq_report.utils import scoring
+from quartet_dnaseq_report.utils.reference import compiled_dir
+
+logger = logging.getLogger(__name__)
+
+# Layers already loaded by this process, keyed by (checksum, seq, name)
+_layers = {}
+
+# Bumped whenever the layers change shape, so that older files are rebuilt
+LAYER_FORMAT = 2
+
+
+def cached_layer(reference, name, build):
+    """ Return the JSON-serialisable layer `name` of this reference version,
+    calling build() to create it the first time it is needed """
+    key = (reference.checksum, reference.seq, name)
+    if key in _layers:
+        return _layers[key]
+
+    path = os.path.join(compiled_dir(reference.checksum), 'layers', '%s-%s.v%d.json' % (reference.seq or 'all', name, LAYER_FORMAT))
+    layer = None
+    if os.path.isfile(path):
+        try:
+            with open(path) as fh:
+                layer = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.debug('Ignoring unreadable trace layer {}: {}'.format(path, e))
+    if layer is None:
+        layer = build()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = '%s.%s.tmp' % (path, os.getpid())
+            with open(tmp, 'w') as fh:
+                json.dump(layer, fh)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug("Couldn't write the trace layer {}: {}".format(path, e))
+
+    _layers[key] = layer
+    return layer
+
+
+def overlay(layer, queried):
+    """ Figure dict with the traces of the queried figure dict drawn over a historical layer """
+    figure = dict(layer)
+    figure['data'] = layer['data'] + queried['data']
+    return figure
+
+
+def heatmap_layer(reference):
+    """ Historical batches sorted by total score, as heatmap columns """
+    metrics = reference.metrics.sort_values('total', ascending=True)
+    return {
+        'batches': metrics['batch'].tolist(),
+        'total': metrics['total'].tolist(),
+        'data': metrics[scoring.METRICS].T.values.tolist()
+    }
+
+
+def heatmap_matrix(layer, queried_metrics):
+    """ Insert the queried batches into the sorted historical heatmap.
+
+    Returns (data, xcats) with one row per metric and the batches ordered by
+    increasing total score. """
+    queried_metrics = queried_metrics.sort_values('total', ascending=True)
+    positions = np.searchsorted(layer['total'], queried_metrics['total'].values, side='right')
+    data = np.insert(np.asarray(layer['data'], dtype=float), positions,
+                     queried_metrics[scoring.METRICS].values.T, axis=1)
+    xcats = np.insert(np.asarray(layer['batches'], dtype=object), positions, queried_metrics['batch'].values)
+    return data.tolist(), xcats.tolist()
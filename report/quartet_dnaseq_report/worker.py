@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+""" Long-lived report worker, keeping Python, MultiQC and the plugin warm.
+
+    quartet-dnaseq-worker --port 8765
+
+The worker imports MultiQC, pandas, plotly and the plugin modules and loads
+the compiled Quartet reference once. Every job then runs in a process forked
+from it, which starts with all of that in memory and takes the state MultiQC
+keeps in its modules away with it when it exits. Jobs are POSTed as JSON to
+/report:
+
+    {"analysis_dir": ["/path/to/results"],
+     "options": {"outdir": "/path/to/results", "title": "Quartet DNA report", "template": "report_templates"},
+     "kwargs": {"metrics_only": false}}
+
+where options are arguments of multiqc.run() and kwargs the plugin's
+command line flags. The answer, sent once the report is written, is
+{"status": "Success" or "Error", "msg": "..."}.
+"""
+
+from __future__ import print_function
+import http.server
+import inspect
+import json
+import logging
+import socketserver
+import traceback
+
+import click
+
+log = logging.getLogger(__name__)
+
+
+def warm_up():
+    """ Import everything a report needs and load the compiled reference """
+    from multiqc.utils import config
+    for name, entry_point in config.avail_modules.items():
+        if entry_point.module_name.startswith('quartet_dnaseq_report.'):
+            entry_point.load()
+    for name, entry_point in config.avail_templates.items():
+        if entry_point.module_name.startswith('quartet_dnaseq_report.'):
+            entry_point.load()
+    from quartet_dnaseq_report.utils import reference
+    reference.load_partitions()
+
+
+def run_options():
+    """ Options of a job, the arguments of multiqc.run() """
+    import multiqc
+    return [p for p in inspect.signature(multiqc.run).parameters if p not in ('analysis_dir', 'kwargs')]
+
+
+def run_job(job):
+    """ Build the report of a job in this process. Returns {'status', 'msg'} """
+    import multiqc
+
+    analysis_dir = job.get('analysis_dir')
+    if isinstance(analysis_dir, str):
+        analysis_dir = [analysis_dir]
+    if not analysis_dir:
+        return {'status': 'Error', 'msg': 'The job has no analysis_dir'}
+    options = job.get('options', {})
+    unknown = [k for k in options if k not in run_options()]
+    if len(unknown) > 0:
+        return {'status': 'Error', 'msg': 'Unknown options: {}'.format(', '.join(unknown))}
+    # The plugin only runs when it is explicitly enabled
+    kwargs = dict({'disable_plugin': False}, **job.get('kwargs', {}))
+
+    try:
+        result = multiqc.run(tuple(analysis_dir), kwargs=kwargs, **options)
+    except SystemExit as e:
+        return {'status': 'Error', 'msg': 'MultiQC exited with code {} before writing the report'.format(e.code)}
+    except Exception:
+        return {'status': 'Error', 'msg': traceback.format_exc()}
+    if result['sys_exit_code'] != 0:
+        return {'status': 'Error', 'msg': 'MultiQC exited with code {}'.format(result['sys_exit_code'])}
+    return {'status': 'Success', 'msg': 'Report: {}'.format(result['config'].output_fn)}
+
+
+class ReportHandler(http.server.BaseHTTPRequestHandler):
+    """ Runs the job POSTed to /report, in the process forked for the request """
+
+    def do_POST(self):
+        if self.path != '/report':
+            self.send_error(404)
+            return None
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError as e:
+            result = {'status': 'Error', 'msg': 'Invalid job: {}'.format(e)}
+        else:
+            result = run_job(job)
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.info('%s - %s' % (self.address_string(), format % args))
+
+
+class WorkerServer(socketserver.ForkingMixIn, http.server.HTTPServer):
+    """ HTTP server forking a warm child per job """
+
+
+@click.command(help='Serve Quartet DNA-Seq report jobs from a warm, long-lived process.')
+@click.option('--host', default='127.0.0.1', help='Address to listen on (default: localhost only).')
+@click.option('--port', default=8765, type=int, help='Port to listen on.')
+@click.option('--max-jobs', default=4, type=int, help='Number of jobs run at the same time.')
+def main(host, port, max_jobs):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+    log.info('Warming up')
+    warm_up()
+    server = WorkerServer((host, port), ReportHandler)
+    server.max_children = max_jobs
+    log.info('Serving report jobs on http://{}:{}/report'.format(host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env node
+/*
+ * Trim a browserify build of plotly.js down to the trace types a report uses.
+ *
+ *   node scripts/build_plotly_bundle.js plotly-latest.min.js plotly-quartet.min.js box heatmap
+ *
+ * The trace modules registered by the bundle's entry point are cut down to
+ * the given ones (scatter is part of plotly's core and always kept), and
+ * every module no longer reachable from the entry point is dropped. The kept
+ * modules are copied as they are, so the output is as minified as the input.
+ */
+'use strict';
+
+const fs = require('fs');
+
+const [input, output, ...traces] = process.argv.slice(2);
+if (!input || !output) {
+  console.error('Usage: build_plotly_bundle.js <plotly.min.js> <output.min.js> [trace ...]');
+  process.exit(1);
+}
+
+const src = fs.readFileSync(input, 'utf8');
+
+// browserify bundles are a prelude, a {id: [function, {require name: id}]} table of
+// modules and the entry point: prelude({...},{},[entry])(entry)
+const start = src.indexOf('}({1:[function(') + 2;
+const tail = /\},\{\},\[(\d+)\]\)\(\d+\)\}\)\);?\s*$/.exec(src);
+if (start < 2 || !tail) {
+  console.error(input + ' is not a browserify build of plotly.js');
+  process.exit(1);
+}
+const end = tail.index + 1;
+const entry = Number(tail[1]);
+// Only defines the module functions, none of them runs
+const modules = (0, eval)('(' + src.slice(start, end) + ')');
+
+// The module registering every trace type: Plotly.register([t("./bar"), t("./box"), ...])
+const registerRe = /\.register\(\[((?:\w+\("\.\/\w+"\),?)+)\]\)/;
+const index = Object.keys(modules).find(function (id) {
+  const deps = modules[id][1];
+  return './bar' in deps && './box' in deps && registerRe.test(modules[id][0].toString());
+});
+if (index === undefined) {
+  console.error('No trace registry found in ' + input);
+  process.exit(1);
+}
+const code = modules[index][0].toString();
+const registered = registerRe.exec(code)[1].split(',');
+const kept = registered.filter(function (item) {
+  return traces.indexOf(/"\.\/(\w+)"/.exec(item)[1]) >= 0;
+});
+const deps = Object.assign({}, modules[index][1]);
+registered.forEach(function (item) {
+  if (kept.indexOf(item) < 0) {
+    delete deps[/"(\.\/\w+)"/.exec(item)[1]];
+  }
+});
+const trimmed = code.replace(registerRe, '.register([' + kept.join(',') + '])');
+modules[index] = [trimmed, deps];
+
+// Modules still reachable from the entry point
+const reachable = new Set();
+const queue = [entry];
+while (queue.length > 0) {
+  const id = queue.pop();
+  if (reachable.has(id)) {
+    continue;
+  }
+  reachable.add(id);
+  Object.values(modules[id][1]).forEach(function (dep) {
+    queue.push(dep);
+  });
+}
+
+const table = Array.from(reachable).sort(function (a, b) { return a - b; }).map(function (id) {
+  const fn = typeof modules[id][0] === 'string' ? modules[id][0] : modules[id][0].toString();
+  return id + ':[' + fn + ',' + JSON.stringify(modules[id][1]) + ']';
+});
+const banner = '/* plotly.js trimmed to the traces: scatter ' + traces.join(' ') + ' */\n';
+fs.writeFileSync(output, banner + src.slice(0, start) + '{' + table.join(',') + '}' + src.slice(end));
+console.log('Kept ' + reachable.size + ' of ' + Object.keys(modules).length + ' modules, ' +
+            fs.statSync(output).size + ' of ' + src.length + ' bytes');
@@ -24,10 +24,14 @@ setup(
         'multiqc==1.11',
         'plotly==4.9.0',
         'pandas==1.2.4',
-        'seaborn==0.11.2',
         'Cython==0.29.28'
     ],
     entry_points = {
+        'console_scripts': [
+            'quartet-dnaseq-score = quartet_dnaseq_report.batch_score:main',
+            'quartet-dnaseq-worker = quartet_dnaseq_report.worker:main',
+            'quartet-dnaseq-batch-report = quartet_dnaseq_report.batch_report:main'
+        ],
         'multiqc.modules.v1': [
             'general_information = quartet_dnaseq_report.modules.general_information:MultiqcModule',
             'conclusion = quartet_dnaseq_report.modules.conclusion:MultiqcModule',
@@ -37,13 +41,19 @@ setup(
             'supplementary = quartet_dnaseq_report.modules.supplementary:MultiqcModule'
         ],
         'multiqc.hooks.v1': [
-            'execution_start = quartet_dnaseq_report.custom_code:quartet_dnaseq_report_execution_start'
+            'execution_start = quartet_dnaseq_report.custom_code:quartet_dnaseq_report_execution_start',
+            'before_modules = quartet_dnaseq_report.custom_code:quartet_dnaseq_report_before_modules',
+            'before_report_generation = quartet_dnaseq_report.custom_code:quartet_dnaseq_report_before_report_generation',
+            'before_template = quartet_dnaseq_report.custom_code:quartet_dnaseq_report_before_template'
         ],
         'multiqc.cli_options.v1': [
-            'disable_plugin = quartet_dnaseq_report.cli:disable_plugin'
+            'disable_plugin = quartet_dnaseq_report.cli:disable_plugin',
+            'metrics_only = quartet_dnaseq_report.cli:metrics_only',
+            'sharded = quartet_dnaseq_report.cli:sharded'
         ],
         'multiqc.templates.v1': [
-            'report_templates = quartet_dnaseq_report.templates.default'
+            'report_templates = quartet_dnaseq_report.templates.default',
+            'quartet_metrics = quartet_dnaseq_report.templates.quartet_metrics'
         ]
     },
     classifiers = [
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+""" Run the tests from a checkout of the report package
+
+    cd report && python -m pytest tests
+
+The package is imported from the checkout. custom_code reads the plugin
+version from the installed distribution; when the package isn't installed
+(or its pinned requirements aren't), the version in setup.py is used.
+"""
+
+import os
+import re
+import sys
+
+import pkg_resources
+
+REPORT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPORT_DIR)
+
+
+def checkout_version():
+    with open(os.path.join(REPORT_DIR, 'setup.py')) as fh:
+        return re.search(r"^version = '([^']+)'", fh.read(), re.M).group(1)
+
+
+class CheckoutDistribution(object):
+    version = checkout_version()
+
+
+try:
+    pkg_resources.get_distribution('quartet_dnaseq_report')
+except (pkg_resources.DistributionNotFound, pkg_resources.VersionConflict):
+    _get_distribution = pkg_resources.get_distribution
+
+    def get_distribution(dist):
+        if dist == 'quartet_dnaseq_report':
+            return CheckoutDistribution()
+        return _get_distribution(dist)
+
+    pkg_resources.get_distribution = get_distribution
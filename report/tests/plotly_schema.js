@@ -0,0 +1,68 @@
+#!/usr/bin/env node
+/*
+ * Load a plotly.js build and print the trace types it supports, as JSON:
+ *
+ *   node tests/plotly_schema.js plotly-quartet.min.js
+ *   {"version": "1.54.5", "registered": [...], "schema": [...]}
+ *
+ * registered are the trace modules of the build (Plotly.Plots.allTypes),
+ * schema the traces Plotly.PlotSchema.get() describes. The build runs in a
+ * bare context with a minimal stand-in for the DOM: loading plotly.js only
+ * needs the browser globals to exist, nothing is drawn.
+ */
+'use strict';
+
+const fs = require('fs');
+const vm = require('vm');
+
+// Any property, call or construction of it gives it back
+function standIn() {
+  return new Proxy(function () {}, {
+    get: function (target, key) {
+      if (key === Symbol.toPrimitive) {
+        return function () {
+          return '';
+        };
+      }
+      return key === 'length' ? 0 : standIn();
+    },
+    apply: standIn,
+    construct: standIn,
+  });
+}
+
+const context = {
+  console: console,
+  setTimeout: setTimeout,
+  clearTimeout: clearTimeout,
+  navigator: { userAgent: 'node' },
+  location: { href: '' },
+  document: standIn(),
+  HTMLElement: function () {},
+  Image: standIn,
+  Blob: function () {},
+  URL: { createObjectURL: function () { return ''; } },
+  Worker: standIn,
+  DOMParser: standIn,
+  XMLHttpRequest: standIn,
+  getComputedStyle: standIn,
+  requestAnimationFrame: function () { return 0; },
+};
+[
+  'Math', 'Date', 'JSON', 'Object', 'Array', 'Error', 'TypeError', 'RegExp', 'Number', 'String', 'Boolean',
+  'Symbol', 'Map', 'Set', 'WeakMap', 'Promise', 'parseFloat', 'parseInt', 'isNaN', 'isFinite', 'ArrayBuffer',
+  'DataView', 'Float32Array', 'Float64Array', 'Int8Array', 'Int16Array', 'Int32Array', 'Uint8Array',
+  'Uint8ClampedArray', 'Uint16Array', 'Uint32Array',
+].forEach(function (name) {
+  context[name] = global[name];
+});
+context.window = context.self = context;
+vm.createContext(context);
+vm.runInContext(fs.readFileSync(process.argv[2], 'utf8'), context);
+
+const Plotly = context.Plotly;
+console.log(JSON.stringify({
+  version: Plotly.version,
+  registered: Array.from(Plotly.Plots.allTypes),
+  schema: Object.keys(Plotly.PlotSchema.get().traces),
+}));
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+""" Tests of the LTTB downsampling of line graph series """
+
+import subprocess
+import sys
+
+import numpy as np
+
+from quartet_dnaseq_report.utils import decimate
+
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    x = np.arange(10000, dtype=float)
+    y = np.exp(-((x - 2500) / 300) ** 2) + 0.5 * np.exp(-((x - 7000) / 50) ** 2)
+    kept = decimate.lttb(x, y, 200)
+    assert len(kept) == 200 and kept[0] == 0 and kept[-1] == len(x) - 1
+    assert (np.diff(kept) > 0).all()
+    # Both peaks are kept to within a bucket
+    assert abs(y[kept].max() - 1) < 1e-3
+    assert abs(y[kept][x[kept] > 5000].max() - 0.5) < 5e-2
+
+
+def test_short_series_are_kept_whole():
+    assert decimate.lttb([0, 1, 2], [1, 2, 3], 10).tolist() == [0, 1, 2]
+    pairs = [[0, 1], [1, np.nan], [2, 3], [3, 4]]
+    assert decimate.decimate_pairs(pairs, 3) is pairs
+
+
+def test_decimate_series():
+    data = {'a': {i: i % 7 for i in range(5000)}, 'b': {0: 1, 1: 2}}
+    decimated = decimate.decimate_datasets([data], 100)[0]
+    assert len(decimated['a']) == 100 and decimated['b'] is data['b']
+    assert all(data['a'][x] == y for x, y in decimated['a'].items())
+    assert decimate.decimate_series(data, 0) is data
+
+
+def test_import_leaves_the_plots_out():
+    # The MultiQC plot modules load matplotlib, which every report job would pay for on start
+    code = 'import sys, multiqc, quartet_dnaseq_report.utils.decimate; print("matplotlib" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True, env={'PYTHONPATH': ':'.join(sys.path)}).stdout
+    assert output.strip() == 'False'
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+""" Tests of the streaming FastQC parser """
+
+import zipfile
+
+import numpy as np
+import pytest
+
+from quartet_dnaseq_report.utils import fastqc
+
+FASTQC_DATA = """##FastQC\t0.11.9
+>>Basic Statistics\tpass
+#Measure\tValue
+Filename\tsample_R1.fastq.gz
+Total Sequences\t1000
+Sequence length\t35-151
+%GC\t41
+>>END_MODULE
+>>Per base sequence quality\tpass
+#Base\tMean\tMedian\tLower Quartile\tUpper Quartile\t10th Percentile\t90th Percentile
+1\t32.5\t33.0\t32.0\t34.0\t31.0\t34.0
+2\t33.0\t34.0\t33.0\t34.0\t32.0\t34.0
+10-14\t35.0\t36.0\t34.0\t37.0\t33.0\t37.0
+15-19\tNaN\t36.0\t34.0\t37.0\t33.0\t37.0
+n/a\t35.0\t36.0\t34.0\t37.0\t33.0\t37.0
+>>END_MODULE
+>>Per tile sequence quality\tpass
+#Tile\tBase\tMean
+1101\t1\t0.1
+>>END_MODULE
+>>Per sequence GC content\twarn
+#GC Content\tCount
+0\t0.0
+50\t12.5
+>>END_MODULE
+>>Sequence Length Distribution\twarn
+#Length\tCount
+35-39\t100.0
+151\t300.0
+>>END_MODULE
+>>Sequence Duplication Levels\tpass
+#Total Deduplicated Percentage\t82.5
+#Duplication Level\tPercentage of deduplicated\tPercentage of total
+1\t90.0\t80.0
+>>END_MODULE
+"""
+
+
+def test_parse_fastqc():
+    data = fastqc.parse_fastqc(FASTQC_DATA.splitlines(True))
+    assert data['statuses'] == {'basic_statistics': 'pass', 'per_base_sequence_quality': 'pass',
+                                'per_tile_sequence_quality': 'pass', 'per_sequence_gc_content': 'warn',
+                                'sequence_length_distribution': 'warn', 'sequence_duplication_levels': 'pass'}
+    stats = data['basic_statistics']
+    assert stats['Total Sequences'] == 1000 and stats['Sequence length'] == '35-151'
+    assert stats['total_deduplicated_percentage'] == 82.5
+    assert stats['avg_sequence_length'] == pytest.approx((100 * 37 + 300 * 151) / 400)
+
+    quality = data['per_base_sequence_quality']
+    # Ranges become their midpoint, the row without a position is left out
+    assert quality['base'].tolist() == [1, 2, 12, 17]
+    np.testing.assert_array_equal(quality['mean'], [32.5, 33.0, 35.0, np.nan])
+    assert quality['lower_quartile'].dtype == float
+    assert 'per_tile_sequence_quality' not in data
+    assert data['per_sequence_gc_content']['gc_content'].tolist() == [0, 50]
+
+
+def write_zip(path, text):
+    with zipfile.ZipFile(str(path), 'w') as fqc_zip:
+        fqc_zip.writestr('sample_R1_fastqc/', '')
+        fqc_zip.writestr('sample_R1_fastqc/fastqc_data.txt', text)
+    return str(path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_parse_fastqc_zips(tmp_path, workers):
+    good = write_zip(tmp_path / 'good_fastqc.zip', FASTQC_DATA)
+    bad = str(tmp_path / 'bad_fastqc.zip')
+    with open(bad, 'w') as fh:
+        fh.write('not a zip')
+    (parsed, error), (none, bad_error) = fastqc.parse_fastqc_zips([good, bad], workers)
+    assert error is None and parsed['basic_statistics']['Total Sequences'] == 1000
+    assert none is None and isinstance(bad_error, zipfile.BadZipFile)
+
+
+def test_position_matrix():
+    reports = {
+        'a': {'gc': {'x': np.array([0, 50]), 'y': np.array([1.0, 3.0])}},
+        'b': {'gc': {'x': np.array([50, 60]), 'y': np.array([0.0, 0.0])}},
+        'c': {},
+    }
+    matrix = fastqc.PositionMatrix.from_reports(reports, 'gc', 'x', 'y')
+    assert matrix.samples == ['a', 'b'] and matrix.positions.tolist() == [0, 50, 60]
+    np.testing.assert_array_equal(matrix.values, [[1, 3, np.nan], [np.nan, 0, 0]])
+    assert matrix.percentages().series() == {'a': {0: 25.0, 50: 75.0}, 'b': {50: 0.0, 60: 0.0}}
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+""" Golden test of the conclusion scatter plots against plotly.express
+
+The conclusion module used to build them with px.scatter(..., marginal_x='box',
+marginal_y='box'), after formatting the F1-score and the Mendelian
+concordance rate as '%.4f' strings. It now writes the figure dict itself
+(utils.figures.scatter_marginal_boxes), and x and y are the numbers
+themselves; the hover labels still show 4 decimals. px is given the same
+numeric columns here, so the two figures must be identical.
+"""
+
+import base64
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quartet_dnaseq_report.modules.conclusion.conclusion import MultiqcModule
+
+
+def px_figure(fig_data, title=None):
+    """ The figure as the conclusion module built it with plotly.express """
+    import plotly.express as px
+
+    fig = px.scatter(fig_data,
+          x = 'Mendelian Concordance Rate', y = 'F1-score',
+          symbol = 'Group',
+          symbol_map = {"PCR": 0, "PCR-free": 0, "Queried": 18},
+          title = title,
+          color = 'Group',
+          color_discrete_map={"PCR": "#2f5c85", "PCR-free": "#7ba1c7", "Queried": "#bb1616"},
+          marginal_y='box', marginal_x='box',
+          hover_data={'Mendelian Concordance Rate': ':.4f', 'F1-score': ':.4f', 'Batch': True})
+
+    fig.update_traces(marker=dict(size=10, line_color='white', line_width=0.5))
+    fig.update_layout(xaxis_title='Mendelian Concordance Rate',
+                      yaxis_title='F1-score',
+                      font=dict(family="Arial, sans-serif",
+                                size=12.5,
+                                color="black"),
+                      template="simple_white")
+    return plain(fig.to_dict())
+
+
+def plain(obj):
+    """ obj with its arrays and tuples as lists, as it is serialised """
+    if isinstance(obj, dict) and 'bdata' in obj:
+        # plotly >= 6 packs numeric arrays
+        values = np.frombuffer(base64.b64decode(obj['bdata']), dtype=obj['dtype'])
+        if 'shape' in obj:
+            values = values.reshape([int(d) for d in str(obj['shape']).split(',')])
+        return values.tolist()
+    if isinstance(obj, dict):
+        return {k: plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, np.ndarray)):
+        return [plain(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def fig_data(n, seed):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'Batch': ['batch_{}'.format(i) for i in range(n)],
+        'Group': rng.choice(['PCR-free', 'PCR'], n).tolist(),
+        'F1-score': rng.uniform(0.8, 1, n),
+        'Mendelian Concordance Rate': rng.uniform(0.8, 1, n),
+    })
+    data.loc[n - 1, 'Group'] = 'Queried'
+    return data
+
+
+@pytest.mark.parametrize('title', [None, 'SNV'])
+@pytest.mark.parametrize('n, seed', [(2, 0), (50, 1), (400, 2)])
+def test_mcr_f1_figure_matches_plotly_express(title, n, seed):
+    data = fig_data(n, seed)
+    expected = px_figure(data.copy(), title)
+    built = plain(MultiqcModule.mcr_f1_figure(data.copy(), title))
+
+    assert len(built['data']) == len(expected['data'])
+    for i, (trace, px_trace) in enumerate(zip(built['data'], expected['data'])):
+        assert sorted(trace) == sorted(px_trace), 'trace {}'.format(i)
+        for key in px_trace:
+            assert trace[key] == px_trace[key], 'trace {} {}'.format(i, key)
+
+    assert sorted(built['layout']) == sorted(expected['layout'])
+    for key in expected['layout']:
+        assert built['layout'][key] == expected['layout'][key], 'layout {}'.format(key)
+
+
+def test_mcr_f1_figure_keeps_numbers():
+    data = fig_data(10, 3)
+    built = MultiqcModule.mcr_f1_figure(data.copy())
+    scatter = [trace for trace in built['data'] if trace['type'] == 'scatter']
+    assert all(isinstance(v, float) for trace in scatter for v in trace['x'] + trace['y'])
+    assert all('%{x:.4f}' in trace['hovertemplate'] for trace in scatter)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+""" Tests of the file discovery from manifests """
+
+import json
+import os
+
+import pytest
+from multiqc.utils import config, report
+
+from quartet_dnaseq_report.utils import manifest, search_patterns
+
+
+@pytest.fixture
+def analysis_dir(tmp_path, monkeypatch):
+    staged = tmp_path / 'analysis'
+    (staged / 'call-extract_tables').mkdir(parents=True)
+    (staged / 'call-extract_tables' / 'variants.calling.qc.txt').write_text('')
+    listed = {key: [] for key in search_patterns.load()}
+    listed['conclusion/precision_recall_summary'] = ['call-extract_tables/variants.calling.qc.txt',
+                                                     'call-extract_tables/missing.txt']
+    (staged / manifest.MANIFEST_FN).write_text(json.dumps(listed))
+
+    monkeypatch.setattr(config, 'quartet_dnaseq_report_config', {}, raising=False)
+    monkeypatch.setattr(config, 'analysis_dir', [str(staged)])
+    # The search keys of the modules that run, as MultiQC leaves them before the modules
+    monkeypatch.setattr(report, 'files', {'conclusion/precision_recall_summary': [],
+                                          'conclusion/mendelian_summary': []})
+    monkeypatch.setattr(manifest, 'walked_dirs', None)
+    return staged
+
+
+def test_search_patterns_are_valid():
+    patterns = search_patterns.load()
+    assert list(patterns)[0] == 'general_information/information'
+    assert all(list(sp) == ['fn_re'] for sp in patterns.values())
+
+
+def test_manifest_files_are_handed_to_the_modules(analysis_dir):
+    manifest.use_manifests()
+    assert config.analysis_dir == [str(analysis_dir / manifest.MANIFEST_FN)]
+
+    manifest.add_manifest_files()
+    assert config.analysis_dir == [str(analysis_dir)]
+    # Listed files that don't exist are left out, keys of modules that don't run too
+    assert report.files == {
+        'conclusion/precision_recall_summary': [{'fn': 'variants.calling.qc.txt',
+                                                 'root': str(analysis_dir / 'call-extract_tables')}],
+        'conclusion/mendelian_summary': [],
+    }
+
+
+def test_directories_without_a_manifest_are_walked(analysis_dir, tmp_path, monkeypatch):
+    other = tmp_path / 'other'
+    other.mkdir()
+    monkeypatch.setattr(config, 'analysis_dir', [str(analysis_dir), str(other)])
+    manifest.use_manifests()
+    assert config.analysis_dir == [str(analysis_dir), str(other)]
+    manifest.add_manifest_files()
+    assert report.files['conclusion/precision_recall_summary'] == []
+
+
+def test_manifests_can_be_turned_off(analysis_dir):
+    config.quartet_dnaseq_report_config['manifest'] = False
+    manifest.use_manifests()
+    assert config.analysis_dir == [str(analysis_dir)]
+
+
+def test_read_manifest_resolves_relative_paths(analysis_dir):
+    files = manifest.read_manifest(os.path.join(str(analysis_dir), manifest.MANIFEST_FN))
+    assert files['conclusion/precision_recall_summary'][0] == (
+        str(analysis_dir / 'call-extract_tables'), 'variants.calling.qc.txt')
+    assert files['pre_alignment_qc/fastqc_zip'] == []
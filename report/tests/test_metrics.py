@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+""" Tests of the metrics JSON of a --metrics-only run """
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from multiqc.utils import config
+
+from quartet_dnaseq_report.utils import metrics
+
+
+@pytest.fixture
+def collected(monkeypatch):
+    monkeypatch.setattr(config, 'module_order', ['general_information', {'conclusion': {}}, 'pre_alignment_qc'])
+    metrics.clear()
+    yield metrics.collected
+    metrics.clear()
+
+
+def test_dumps_numpy_and_pandas_values(collected):
+    metrics.add('pre_alignment_qc', 'summary', pd.DataFrame({'sample': ['D5', 'D6'], 'gc': [41.0, np.nan]}))
+    metrics.add('conclusion', 'scores', pd.Series({'total': np.float64(0.9), 'rank': np.int64(3)}))
+    metrics.add('conclusion', 'ranks', np.array([1, 2]))
+    metrics.add('unknown', 'values', {'inf': float('inf'), 'nested': [np.nan, 1.5]})
+
+    dumped = metrics.dumps()
+    data = json.loads(dumped)
+    # Modules in the configured order, the others after them
+    assert list(data) == ['conclusion', 'pre_alignment_qc', 'unknown']
+    assert data == {
+        'conclusion': {'scores': {'total': 0.9, 'rank': 3}, 'ranks': [1, 2]},
+        'pre_alignment_qc': {'summary': [{'sample': 'D5', 'gc': 41.0}, {'sample': 'D6', 'gc': None}]},
+        'unknown': {'values': {'inf': None, 'nested': [None, 1.5]}},
+    }
+    assert 'NaN' not in dumped and 'Infinity' not in dumped
+
+
+def test_unknown_objects_are_not_serialised(collected):
+    metrics.add('conclusion', 'object', object())
+    with pytest.raises(TypeError, match='object is not JSON serializable'):
+        metrics.dumps()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+""" Tests of the modules built in parallel processes """
+
+import pytest
+from multiqc.utils import config
+
+from quartet_dnaseq_report.custom_code import PrebuiltModule
+from quartet_dnaseq_report.utils import parallel_modules
+
+
+class EntryPoint(object):
+    """ Entry point of a module raising error when it is built """
+
+    def __init__(self, error):
+        self.error = error
+
+    def load(self):
+        return self
+
+    def __call__(self):
+        raise self.error
+
+
+@pytest.fixture
+def avail_modules(monkeypatch):
+    modules = {'no_samples': EntryPoint(UserWarning('No samples found')),
+               'broken': EntryPoint(ValueError('broken'))}
+    monkeypatch.setattr(config, 'avail_modules', modules)
+    return modules
+
+
+@pytest.mark.skipif(not parallel_modules.available(), reason='needs fork')
+def test_user_warnings_go_through(avail_modules):
+    (_, no_samples), (_, broken) = parallel_modules.build_modules([('no_samples', {}), ('broken', {})], 2)
+    assert type(no_samples) is UserWarning and str(no_samples) == 'No samples found'
+    assert isinstance(broken, parallel_modules.ModuleBuildError) and 'ValueError: broken' in str(broken)
+
+    # Raised again in the MultiQC module loop, which skips the module quietly
+    prebuilt = PrebuiltModule('no_samples', avail_modules['no_samples'], error=no_samples)
+    with pytest.raises(UserWarning, match='No samples found'):
+        prebuilt.load()()
+    assert config.avail_modules['no_samples'] is avail_modules['no_samples']
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+""" Tests of the on-disk cache of parsed input files """
+
+import os
+
+import pytest
+from multiqc.utils import config
+
+from quartet_dnaseq_report.utils import parse_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'quartet_dnaseq_report_config', {'reference_cache_dir': str(tmp_path / 'cache')},
+                        raising=False)
+    monkeypatch.setattr(config, 'quartet_dnaseq_report_version', '1.0', raising=False)
+    return tmp_path
+
+
+class CountingParser(object):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(path)
+        with open(path) as fh:
+            return fh.read()
+
+
+@pytest.fixture
+def input_file(cache_dir):
+    path = cache_dir / 'input.txt'
+    path.write_text('first')
+    return str(path)
+
+
+def test_unchanged_files_are_read_from_the_cache(input_file):
+    parse = CountingParser()
+    assert parse_cache.cached('text', input_file, parse) == 'first'
+    assert parse_cache.cached('text', input_file, parse) == 'first'
+    assert len(parse.calls) == 1
+    # Another kind of parse of the same file
+    assert parse_cache.cached('other', input_file, parse) == 'first'
+    assert len(parse.calls) == 2
+
+
+def test_the_key_changes_with_the_file_and_the_version(input_file, monkeypatch):
+    key = parse_cache.cache_key('text', input_file)
+
+    stat = os.stat(input_file)
+    os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    touched = parse_cache.cache_key('text', input_file)
+    assert touched != key
+
+    # Rewritten with the same size and mtime, but as another file
+    replacement = input_file + '.new'
+    with open(replacement, 'w') as fh:
+        fh.write('other')
+    os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    os.replace(replacement, input_file)
+    assert parse_cache.cache_key('text', input_file) != touched
+
+    monkeypatch.setattr(config, 'quartet_dnaseq_report_version', '1.1')
+    assert parse_cache.cache_key('text', input_file) not in (key, touched)
+
+
+def test_a_changed_file_is_parsed_again(input_file):
+    parse = CountingParser()
+    parse_cache.cached('text', input_file, parse)
+    with open(input_file, 'w') as fh:
+        fh.write('second!')
+    assert parse_cache.cached('text', input_file, parse) == 'second!'
+    assert len(parse.calls) == 2
+
+
+def test_cached_many_parses_only_the_misses_and_keeps_errors_out(cache_dir, input_file):
+    missing = str(cache_dir / 'missing.txt')
+
+    def parse_many(paths):
+        parse_many.calls.append(paths)
+        return [(None, 'unreadable') if p == missing else (open(p).read(), None) for p in paths]
+    parse_many.calls = []
+
+    assert parse_cache.cached_many('text', [input_file, missing], parse_many) == [('first', None), (None, 'unreadable')]
+    assert parse_cache.cached_many('text', [input_file, missing], parse_many) == [('first', None), (None, 'unreadable')]
+    assert parse_many.calls == [[input_file, missing], [missing]]
+
+
+def test_least_recently_used_entries_are_evicted(cache_dir):
+    dest = str(cache_dir / 'entries')
+    os.makedirs(dest)
+    for i, name in enumerate(['old', 'used', 'new']):
+        path = os.path.join(dest, name + '.pickle')
+        with open(path, 'wb') as fh:
+            fh.write(b'x' * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    os.utime(os.path.join(dest, 'used.pickle'), (2000, 2000))
+    parse_cache.evict(dest, 200)
+    assert sorted(os.listdir(dest)) == ['new.pickle', 'used.pickle']
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+""" Smoke test of the trimmed plotly.js build, loaded in node
+
+plotly-quartet.min.js is generated by `make plotly-bundle`. It must still
+load, and support exactly the trace types utils.plotly_bundle.BUNDLES says
+it does, or the report would pick it for figures it can't draw.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from quartet_dnaseq_report.utils import plotly_bundle
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'quartet_dnaseq_report', 'templates', 'default')
+SCHEMA_JS = os.path.join(os.path.dirname(__file__), 'plotly_schema.js')
+
+# plotly.js 1.x describes the legacy polar area chart in every build, it is no trace module
+LEGACY_SCHEMA_TRACES = {'area'}
+
+
+def bundle_schema(path):
+    output = subprocess.run(['node', SCHEMA_JS, os.path.join(TEMPLATE_DIR, path)],
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node')
+@pytest.mark.parametrize('path, supported', [b for b in plotly_bundle.BUNDLES if b[1] is not None])
+def test_trimmed_bundle_traces(path, supported):
+    schema = bundle_schema(path)
+    assert set(schema['registered']) == supported
+    assert set(schema['schema']) - LEGACY_SCHEMA_TRACES == supported
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node')
+def test_trimmed_bundle_matches_full_build():
+    trimmed, full = [bundle_schema(path) for path, _ in plotly_bundle.BUNDLES]
+    assert trimmed['version'] == full['version']
+    assert set(trimmed['registered']) < set(full['registered'])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+""" Tests of the compact, compressed plotly figure data """
+
+import base64
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import lzstring
+import numpy as np
+import pytest
+
+from quartet_dnaseq_report.utils import plotly_data
+
+MULTIQC_JS = os.path.join(os.path.dirname(__file__), os.pardir, 'quartet_dnaseq_report', 'templates', 'default',
+                          'assets', 'js', 'multiqc.js')
+
+
+@pytest.fixture
+def figures():
+    plotly_data.clear()
+    yield plotly_data
+    plotly_data.clear()
+
+
+def unpack(obj):
+    """ quartet_plotly_unpack of multiqc.js """
+    if isinstance(obj, list):
+        return [unpack(v) for v in obj]
+    if isinstance(obj, dict):
+        if set(obj) == {'dtype', 'bdata'}:
+            return np.frombuffer(base64.b64decode(obj['bdata']), dtype='<' + obj['dtype']).tolist()
+        return {k: unpack(v) for k, v in obj.items()}
+    return obj
+
+
+def figure(title, n=10):
+    return {
+        'data': [{'type': 'scatter', 'x': list(range(n)), 'y': [0.1 * i for i in range(n)], 'name': title,
+                  'text': ['D5'] * n, 'marker': {'size': [1, 2]}}],
+        'layout': {'title': title, 'template': {'layout': {'font': {'size': 12}}}},
+    }
+
+
+def test_compressed_figures_round_trip(figures):
+    figures.add('first', figure('first'))
+    figures.add('second', figure('second', 3))
+    plotly_data.add('untemplated', {'data': [], 'layout': {}})
+
+    data = json.loads(lzstring.LZString().decompressFromBase64(plotly_data.compressed()))
+    # One template for both figures
+    assert len(data['templates']) == 1
+    key = data['figures']['first']['template']
+    assert data['figures']['second']['template'] == key and 'template' not in data['figures']['untemplated']
+
+    trace = data['figures']['first']['data'][0]
+    assert trace['x']['dtype'] == 'i4' and trace['y']['dtype'] == 'f4'
+    # Short and non-numeric arrays stay as they are
+    assert trace['text'] == ['D5'] * 10 and trace['marker'] == {'size': [1, 2]}
+    assert data['figures']['second']['data'][0]['x'] == [0, 1, 2]
+
+    unpacked = unpack(data['figures']['first'])
+    expected = figure('first')
+    assert unpacked['data'][0]['x'] == expected['data'][0]['x']
+    np.testing.assert_allclose(unpacked['data'][0]['y'], expected['data'][0]['y'], rtol=1e-7)
+    assert data['templates'][key] == expected['layout']['template']
+
+
+def test_compressed_selected_figures(figures):
+    figures.add('first', figure('first'))
+    figures.add('second', dict(figure('second'), layout={'template': {'layout': {}}}))
+    data = json.loads(lzstring.LZString().decompressFromBase64(plotly_data.compressed(['second'])))
+    assert list(data['figures']) == ['second'] and list(data['templates']) == [data['figures']['second']['template']]
+
+
+def test_pack():
+    assert plotly_data.pack([1, 2, 3]) is None
+    assert plotly_data.pack([True] * 10) is None
+    assert plotly_data.pack([1] * 9 + [2 ** 40])['dtype'] == 'f4'
+    assert plotly_data.pack([1] * 9 + [None]) is None
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='needs node')
+def test_multiqc_js_unpacks_the_arrays():
+    with open(MULTIQC_JS) as fh:
+        source = re.search(r'^function quartet_plotly_unpack\(obj\) \{$.*?^\}$', fh.read(), re.M | re.S).group(0)
+    values = {'i': list(range(-4, 6)), 'f': [0.1 * i for i in range(10)] + [float('nan')], 'plain': ['a']}
+    packed = json.dumps(plotly_data.compact(values), allow_nan=False)
+    script = source + '\nconsole.log(JSON.stringify(quartet_plotly_unpack(%s)));' % packed
+    output = subprocess.run(['node', '-e', script], check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    assert json.loads(output) == {'i': values['i'], 'f': [round(0.1 * i, 7) for i in range(10)] + [None],
+                                  'plain': ['a']}
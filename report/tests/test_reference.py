@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+""" Tests of the compiled reference cache """
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from multiqc.utils import config
+
+from quartet_dnaseq_report.utils import reference, scoring
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'quartet_dnaseq_report_config', {'reference_cache_dir': str(tmp_path)}, raising=False)
+    monkeypatch.setattr(reference, '_loaded', {})
+    return tmp_path
+
+
+def test_compiled_reference_reads_back(cache_dir):
+    compiled = reference.load_partitions()
+    reference._loaded.clear()
+    read = reference.load_partitions()
+    assert set(read) == set(compiled)
+    for seq in compiled:
+        pd.testing.assert_frame_equal(read[seq].metrics, compiled[seq].metrics)
+        pd.testing.assert_frame_equal(read[seq].quantiles, compiled[seq].quantiles)
+        np.testing.assert_array_equal(read[seq].data[read[seq].columns[3:]].values,
+                                      compiled[seq].data[compiled[seq].columns[3:]].values)
+
+
+def test_compiled_dir_carries_the_format(cache_dir, monkeypatch):
+    reference.load_partitions()
+    digest = reference.checksum(reference.REFERENCE_TSV)
+    assert os.path.basename(reference.compiled_dir(digest)).startswith('quartet_reference-v%d-' % reference.COMPILED_FORMAT)
+    assert os.path.isfile(os.path.join(reference.compiled_dir(digest), 'meta.json'))
+
+    # A new format doesn't read what an older one compiled
+    monkeypatch.setattr(reference, 'COMPILED_FORMAT', reference.COMPILED_FORMAT + 1)
+    reference._loaded.clear()
+    assert not os.path.exists(reference.compiled_dir(digest))
+    reference.load_partitions()
+    assert os.path.isfile(os.path.join(reference.compiled_dir(digest), 'meta.json'))
+
+
+def test_load_reference_of_all_strategies(cache_dir):
+    partitions = reference.load_partitions()
+    together = reference.load_reference()
+    assert len(together.metrics) == sum(len(p.metrics) for p in partitions.values())
+    assert list(together.quantiles.columns) == scoring.METRICS
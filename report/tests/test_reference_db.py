@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+""" Tests of the SQLite store of the historical reference """
+
+import numpy as np
+import pytest
+from multiqc.utils import config
+
+from quartet_dnaseq_report.utils import reference, reference_db, scoring
+
+
+@pytest.fixture
+def db_config(tmp_path, monkeypatch):
+    settings = {'reference_cache_dir': str(tmp_path / 'cache'), 'reference_db': str(tmp_path / 'reference.sqlite')}
+    monkeypatch.setattr(config, 'quartet_dnaseq_report_config', settings, raising=False)
+    monkeypatch.setattr(reference, '_loaded', {})
+    return settings
+
+
+@pytest.fixture
+def seq():
+    return sorted(reference.load_partitions())[0]
+
+
+def test_stored_reference_matches_the_shipped_one(db_config, seq):
+    shipped = reference.load_reference(seq)
+    stored = reference_db.open_reference(seq)
+    assert isinstance(stored, reference_db.StoredReference)
+    np.testing.assert_allclose(stored.summary().values, shipped.summary().values, rtol=1e-9)
+    np.testing.assert_allclose(stored.quantiles.values, shipped.quantiles.values, rtol=1e-9)
+    metrics = shipped.metrics.iloc[:5]
+    np.testing.assert_array_equal(stored.rank(metrics).values, shipped.rank(metrics).values)
+
+
+def test_missing_values_are_not_ranked(db_config, seq):
+    stored = reference_db.open_reference(seq)
+    metrics = stored.metrics.iloc[:2].copy()
+    metrics.loc[metrics.index[0], 'total'] = np.nan
+    ranks = stored.rank(metrics)
+    assert np.isnan(ranks.loc[metrics.index[0], 'total'])
+    assert ranks.loc[metrics.index[1], 'total'] == (stored.metrics.total > metrics.total.iloc[1]).sum() + 1
+    assert not ranks[[m for m in scoring.METRICS if m != 'total']].isna().any().any()
+
+
+def queried_dataset(stored, name):
+    performance = stored.data[stored.data.batch == stored.metrics.batch.iloc[0]].assign(batch=name)
+    return performance, scoring.score_batches(performance[stored.columns])
+
+
+def test_a_new_platform_is_scored_against_the_seeded_batches(db_config, seq):
+    db_config.update(reference_db_platform='novaseq', reference_db_platform_min_batches=2, reference_db_insert=True)
+    seeded = reference_db.open_reference(seq)
+    assert seeded.platform == '' and seeded.insert_platform == 'novaseq'
+
+    performance, metrics = queried_dataset(seeded, 'Queried_Data')
+    n_seeded = seeded.summary().loc['count', 'total']
+    for batch in ['first', 'second']:
+        db_config['reference_db_batch'] = batch
+        reference = reference_db.open_reference(seq)
+        # Not against the only batch of the platform
+        assert reference.platform == '' and reference.summary().loc['count', 'total'] == n_seeded
+        reference_db.store_queried(reference, performance, metrics)
+
+    platform = reference_db.open_reference(seq)
+    assert platform.platform == 'novaseq'
+    assert platform.metrics.batch.to_list() == ['first', 'second']
+
+
+def test_store_queried_skips_incomplete_and_duplicate_datasets(db_config, seq, caplog):
+    db_config.update(reference_db_insert=True, reference_db_batch='in-house')
+    stored = reference_db.open_reference(seq)
+    n_stored = len(stored.metrics)
+    performance, metrics = queried_dataset(stored, 'Queried_Data')
+
+    incomplete = metrics.copy()
+    incomplete.loc[incomplete.index[0], 'recall_snv'] = np.nan
+    reference_db.store_queried(stored, performance, incomplete)
+    assert 'some of its metrics are missing' in caplog.text
+    assert len(stored.metrics) == n_stored
+
+    reference_db.store_queried(stored, performance, metrics)
+    assert len(stored.metrics) == n_stored + 1
+    reference_db.store_queried(stored, performance, metrics)
+    assert 'in-house is already in the Quartet reference database' in caplog.text
+    assert len(stored.metrics) == n_stored + 1
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+""" Tests of the scoring engine against the per-batch pandas loop it replaced """
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quartet_dnaseq_report.utils import reference, scoring
+
+
+def loop_scores(df):
+    """ Batch-level metrics as the conclusion module computed them before utils.scoring """
+    rows = []
+    for bat in df.batch.drop_duplicates().to_list():
+        means = [df[df.batch == bat][[col for col in df.columns if re.search(pattern, col)]].values.mean()
+                 for pattern in ['snv.*precision', 'indel.*precision', 'snv.*recall', 'indel.*recall',
+                                 'snv.*mendelian', 'indel.*mendelian']]
+        beta2 = 0.5
+        precision_beta = (1+beta2)*means[0]*means[1]/(beta2*means[0]+means[1])
+        recall_beta = (1+beta2)*means[2]*means[3]/(beta2*means[2]+means[3])
+        mendelian_beta = (1+beta2)*means[4]*means[5]/(beta2*means[4]+means[5])
+        total = sum([precision_beta, recall_beta, mendelian_beta])/3
+        rows.append([bat] + [round(m, 5) for m in means] + [round(total, 5)])
+    return pd.DataFrame(rows, columns=['batch'] + scoring.METRICS)
+
+
+@pytest.fixture(scope='module')
+def reference_table():
+    return pd.read_csv(reference.REFERENCE_TSV, sep='\t').drop(columns=['seq'])
+
+
+def test_score_batches_matches_the_pandas_loop(reference_table):
+    expected = loop_scores(reference_table)
+    scored = scoring.score_batches(reference_table)
+    assert scored.batch.to_list() == expected.batch.to_list()
+    np.testing.assert_allclose(scored[scoring.METRICS].values, expected[scoring.METRICS].values, atol=1e-5)
+
+
+def test_score_batches_keeps_missing_values_missing(reference_table):
+    batch = reference_table.batch.iloc[0]
+    table = reference_table.copy()
+    table.loc[table.index[0], 'snv_D5-precision'] = np.nan
+    scored = scoring.score_batches(table).set_index('batch')
+    expected = loop_scores(table).set_index('batch')
+    assert np.isnan(scored.loc[batch, 'precision_snv']) and np.isnan(scored.loc[batch, 'total'])
+    assert not np.isnan(scored.loc[batch, 'precision_indel'])
+    np.testing.assert_allclose(scored[scoring.METRICS].values, expected[scoring.METRICS].values, atol=1e-5)
+
+
+def summary_of(totals):
+    metrics = pd.DataFrame({metric: totals for metric in scoring.METRICS})
+    return scoring.summarise(metrics)
+
+
+def test_scale_total_spans_the_historical_range():
+    scaled = scoring.scale_total(summary_of([0.8, 0.9, 1.0]), [0.8, 0.9, 1.0, np.nan])
+    np.testing.assert_allclose(scaled, [1, 5.5, 10, np.nan])
+
+
+def test_scale_total_of_a_single_batch():
+    scaled = scoring.scale_total(summary_of([0.9]), [0.8, 0.9, 0.95, np.nan])
+    np.testing.assert_allclose(scaled, [1, 5.5, 10, np.nan])
+
+
+def test_score_against_a_table_or_a_compiled_reference(reference_table):
+    batches = reference_table.batch.drop_duplicates()
+    historical = reference_table[reference_table.batch.isin(batches.iloc[1:])]
+    queried = reference_table[reference_table.batch == batches.iloc[0]].assign(batch='Queried_Data')
+
+    scores = scoring.score(historical, queried)
+    assert scores.batch.to_list() == ['Queried_Data']
+    compiled = scoring.score(reference.from_data(None, historical.reset_index(drop=True)), queried)
+    pd.testing.assert_frame_equal(scores, compiled)
+
+    # The pandas rank and moments over the historical batches and the queried one
+    together = loop_scores(pd.concat([historical, queried]))
+    n = len(together)
+    assert scores.n_batches.iloc[0] == n
+    for metric in scoring.METRICS:
+        ranks = together[metric].rank(ascending=False, method='min')
+        assert scores['%s_rank' % metric].iloc[0] == ranks.iloc[-1]
+        assert scores['%s_mean' % metric].iloc[0] == pytest.approx(together[metric].mean())
+        # From running sums of squares, shown with 3 decimals
+        assert scores['%s_sd' % metric].iloc[0] == pytest.approx(together[metric].std(), rel=1e-4)
+    assert 1 <= scores.total_score_norm.iloc[0] <= 10
+
+
+def test_missing_values_are_not_ranked(reference_table):
+    reference_metrics = scoring.score_batches(reference_table)
+    metrics = reference_metrics.iloc[:2].copy()
+    metrics.loc[metrics.index[0], 'total'] = np.nan
+    with_missing = reference_metrics.copy()
+    with_missing.loc[with_missing.index[-1], 'total'] = np.nan
+
+    ranks = scoring.rank_against_reference(with_missing, metrics)
+    assert np.isnan(ranks.loc[metrics.index[0], 'total'])
+    # The missing reference value is left out
+    expected = (reference_metrics.total.iloc[:-1] > metrics.total.iloc[1]).sum() + 1
+    assert ranks.loc[metrics.index[1], 'total'] == expected
+    assert not ranks[[m for m in scoring.METRICS if m != 'total']].isna().any().any()
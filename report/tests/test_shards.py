@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+""" Tests of the payload files of a sharded report """
+
+import json
+import os
+
+import lzstring
+import pytest
+from multiqc.utils import config, report
+
+from quartet_dnaseq_report.templates import default
+from quartet_dnaseq_report.utils import plotly_data, shards
+
+
+class TemplateEntryPoint(object):
+    def load(self):
+        return default
+
+
+class Module(object):
+    def __init__(self, anchor, sections):
+        self.anchor = anchor
+        self.name = anchor.title()
+        self.intro = ''
+        self.comment = ''
+        self.sections = sections
+
+
+def section(content):
+    return {'print_section': True, 'name': None, 'anchor': 'section', 'helptext': None, 'description': None,
+            'comment': None, 'plot': None, 'content': content}
+
+
+def decompress(data):
+    return json.loads(lzstring.LZString().decompressFromBase64(data))
+
+
+@pytest.fixture
+def sharded_report(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'output_fn', str(tmp_path / 'report.html'), raising=False)
+    monkeypatch.setattr(config, 'template', 'default')
+    monkeypatch.setattr(config, 'avail_templates', {'default': TemplateEntryPoint()})
+    monkeypatch.setattr(report, 'plot_data', {'hc_plot': {'data': 1}, 'general_stats': {'data': 2}})
+    monkeypatch.setattr(report, 'quartet_plotly_bundle', 'assets/js/packages/plotly-quartet.min.js', raising=False)
+    # Set by the run, and by write_shards
+    for name in ['quartet_shards', 'plot_compressed_json', 'quartet_plotly_compressed']:
+        monkeypatch.setattr(report, name, None, raising=False)
+    monkeypatch.setattr(report, 'modules_output', [
+        Module('conclusion', [section('<div id="hc_plot"></div><script>quartet_plotly_figure("figure");</script>')]),
+        Module('empty', []),
+    ], raising=False)
+    plotly_data.clear()
+    plotly_data.add('figure', {'data': [{'type': 'box'}], 'layout': {}})
+    yield tmp_path
+    plotly_data.clear()
+
+
+def test_modules_are_written_to_their_own_payload(sharded_report):
+    shards.write_shards()
+    outdir = sharded_report / 'report_modules'
+    assert sorted(os.listdir(str(outdir))) == ['conclusion.js', shards.PLOTLY_FN]
+    assert report.quartet_shards == {'conclusion': {'src': 'report_modules/conclusion.js',
+                                                    'requires': ['report_modules/plotly.js'], 'plotly': True}}
+
+    payload = (outdir / 'conclusion.js').read_text()
+    prefix = 'quartet_shard_loaded("conclusion", '
+    assert payload.startswith(prefix) and payload.endswith(');\n')
+    payload = json.loads(payload[len(prefix):-3])
+    assert '<h2 id="conclusion">Conclusion</h2>' in payload['html']
+    assert decompress(payload['plot_data']) == {'hc_plot': {'data': 1}}
+    assert list(decompress(payload['plotly'])['figures']) == ['figure']
+
+    # The report keeps the rest, and plotly.js is only loaded with the module
+    assert decompress(report.plot_compressed_json) == {'general_stats': {'data': 2}}
+    assert decompress(report.quartet_plotly_compressed)['figures'] == {}
+    assert report.quartet_plotly_bundle is None
+
+
+def test_plotly_stays_in_a_report_still_drawing_a_figure(sharded_report):
+    plotly_data.add('general_figure', {'data': [], 'layout': {}})
+    shards.write_shards()
+    assert report.quartet_plotly_bundle == 'assets/js/packages/plotly-quartet.min.js'
+    assert report.quartet_shards['conclusion']['requires'] == []
+    assert list(decompress(report.quartet_plotly_compressed)['figures']) == ['general_figure']
+    assert not (sharded_report / 'report_modules' / shards.PLOTLY_FN).exists()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+""" Tests of the performance tiers against the row by row grading they replaced """
+
+import numpy as np
+import pandas as pd
+
+from quartet_dnaseq_report.utils.tiers import TIERS, grade
+
+
+def loop_grade(value, q1, q2, q3):
+    if value < q1:
+        return 'Bad'
+    elif value < q2:
+        return 'Fair'
+    elif value < q3:
+        return 'Good'
+    return 'Great'
+
+
+def test_grade_matches_the_row_by_row_grading():
+    rng = np.random.default_rng(0)
+    values = pd.DataFrame(rng.uniform(0, 1, (200, 3)), columns=['a', 'b', 'c'])
+    quantiles = values.quantile([.2, .5, .8])
+    quantiles.index = ['Q1', 'Q2', 'Q3']
+    # Values on the thresholds go up a tier
+    values.iloc[:3] = quantiles.values
+
+    graded = grade(values, quantiles)
+    assert list(graded.columns) == ['a_performance', 'b_performance', 'c_performance']
+    for metric in values.columns:
+        expected = [loop_grade(v, *quantiles[metric]) for v in values[metric]]
+        assert graded['%s_performance' % metric].to_list() == expected
+    assert set(graded.values.ravel()) == set(TIERS)
+
+
+def test_grade_of_a_missing_value_is_missing():
+    quantiles = pd.DataFrame({'a': [0.2, 0.5, 0.8], 'b': [0.2, 0.5, 0.8]}, index=['Q1', 'Q2', 'Q3'])
+    graded = grade(pd.DataFrame({'a': [np.nan, 0.9], 'b': [0.1, np.nan]}), quantiles)
+    assert pd.isna(graded.loc[0, 'a_performance']) and graded.loc[0, 'b_performance'] == 'Bad'
+    assert graded.loc[1, 'a_performance'] == 'Great' and pd.isna(graded.loc[1, 'b_performance'])
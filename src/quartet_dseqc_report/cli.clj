@@ -15,6 +15,9 @@
     :default "report"]
    ["-D" "--description DESC" "Report Description"
     :default "Quality control report"]
+   ["-x" "--extract-qualimap" "Extract the qualimap archives before generating the report"
+    :default false]
+   ["-w" "--worker URL" "Submit the report to a running quartet-dnaseq-worker, e.g. http://127.0.0.1:8765"]
    ["-v" "--version" "Show version" :default false]
    ["-h" "--help"]])
 
@@ -76,6 +79,8 @@
                      :dest-dir (:output options)
                      :parameters {:name (:name options)
                                   :description (:description options)
+                                  :extract-qualimap (:extract-qualimap options)
+                                  :worker (:worker options)
                                   :plugin-name "quartet-dseqc-report"
                                   :plutin-type "ReportPlugin"
                                   :plugin-version version}
@@ -5,6 +5,7 @@
             [clojure.java.shell :as shell :refer [sh]]
             [clj-yaml.core :as yaml]
             [clojure.data.csv :as csv]
+            [clojure.data.json :as json]
             [clojure.string :as clj-str]
             [clojure.java.io :as io]
             [remote-fs.core :as remote-fs]
@@ -263,6 +264,34 @@
       (copy-remote-file! file-path dest-dir options)
       (copy-local-file! file-path dest-dir options))))
 
+(defn submit-multiqc
+  "Submit a report job to a running quartet-dnaseq-worker (see the report package)
+   instead of starting a multiqc process. worker is its base url, e.g. http://127.0.0.1:8765"
+  [worker analysis-dir outdir {:keys [filename comment title force? prepend-dirs? template config]}]
+  (let [job (json/write-str {:analysis_dir [analysis-dir]
+                             :options (cond-> {:outdir outdir
+                                               :filename filename
+                                               :title title
+                                               :report_comment comment
+                                               :template template
+                                               :force force?
+                                               :dirs prepend-dirs?}
+                                        config (assoc :config_file [config]))})
+        conn (.openConnection (java.net.URL. (str (clj-str/replace worker #"/$" "") "/report")))]
+    (try
+      (doto conn
+        (.setRequestMethod "POST")
+        (.setDoOutput true)
+        (.setRequestProperty "Content-Type" "application/json"))
+      (with-open [writer (io/writer (.getOutputStream conn) :encoding "UTF-8")]
+        (.write writer job))
+      (let [result (json/read-str (slurp (.getInputStream conn) :encoding "UTF-8") :key-fn keyword)]
+        {:status (:status result)
+         :msg (:msg result)})
+      (catch java.io.IOException e
+        {:status "Error"
+         :msg (format "Cannot submit the report job to %s: %s" worker (.getMessage e))}))))
+
 (defn multiqc
   "A multiqc wrapper for generating multiqc report:
    TODO: set the absolute path of multiqc binary instead of environment variable
@@ -283,6 +312,7 @@
   | :template          | default, other custom template    |
   | :config            | Where is the config file          |
   | :env               | An environemnt map for running multiqc, such as {:PATH (get-path-variable)} |
+  | :worker            | Base url of a running quartet-dnaseq-worker, which builds the report instead of a new multiqc process |
 
   Example:
   (multiqc 'XXX' 'YYY' {:filename       'ZZZ'
@@ -290,7 +320,7 @@
                         :title          ''
                         :force?         true
                         :prepend-dirs?  true})"
-  [analysis-dir outdir {:keys [dry-run? filename comment title force? prepend-dirs? template config env]
+  [analysis-dir outdir {:keys [dry-run? filename comment title force? prepend-dirs? template config env worker]
                         :or   {dry-run?      false
                                force?        true
                                prepend-dirs? false
@@ -310,11 +340,17 @@
                                                   "-t" template
                                                   analysis-dir])
         command (clj-str/join " " multiqc-command)]
-    (if dry-run?
-      (log/info command)
-      (if env
-        (call-command! command env)
-        (call-command! command)))))
+    (cond
+      dry-run? (log/info command)
+      worker (submit-multiqc worker analysis-dir outdir {:filename filename
+                                                          :comment comment
+                                                          :title title
+                                                          :force? force?
+                                                          :prepend-dirs? prepend-dirs?
+                                                          :template template
+                                                          :config config})
+      env (call-command! command env)
+      :else (call-command! command))))
 
 (defn is-localpath?
   [filepath]
@@ -5,6 +5,7 @@
             [tservice-core.plugins.util :as util]
             [clojure.string :as clj-str]
             [clojure.data.json :as json]
+            [clojure.java.io :as io]
             [clojure.tools.logging :as log]
             [tservice-core.tasks.async :refer [publish-event! make-events-init]]
             [quartet-dseqc-report.version :as v]))
@@ -108,6 +109,26 @@
     (filter-mkdir-copy (format "%s%s" data-dir "call-merge_mendelian") [".*.summary.txt"] dest-dir "call-merge_mendelian")
     (filter-mkdir-copy (format "%s%s" data-dir "call-merge_mendelian_vcf") [".*.summary.txt"] dest-dir "call-merge_mendelian_vcf")))
 
+(def search-patterns
+  "Search patterns of the report modules, {search key {\"fn_re\" pattern}}.
+   Read from the report's shared/search_patterns.json, which is on the
+   resource path, so the manifest and the MultiQC search use the same patterns."
+  (delay (json/read-str (slurp (io/resource "search_patterns.json")))))
+
+(defn- fn-re-matches?
+  "Whether fn-re matches the file name of path, from its start like re.match in the MultiQC search."
+  [fn-re path]
+  (some? (re-find (re-pattern (str "^(?:" fn-re ")")) (last (clj-str/split path #"/")))))
+
+(defn- write-manifest!
+  "List the staged files of every search key in quartet_manifest.json,
+   so that multiqc reads them instead of walking dest-dir."
+  [dest-dir]
+  (let [files (sort (dseqc/list-files dest-dir {:mode "file"}))
+        manifest (into {} (for [[sp-key {fn-re "fn_re"}] @search-patterns]
+                            [sp-key (filter #(fn-re-matches? fn-re %) files)]))]
+    (spit (fs-lib/join-paths dest-dir "quartet_manifest.json") (json/write-str manifest))))
+
 (defn make-report!
   "Chaining Pipeline: filter-files -> copy-files -> multiqc."
   [{:keys [data-dir parameters dest-dir task-id]}]
@@ -123,8 +144,10 @@
         (copy-files-to-dir subdir dest-dir))
       (update-log-process! log-path {:status "Running" :msg "Download all files sucessfully.\n"} task-id 10)
       (spit parameters-file (json/write-str parameters))
-      (doseq [files-qualimap-tar (dseqc/batch-filter-files dest-dir [".*qualimap.zip"])]
-        (dseqc/decompression-tar files-qualimap-tar))
+      ;; The report reads the qualimap archives directly, extracting them is optional
+      (when (:extract-qualimap parameters)
+        (doseq [files-qualimap-tar (dseqc/batch-filter-files dest-dir [".*qualimap.zip"])]
+          (dseqc/decompression-tar files-qualimap-tar)))
       (update-log-process! log-path {:status "Running" :msg "Prepare results successfully.\n"} task-id 50)
       (update-process! task-id 50)
       (spit parameters-file (json/write-str {"Report Name" (or (:name parameters) "Quartet QC Report for DNA-Seq")
@@ -134,9 +157,13 @@
                                                                    (:plugin-version parameters))
                                              "Team" "Quartet Team"
                                              "Date" (date)}))
+      (write-manifest! dest-dir)
       (let [result (dseqc/multiqc dest-dir dest-dir {:template "report_templates"
                                                      :title "Quartet DNA report"
-                                                     :env {:PATH (add-env-to-path "quartet-dseqc-report")}})]
+                                                     :env {:PATH (add-env-to-path "quartet-dseqc-report")}
+                                                     ;; Jobs go to a warm report worker when one is running
+                                                     :worker (or (:worker parameters)
+                                                                 (System/getenv "QUARTET_DNASEQ_WORKER"))})]
         (if (= (:status result) "Error")
           (throw (Exception. (:msg result)))
           (update-log-process! log-path result task-id 100)))